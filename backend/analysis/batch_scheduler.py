@@ -0,0 +1,164 @@
+import threading #scheduler thread
+import time #tick pacing, latency measurements
+import traceback #for debugging - detailed error info
+from config import Config #tick rate
+from log_utils import get_logger #tick and backend failures
+
+logger = get_logger('batch_scheduler')
+
+
+class BatchInferenceScheduler:
+    """
+    central inference scheduler for every webcam in batched mode
+    each tick it takes the newest unseen frame from every active analyzer's frame bus,
+    runs ONE batched inference call per detector backend, and hands each result to that
+    analyzer's roboflow_sink
+    replaces N InferencePipelines (N model instances, N single image calls) with one model per backend
+    """
+    def __init__(self, sources, backend=None, interval=None):
+        """
+        sources -> callable returning dict of webcam_id -> LiveStreamAnalyzer (active_pipelines)
+        backend -> DetectorBackend used for every webcam, if None each analyzer's own backend
+        (its 'detector', loaded once per process through the model registry) is used
+        interval -> seconds per tick, defaults to 1 / Config.MAX_FPS
+        """
+        self.sources = sources
+        self.backend = backend
+        self.interval = interval or 1.0 / Config.MAX_FPS
+        self.last_frame_ids = {} #webcam_id -> (analyzer, frame_id) of last inferred frame
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread = None
+        #stats
+        self.batches = 0
+        self.frames = 0
+        self.last_batch_size = 0
+        self.max_batch_size = 0
+        self.last_queue_wait = 0.0 #oldest frame's wait on the bus before the batch ran
+        self.total_queue_wait = 0.0
+        self.last_batch_latency = 0.0 #seconds for the batched inference call
+        self.total_batch_latency = 0.0
+        self.backend_frames = {} #detector name -> frames inferred
+
+    def start(self):
+        """
+        starts the scheduler thread if not already running
+        """
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        """
+        stops the scheduler after the current tick
+        """
+        with self.lock:
+            self.running = False
+
+    def _run(self):
+        """
+        ticks at a fixed rate until stopped
+        """
+        while self.running:
+            tick_start = time.monotonic()
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error("batch scheduler tick failed: %s\n%s", e, traceback.format_exc())
+            elapsed = time.monotonic() - tick_start
+            time.sleep(max(self.interval - elapsed, 0.0))
+
+    def collect(self):
+        """
+        gathers the newest unseen frame from every batched analyzer
+        returns list of (analyzer, BusFrame)
+        """
+        batch = []
+        seen = {}
+        for webcam_id, analyzer in list(self.sources().items()):
+            if getattr(analyzer, 'inference_mode', None) != 'batched':
+                continue
+            if self.backend is None and getattr(analyzer, 'backend', None) is None:
+                continue #detector still loading
+            last_analyzer, last_id = self.last_frame_ids.get(webcam_id, (None, 0))
+            if last_analyzer is not analyzer:
+                last_id = 0 #restarted webcam, new frame bus numbering
+            seen[webcam_id] = (analyzer, last_id)
+            frame = analyzer.frame_bus.latest
+            if frame is None or frame.frame_id <= last_id:
+                continue
+            seen[webcam_id] = (analyzer, frame.frame_id)
+            #static scenes reuse the last result instead of joining the batch
+            if analyzer.admit_frame(frame):
+                batch.append((analyzer, frame))
+        #drops stopped webcams
+        self.last_frame_ids = seen
+        return batch
+
+    def tick(self):
+        """
+        runs one batched inference call and dispatches results
+        returns int: batch size (0 if nothing new)
+        """
+        batch = self.collect()
+        if not batch:
+            return 0
+
+        #webcams sharing a detector share one call
+        #rawvideo frames are ring views the reader keeps overwriting, they are copied before the
+        #first call so later groups don't infer on frames that moved on
+        groups = {}
+        for analyzer, frame in batch:
+            image = frame.image.copy() if analyzer.frame_bus.ring is not None else frame.image
+            groups.setdefault(self.backend or analyzer.backend, []).append((analyzer, frame, image))
+
+        batch_start = time.monotonic()
+        queue_wait = batch_start - min(frame.timestamp for _, frame in batch)
+        for backend, group in groups.items():
+            name = getattr(backend, 'name', None)
+            try:
+                results = backend.infer_batch([image for _, _, image in group])
+            except Exception as e:
+                #one broken backend doesn't stall the other webcams
+                logger.error("detector=%s batch inference failed: %s", name, e)
+                for analyzer, _, _ in group:
+                    analyzer.set_status('error')
+                continue
+            self.backend_frames[name] = self.backend_frames.get(name, 0) + len(group)
+
+            #dispatches per webcam results to the same handler InferencePipeline uses
+            for (analyzer, frame, _), result in zip(group, results):
+                analyzer.roboflow_sink(result, frame)
+        latency = time.monotonic() - batch_start
+
+        self.batches += 1
+        self.frames += len(batch)
+        self.last_batch_size = len(batch)
+        self.max_batch_size = max(self.max_batch_size, len(batch))
+        self.last_queue_wait = queue_wait
+        self.total_queue_wait += queue_wait
+        self.last_batch_latency = latency
+        self.total_batch_latency += latency
+        return len(batch)
+
+    def stats(self):
+        """
+        returns dict of batch size, queue wait and per batch latency stats
+        """
+        batches = max(self.batches, 1)
+        return {
+            'running': self.running,
+            'backends': dict(self.backend_frames), #detector name -> frames inferred
+            'batches': self.batches,
+            'frames': self.frames,
+            'last_batch_size': self.last_batch_size,
+            'avg_batch_size': self.frames / batches,
+            'max_batch_size': self.max_batch_size,
+            'last_queue_wait_ms': self.last_queue_wait * 1000,
+            'avg_queue_wait_ms': self.total_queue_wait / batches * 1000,
+            'last_batch_latency_ms': self.last_batch_latency * 1000,
+            'avg_batch_latency_ms': self.total_batch_latency / batches * 1000,
+        }
@@ -0,0 +1,280 @@
+import inspect #xarray feature check
+import re #buoy id check
+import threading #single flight refresh locks
+import time #cache ages
+import numpy as np #cached record arrays
+import xarray as xr #OPeNDAP/NetCDF access
+from config import Config #url template, ttl, record count
+from analysis.wave_store import WaveStore #persistent history fed by refreshes
+from log_utils import get_logger #refresh failures
+
+logger = get_logger('buoy_fetcher')
+
+#cached CDIP buoy fetcher
+#every buoy keeps its latest Config.BUOY_CACHE_RECORDS waveTime records in memory
+#stale-while-revalidate: once a buoy has data, requests always answer from memory
+#and a stale buoy is refreshed in the background, one refresh per buoy at a time
+#refreshes are incremental and lean: only the tail of waveTime is compared with the cache,
+#and only records newer than the cached ones are pulled over OPeNDAP, for just the served variables
+
+#CDIP station ids are 3 digits ('067', '273'), anything else never reaches the url template
+BUOY_ID_PATTERN = re.compile(r'\d{3}')
+
+#per record variables served by /api/surfdata
+WAVE_VARIABLES = ('waveFlagPrimary', 'waveHs', 'waveTp', 'waveDp', 'waveTa', 'waveTz', 'wavePeakPSD')
+
+#newer xarray can skip building pandas indexes, which otherwise loads every
+#dimension coordinate of the file (sstTime, gpsTime, waveFrequency, ..) on open
+_SKIP_INDEXES = 'create_default_indexes' in inspect.signature(xr.open_dataset).parameters
+
+
+def valid_buoy_id(buoy_id):
+    """
+    returns bool: true if buoy_id is a CDIP station id
+    """
+    return isinstance(buoy_id, str) and BUOY_ID_PATTERN.fullmatch(buoy_id) is not None
+
+
+def open_wave_dataset(source, **kwargs):
+    """
+    opens a CDIP realtime dataset lazily, nothing but metadata is read
+    source -> OPeNDAP url, local path or file object
+    returns xarray Dataset
+    """
+    if _SKIP_INDEXES:
+        kwargs.setdefault('create_default_indexes', False)
+    return xr.open_dataset(source, **kwargs)
+
+
+def load_wave_records(ds, max_records, newest=None):
+    """
+    reads only waveTime + WAVE_VARIABLES, and only records not cached yet
+    ds -> dataset from open_wave_dataset
+    max_records -> latest records wanted
+    newest -> datetime64 of the newest cached record, None for a full load
+    returns dict of numpy arrays (empty arrays if nothing is new)
+    """
+    start = max(0, ds.sizes['waveTime'] - max_records)
+    #only the tail of waveTime is read, never the whole axis
+    times = ds['waveTime'][start:].values
+    if newest is not None:
+        skip = int(np.searchsorted(times, newest, side='right'))
+        start += skip
+        times = times[skip:]
+    records = {'waveTime': times}
+    for name in WAVE_VARIABLES:
+        records[name] = ds[name][start:].values
+    return records
+
+
+class BuoyRecords:
+    """
+    cached records for one buoy, one numpy array per variable (plus 'waveTime')
+    """
+    def __init__(self, buoy_id):
+        self.buoy_id = buoy_id
+        self.columns = None #name -> numpy array, oldest record first
+        self.fetched_at = None #monotonic time of the last successful refresh
+        self.remote_size = 0 #waveTime length on the server at the last refresh
+        self.last_latency = None #seconds the last refresh took
+        self.last_error = None #message of the last failed refresh, None after a success
+        self.last_requested = None #monotonic time of the last api request
+        self.lock = threading.Lock() #held by the refreshing thread
+
+    def fresh(self, ttl, now=None):
+        """
+        returns bool: true if cached data is younger than ttl
+        """
+        if self.fetched_at is None:
+            return False
+        now = time.monotonic() if now is None else now
+        return now - self.fetched_at < ttl
+
+    def age(self, now=None):
+        """
+        returns float: seconds since the last refresh, None if never fetched
+        """
+        if self.fetched_at is None:
+            return None
+        now = time.monotonic() if now is None else now
+        return now - self.fetched_at
+
+
+class BuoyCache:
+    """
+    per buoy cache in front of the CDIP THREDDS server
+    """
+    def __init__(self, ttl=None, max_records=None, url_template=None, store=None):
+        """
+        ttl -> seconds cached data is served before a refresh
+        max_records -> latest records kept per buoy
+        url_template -> OPeNDAP url or local NetCDF path with a {buoy_id} field
+        store -> WaveStore every refresh is appended to, None keeps nothing on disk
+        """
+        self.ttl = Config.BUOY_CACHE_TTL if ttl is None else ttl
+        self.max_records = max_records or Config.BUOY_CACHE_RECORDS
+        self.url_template = url_template or Config.CDIP_URL_TEMPLATE
+        self.store = store
+        self.buoys = {} #buoy_id -> BuoyRecords
+        self.lock = threading.Lock()
+        self.revalidator = None #callable(buoy_id) that refreshes in the background, set by the prefetcher
+        self.hits = 0 #requests served from cache
+        self.refreshes = 0 #remote datasets opened
+        self.records_pulled = 0 #waveTime records transferred
+
+    def _records(self, buoy_id):
+        """
+        returns BuoyRecords for a buoy, creating it if new
+        """
+        with self.lock:
+            if buoy_id not in self.buoys:
+                self.buoys[buoy_id] = BuoyRecords(buoy_id)
+            return self.buoys[buoy_id]
+
+    def get(self, buoy_id):
+        """
+        returns dict of numpy arrays (waveTime + WAVE_VARIABLES) for a buoy's latest records
+        cached data is returned even when stale, a background refresh is started instead
+        only a cold buoy blocks, and concurrent callers share that one fetch
+        raises whatever xarray raises if the first fetch fails
+        """
+        records = self._records(buoy_id)
+        records.last_requested = time.monotonic()
+        if records.columns is not None:
+            self.hits += 1
+            if not records.fresh(self.ttl):
+                self.revalidate(buoy_id)
+            return records.columns
+        with records.lock:
+            #another thread may have fetched while this one waited
+            if records.columns is not None:
+                self.hits += 1
+                return records.columns
+            self.refresh(records)
+            return records.columns
+
+    def revalidate(self, buoy_id):
+        """
+        refreshes a stale buoy without blocking the caller
+        """
+        if self.revalidator is not None:
+            self.revalidator(buoy_id)
+        else:
+            threading.Thread(target=self.refresh_buoy, args=(buoy_id, False), daemon=True).start()
+
+    def refresh_buoy(self, buoy_id, wait=True):
+        """
+        refreshes one buoy, failures are logged and kept in last_error
+        wait -> if False, returns right away when a refresh is already running
+        returns bool: true if the refresh succeeded
+        """
+        records = self._records(buoy_id)
+        if not records.lock.acquire(blocking=wait):
+            return False
+        try:
+            self.refresh(records)
+            return True
+        except Exception as e:
+            logger.warning("buoy=%s refresh failed: %s", buoy_id, e)
+            return False
+        finally:
+            records.lock.release()
+
+    def refresh(self, records):
+        """
+        pulls only the records newer than the cached ones
+        records -> BuoyRecords to update, caller holds records.lock
+        """
+        started = time.monotonic()
+        try:
+            self._pull(records)
+            records.last_error = None
+        except Exception as e:
+            records.last_error = str(e)
+            raise
+        finally:
+            records.last_latency = time.monotonic() - started
+
+    def _pull(self, records):
+        """
+        opens the dataset and merges records newer than the cache
+        """
+        url = self.url_template.format(buoy_id=records.buoy_id)
+        ds = open_wave_dataset(url)
+        try:
+            self.refreshes += 1
+            remote_size = ds.sizes['waveTime']
+            newest = None
+            if records.columns is not None and len(records.columns['waveTime']):
+                if remote_size == records.remote_size:
+                    #nothing new on the server
+                    records.fetched_at = time.monotonic()
+                    return
+                newest = records.columns['waveTime'][-1]
+
+            pulled = load_wave_records(ds, self.max_records, newest)
+            self.records_pulled += len(pulled['waveTime'])
+            if self.store is not None:
+                self._persist(records.buoy_id, ds, pulled, newest)
+
+            if records.columns is None:
+                records.columns = pulled
+            else:
+                #appends then keeps only the latest max_records
+                records.columns = {
+                    name: np.concatenate((records.columns[name], pulled[name]))[-self.max_records:]
+                    for name in pulled
+                }
+            records.remote_size = remote_size
+            records.fetched_at = time.monotonic()
+        finally:
+            ds.close()
+
+    def _persist(self, buoy_id, ds, pulled, newest):
+        """
+        appends a refresh to the wave store
+        newest -> newest cached record before this refresh, None on the first one
+        if the store doesn't reach the start of this refresh (new buoy, or the app was down)
+        the gap is backfilled from the still open dataset, up to Config.WAVE_STORE_BACKFILL_RECORDS
+        """
+        if not len(pulled['waveTime']):
+            return
+        last = self.store.last_time(buoy_id)
+        reaches = newest if newest is not None else pulled['waveTime'][0]
+        if last is not None and last >= reaches:
+            self.store.append(buoy_id, pulled)
+            return
+        gap = load_wave_records(ds, Config.WAVE_STORE_BACKFILL_RECORDS, last)
+        self.records_pulled += len(gap['waveTime'])
+        self.store.append(buoy_id, gap)
+
+    def clear(self):
+        """
+        drops every cached buoy
+        """
+        with self.lock:
+            self.buoys.clear()
+
+    def stats(self):
+        """
+        returns dict of cache counters and per buoy refresh age/latency
+        """
+        return {
+            'hits': self.hits,
+            'refreshes': self.refreshes,
+            'records_pulled': self.records_pulled,
+            'buoys': {
+                buoy_id: {
+                    'age_seconds': None if records.age() is None else round(records.age(), 1),
+                    'stale': not records.fresh(self.ttl),
+                    'fetch_latency_ms': None if records.last_latency is None else round(records.last_latency * 1000, 1),
+                    'last_error': records.last_error,
+                    'records': 0 if records.columns is None else len(records.columns['waveTime']),
+                }
+                for buoy_id, records in list(self.buoys.items())
+            },
+        }
+
+
+#shared by every request in this process
+buoy_cache = BuoyCache(store=WaveStore() if Config.WAVE_STORE_ENABLED else None)
@@ -0,0 +1,134 @@
+import random #jittered refresh intervals
+import threading #scheduler thread and in flight set
+import time #due times
+from concurrent.futures import ThreadPoolExecutor #bounded refresh concurrency
+from config import Config #prefetch settings
+from buoy_configs import BUOY_CONFIGS #buoys offered by the frontend
+from analysis.buoy_fetcher import buoy_cache, valid_buoy_id #cache kept warm
+from log_utils import get_logger #scheduler errors
+
+logger = get_logger('buoy_prefetcher')
+
+
+class BuoyPrefetcher:
+    """
+    keeps buoy data warm so /api/surfdata never waits on THREDDS
+    refreshes the configured buoys plus a few recently requested ones that fetched fine, each on
+    its own jittered schedule so refreshes don't line up, through a small worker pool
+    also serves the cache's stale-while-revalidate refreshes
+    """
+    def __init__(self, cache=None, buoy_ids=None, interval=None, jitter=None, max_workers=None, recent_seconds=None,
+                 recent_max=None):
+        """
+        cache -> BuoyCache to keep warm, buoy_cache if None
+        buoy_ids -> buoys always kept warm, BUOY_CONFIGS if None
+        interval -> seconds between refreshes of one buoy, should stay below the cache ttl
+        jitter -> fraction the interval is randomly stretched or shrunk by
+        max_workers -> refreshes running at once
+        recent_seconds -> requested buoys outside buoy_ids are kept warm this long after the last request
+        recent_max -> most requested buoys outside buoy_ids kept warm at once, newest requests win
+        """
+        self.cache = cache or buoy_cache
+        self.buoy_ids = list(BUOY_CONFIGS) if buoy_ids is None else list(buoy_ids)
+        self.interval = interval or Config.BUOY_PREFETCH_INTERVAL
+        self.jitter = Config.BUOY_PREFETCH_JITTER if jitter is None else jitter
+        self.max_workers = max_workers or Config.BUOY_PREFETCH_WORKERS
+        self.recent_seconds = recent_seconds or Config.BUOY_PREFETCH_RECENT_SECONDS
+        self.recent_max = recent_max or Config.BUOY_PREFETCH_RECENT_MAX
+        self.due = {} #buoy_id -> monotonic time of the next refresh
+        self.in_flight = set() #buoys queued or refreshing
+        self.lock = threading.Lock()
+        self.executor = None
+        self.thread = None
+        self.stop_event = threading.Event()
+
+    def start(self):
+        """
+        starts the scheduler thread and worker pool, no-op if running
+        """
+        if self.thread and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='buoy-prefetch')
+        self.cache.revalidator = self.submit
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        stops scheduling, queued refreshes are dropped
+        """
+        self.stop_event.set()
+        self.cache.revalidator = None
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def _run(self):
+        """
+        scheduler loop, checks due buoys once a second
+        """
+        while not self.stop_event.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error("prefetch tick failed: %s", e)
+            self.stop_event.wait(1.0)
+
+    def targets(self, now=None):
+        """
+        returns list of buoy ids to keep warm: configured + recently requested
+        a requested buoy only counts once its last fetch succeeded, so made up or dead ids
+        can't keep the workers busy with failing fetches, and at most recent_max are kept
+        """
+        now = time.monotonic() if now is None else now
+        recent = sorted(
+            (
+                (records.last_requested, buoy_id) for buoy_id, records in list(self.cache.buoys.items())
+                if buoy_id not in self.buoy_ids and valid_buoy_id(buoy_id)
+                and records.fetched_at is not None and records.last_error is None
+                and records.last_requested is not None and now - records.last_requested < self.recent_seconds
+            ),
+            reverse=True
+        )[:self.recent_max]
+        return self.buoy_ids + [buoy_id for _, buoy_id in recent]
+
+    def tick(self, now=None):
+        """
+        submits every buoy whose refresh is due
+        returns list of submitted buoy ids
+        """
+        now = time.monotonic() if now is None else now
+        submitted = []
+        for buoy_id in self.targets(now):
+            if self.due.get(buoy_id, 0) <= now and self.submit(buoy_id):
+                submitted.append(buoy_id)
+        return submitted
+
+    def submit(self, buoy_id):
+        """
+        queues a refresh unless one is already queued or running for the buoy
+        returns bool: true if queued
+        """
+        with self.lock:
+            if self.executor is None or buoy_id in self.in_flight:
+                return False
+            self.in_flight.add(buoy_id)
+            self.executor.submit(self._refresh, buoy_id)
+        return True
+
+    def _refresh(self, buoy_id):
+        """
+        worker: refreshes one buoy then schedules its next refresh
+        """
+        try:
+            self.cache.refresh_buoy(buoy_id)
+        finally:
+            spread = random.uniform(-self.jitter, self.jitter)
+            with self.lock:
+                self.due[buoy_id] = time.monotonic() + self.interval * (1 + spread)
+                self.in_flight.discard(buoy_id)
+
+
+#shared by every request in this process, started from app.py
+buoy_prefetcher = BuoyPrefetcher()
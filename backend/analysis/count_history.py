@@ -0,0 +1,202 @@
+import threading #ring writes vs api reads
+import time #sample timestamps
+import numpy as np #fixed size ring arrays
+from config import Config #ring sizes
+
+#surfer count history per webcam
+#three fixed size rings, memory never grows with uptime:
+#raw -> every inference result
+#1m -> 1 minute buckets (avg/max)
+#15m -> 15 minute buckets (avg/max)
+
+#resolution name -> bucket seconds (0 = raw samples)
+RESOLUTIONS = {'raw': 0, '1m': 60, '15m': 900}
+
+
+class CountRing:
+    """
+    fixed capacity ring of (timestamp, avg, max) rows
+    raw rings store one row per sample, bucketed rings fold samples into the current bucket
+    """
+    def __init__(self, capacity, bucket_seconds=0):
+        """
+        capacity -> rows kept, older rows are overwritten
+        bucket_seconds -> bucket width, 0 keeps every sample
+        """
+        self.capacity = capacity
+        self.bucket_seconds = bucket_seconds
+        self.times = np.zeros(capacity, dtype=np.float64) #sample time or bucket start, unix seconds
+        self.avg = np.zeros(capacity, dtype=np.float32)
+        self.max = np.zeros(capacity, dtype=np.int16)
+        self.sums = np.zeros(capacity, dtype=np.float32) #running bucket sums
+        self.samples = np.zeros(capacity, dtype=np.int32) #samples per bucket
+        self.written = 0 #rows ever written, next row goes to written % capacity
+
+    def append(self, timestamp, count):
+        """
+        adds one sample, timestamps must not go backwards
+        """
+        if self.bucket_seconds:
+            start = timestamp - timestamp % self.bucket_seconds
+            last = (self.written - 1) % self.capacity
+            if self.written and self.times[last] == start:
+                #same bucket, fold in place
+                self.sums[last] += count
+                self.samples[last] += 1
+                self.avg[last] = self.sums[last] / self.samples[last]
+                self.max[last] = max(self.max[last], count)
+                return
+            timestamp = start
+        row = self.written % self.capacity
+        self.times[row] = timestamp
+        self.avg[row] = count
+        self.max[row] = count
+        self.sums[row] = count
+        self.samples[row] = 1
+        self.written += 1
+
+    def _segments(self):
+        """
+        returns the filled part of the ring as at most two chronological slices
+        """
+        if self.written <= self.capacity:
+            return [slice(0, self.written)]
+        head = self.written % self.capacity
+        return [slice(head, self.capacity), slice(0, head)]
+
+    def covers(self, start):
+        """
+        returns bool: true if nothing older than start was overwritten yet
+        """
+        if self.written <= self.capacity:
+            return True
+        return self.times[self.written % self.capacity] <= start
+
+    def window(self, start, end):
+        """
+        rows with start <= timestamp <= end
+        each segment is sorted, so the window is found with searchsorted and only
+        the matching rows are copied, never the whole ring
+        returns (times, avg, max) numpy arrays
+        """
+        parts = []
+        for segment in self._segments():
+            times = self.times[segment]
+            lo = np.searchsorted(times, start, side='left')
+            hi = np.searchsorted(times, end, side='right')
+            if hi > lo:
+                offset = segment.start
+                parts.append(slice(offset + lo, offset + hi))
+        if not parts:
+            return np.empty(0), np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int16)
+        if len(parts) == 1:
+            part = parts[0]
+            return self.times[part].copy(), self.avg[part].copy(), self.max[part].copy()
+        return (
+            np.concatenate([self.times[part] for part in parts]),
+            np.concatenate([self.avg[part] for part in parts]),
+            np.concatenate([self.max[part] for part in parts]),
+        )
+
+    def nbytes(self):
+        """
+        returns int: bytes held by the ring arrays
+        """
+        return self.times.nbytes + self.avg.nbytes + self.max.nbytes + self.sums.nbytes + self.samples.nbytes
+
+
+class CountHistory:
+    """
+    raw + rollup rings for one webcam
+    """
+    def __init__(self, webcam_id, raw_size=None, minute_size=None, quarter_size=None):
+        """
+        webcam_id -> webcam this history belongs to
+        raw_size -> raw samples kept
+        minute_size -> 1 minute buckets kept
+        quarter_size -> 15 minute buckets kept
+        """
+        self.webcam_id = webcam_id
+        self.rings = {
+            'raw': CountRing(raw_size or Config.HISTORY_RAW_SIZE, RESOLUTIONS['raw']),
+            '1m': CountRing(minute_size or Config.HISTORY_MINUTE_SIZE, RESOLUTIONS['1m']),
+            '15m': CountRing(quarter_size or Config.HISTORY_QUARTER_SIZE, RESOLUTIONS['15m']),
+        }
+        self.lock = threading.Lock()
+
+    def record(self, count, timestamp=None):
+        """
+        adds a surfer count to every resolution
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        with self.lock:
+            for ring in self.rings.values():
+                ring.append(timestamp, count)
+
+    def pick_resolution(self, start):
+        """
+        returns the finest resolution whose ring still reaches back to start
+        """
+        with self.lock:
+            for name, ring in self.rings.items():
+                if ring.covers(start):
+                    return name
+        return '15m'
+
+    def window(self, start=None, end=None, resolution=None):
+        """
+        start/end -> unix seconds, defaults to the last hour
+        resolution -> 'raw', '1m' or '15m', finest one still covering start if None
+        returns dict ready for the api
+        raises ValueError for unknown resolutions
+        """
+        end = time.time() if end is None else end
+        start = end - 3600 if start is None else start
+        resolution = resolution or self.pick_resolution(start)
+        if resolution not in self.rings:
+            raise ValueError(f"Unknown resolution: {resolution}")
+        with self.lock:
+            times, avg, peak = self.rings[resolution].window(start, end)
+        return {
+            'webcam_id': self.webcam_id,
+            'resolution': resolution,
+            'start': start,
+            'end': end,
+            'timestamps': times.tolist(),
+            'avg': np.round(avg.astype(np.float64), 2).tolist(),
+            'max': peak.tolist(),
+        }
+
+    def nbytes(self):
+        """
+        returns int: bytes held by every ring
+        """
+        return sum(ring.nbytes() for ring in self.rings.values())
+
+
+class HistoryRegistry:
+    """
+    one CountHistory per webcam, kept across analysis restarts
+    """
+    def __init__(self):
+        self.histories = {}
+        self.lock = threading.Lock()
+
+    def get(self, webcam_id):
+        """
+        returns CountHistory for a webcam, creating it if new
+        """
+        with self.lock:
+            if webcam_id not in self.histories:
+                self.histories[webcam_id] = CountHistory(webcam_id)
+            return self.histories[webcam_id]
+
+    def find(self, webcam_id):
+        """
+        returns CountHistory or None if the webcam never reported
+        """
+        return self.histories.get(webcam_id)
+
+
+#shared by every LiveStreamAnalyzer in this process
+count_histories = HistoryRegistry()
@@ -0,0 +1,275 @@
+import threading #vocabulary lock
+import time #result timestamps
+from itertools import chain #flat fromiter over per prediction fields
+from operator import itemgetter #C level field access for the vectorized builders
+import numpy as np #array backed detections
+
+#normalized detection results
+#every result format the inference side produces (sv.Detections, row tuples, prediction dicts)
+#goes through normalize_result() once and comes out as a FrameResult:
+#boxes float32 (N, 4) xyxy, confidences float32 (N,), class_ids int16 (N,)
+
+
+class ClassVocabulary:
+    """
+    interns class names to small ints shared by every webcam
+    lookups are case insensitive, the first spelling seen is kept for display
+    """
+    def __init__(self):
+        self.ids = {} #lowercase name -> id
+        self.names = [] #id -> display name
+        self.exact = {} #name as spelled by the model -> id, lets repeat frames skip lower()
+        self.lock = threading.Lock()
+
+    def id_for(self, name):
+        """
+        returns int id for a class name, adding it if new
+        """
+        key = name.lower() if isinstance(name, str) else ''
+        class_id = self.ids.get(key)
+        if class_id is None:
+            with self.lock:
+                class_id = self.ids.get(key)
+                if class_id is None:
+                    class_id = len(self.names)
+                    self.names.append(name if isinstance(name, str) else '')
+                    self.ids[key] = class_id
+        if isinstance(name, str):
+            self.exact[name] = class_id
+        return class_id
+
+    def lookup(self, name):
+        """
+        returns int id, or -1 if the class was never seen
+        """
+        return self.ids.get(name.lower(), -1)
+
+
+#process wide vocabulary so class ids match across webcams and history
+CLASSES = ClassVocabulary()
+
+
+class Detection:
+    """
+    single detection, materialized on demand from a FrameResult
+    """
+    __slots__ = ('x1', 'y1', 'x2', 'y2', 'confidence', 'class_id', 'class_name')
+
+    def __init__(self, x1, y1, x2, y2, confidence, class_id, class_name):
+        self.x1 = x1
+        self.y1 = y1
+        self.x2 = x2
+        self.y2 = y2
+        self.confidence = confidence
+        self.class_id = class_id
+        self.class_name = class_name
+
+    def __repr__(self):
+        return f"Detection({self.class_name}, {self.confidence:.2f}, [{self.x1:.0f}, {self.y1:.0f}, {self.x2:.0f}, {self.y2:.0f}])"
+
+
+class FrameResult:
+    """
+    all detections for one frame, stored as three small numpy arrays
+    no per detection python objects, cheap to keep in memory for many webcams
+    """
+    __slots__ = ('boxes', 'confidences', 'class_ids', 'timestamp')
+
+    def __init__(self, boxes, confidences, class_ids, timestamp=None):
+        """
+        boxes -> float32 (N, 4) xyxy pixel boxes
+        confidences -> float32 (N,)
+        class_ids -> int16 (N,), ids from CLASSES
+        timestamp -> unix time of the result
+        """
+        self.boxes = boxes
+        self.confidences = confidences
+        self.class_ids = class_ids
+        self.timestamp = time.time() if timestamp is None else timestamp
+
+    @classmethod
+    def empty(cls, timestamp=None):
+        """
+        returns FrameResult with no detections
+        """
+        return cls(
+            np.empty((0, 4), dtype=np.float32),
+            np.empty(0, dtype=np.float32),
+            np.empty(0, dtype=np.int16),
+            timestamp
+        )
+
+    def __len__(self):
+        return len(self.class_ids)
+
+    def __iter__(self):
+        for box, confidence, class_id in zip(self.boxes.tolist(), self.confidences.tolist(), self.class_ids.tolist()):
+            yield Detection(*box, confidence, class_id, CLASSES.names[class_id])
+
+    def count(self, class_name, min_confidence=0.0):
+        """
+        returns int: detections of a class (case insensitive), vectorized
+        """
+        class_id = CLASSES.lookup(class_name)
+        if class_id < 0:
+            return 0
+        mask = self.class_ids == class_id
+        if min_confidence:
+            mask &= self.confidences >= min_confidence
+        return int(np.count_nonzero(mask))
+
+    def to_dict(self):
+        """
+        returns JSON ready dict for the api
+        """
+        return {
+            #rounded as float64 so JSON doesn't carry float32 noise
+            'boxes': np.round(self.boxes.astype(np.float64), 1).tolist(),
+            'confidences': np.round(self.confidences.astype(np.float64), 3).tolist(),
+            'classes': [CLASSES.names[i] for i in self.class_ids.tolist()],
+        }
+
+
+def _class_ids(names):
+    """
+    returns int16 array of class ids for a list of names
+    each distinct name is interned once, the rest is a dict lookup
+    """
+    try:
+        #every spelling already seen, the common case once a webcam is running
+        return np.fromiter(map(CLASSES.exact.__getitem__, names), dtype=np.int16, count=len(names))
+    except (KeyError, TypeError):
+        pass
+    table = {name: CLASSES.id_for(name) for name in set(names)}
+    return np.fromiter(map(table.__getitem__, names), dtype=np.int16, count=len(names))
+
+
+def _from_detections(detections, timestamp):
+    """
+    sv.Detections (InferencePipeline workflow output), already array backed
+    """
+    boxes = np.asarray(detections.xyxy, dtype=np.float32).reshape(-1, 4)
+    n = len(boxes)
+    confidence = getattr(detections, 'confidence', None)
+    confidences = np.zeros(n, dtype=np.float32) if confidence is None else np.asarray(confidence, dtype=np.float32)
+    #interns each distinct class once, then maps back with the inverse index
+    names, inverse = np.unique(np.asarray(detections.data['class_name'], dtype=str), return_inverse=True)
+    ids = np.array([CLASSES.id_for(name) for name in names.tolist()], dtype=np.int16)
+    class_ids = ids[inverse.reshape(-1)] if n else np.empty(0, dtype=np.int16)
+    return FrameResult(boxes, confidences, class_ids, timestamp)
+
+
+_box = itemgetter(0)
+_confidence = itemgetter(2)
+
+
+def _from_tuples(predictions, timestamp):
+    """
+    sv.Detections row tuples (xyxy, mask, confidence, class_id, tracker_id, data)
+    """
+    n = len(predictions)
+    boxes = np.fromiter(chain.from_iterable(map(_box, predictions)), dtype=np.float32, count=n * 4).reshape(n, 4)
+    confidences = np.fromiter(map(_confidence, predictions), dtype=np.float32, count=n)
+    class_ids = _class_ids([p[5].get('class_name', '') for p in predictions])
+    return FrameResult(boxes, confidences, class_ids, timestamp)
+
+
+_dict_fields = itemgetter('x', 'y', 'width', 'height', 'confidence')
+_dict_class = itemgetter('class')
+
+
+def _from_dicts(predictions, timestamp):
+    """
+    serialized roboflow predictions, center x/y + width/height boxes
+    dicts missing a field go through _from_mixed, which defaults it
+    """
+    n = len(predictions)
+    #x, y, width, height, confidence per prediction in one flat pass
+    fields = np.fromiter(
+        chain.from_iterable(map(_dict_fields, predictions)), dtype=np.float32, count=n * 5
+    ).reshape(n, 5)
+    half = fields[:, 2:4] / 2
+    boxes = np.hstack((fields[:, :2] - half, fields[:, :2] + half))
+    try:
+        names = list(map(_dict_class, predictions))
+    except KeyError:
+        names = [p.get('class', p.get('class_name', '')) for p in predictions]
+    return FrameResult(boxes, np.ascontiguousarray(fields[:, 4]), _class_ids(names), timestamp)
+
+
+def _float(value):
+    """
+    returns float, 0.0 for anything that isn't a number
+    """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _row(prediction):
+    """
+    returns (xyxy box, confidence, class name) for one prediction of any format, or None
+    """
+    if isinstance(prediction, tuple) and len(prediction) >= 6 and isinstance(prediction[5], dict):
+        try:
+            box = [float(v) for v in np.asarray(prediction[0], dtype=np.float32).reshape(4)]
+        except (TypeError, ValueError):
+            box = [0.0, 0.0, 0.0, 0.0]
+        return box, _float(prediction[2]), str(prediction[5].get('class_name', ''))
+    if isinstance(prediction, dict):
+        x, y = _float(prediction.get('x')), _float(prediction.get('y'))
+        w, h = _float(prediction.get('width')), _float(prediction.get('height'))
+        box = [x - w / 2, y - h / 2, x + w / 2, y + h / 2]
+        return box, _float(prediction.get('confidence')), str(prediction.get('class', prediction.get('class_name', '')))
+    return None
+
+
+def _from_mixed(predictions, timestamp):
+    """
+    slow path for mixed or malformed prediction lists, one prediction at a time
+    """
+    rows = [row for row in map(_row, predictions) if row is not None]
+    if not rows:
+        return FrameResult.empty(timestamp)
+    n = len(rows)
+    return FrameResult(
+        np.array([row[0] for row in rows], dtype=np.float32).reshape(n, 4),
+        np.array([row[1] for row in rows], dtype=np.float32),
+        _class_ids([row[2] for row in rows]),
+        timestamp
+    )
+
+
+def normalize_result(result, timestamp=None):
+    """
+    single normalizer for every inference result format
+    result -> InferencePipeline/scheduler result: dict with 'predictions'
+              (sv.Detections, list of tuples or list of dicts), optionally wrapped in a tuple
+    returns FrameResult (empty if the result has no predictions)
+    """
+    timestamp = time.time() if timestamp is None else timestamp
+    if isinstance(result, FrameResult):
+        return result
+    data = result[0] if isinstance(result, tuple) and result else result
+    if not isinstance(data, dict) or 'predictions' not in data:
+        return FrameResult.empty(timestamp)
+
+    predictions = data['predictions']
+    if isinstance(predictions, FrameResult):
+        return predictions
+    detections_data = getattr(predictions, 'data', None)
+    if isinstance(detections_data, dict) and 'class_name' in detections_data:
+        return _from_detections(predictions, timestamp)
+    if isinstance(predictions, dict) and 'predictions' in predictions:
+        #serialized workflow output nests the prediction list one level down
+        predictions = predictions['predictions']
+    if not predictions:
+        return FrameResult.empty(timestamp)
+
+    #format picked once from the first prediction, mixed lists fall back
+    builder = _from_tuples if isinstance(predictions[0], tuple) else _from_dicts
+    try:
+        return builder(predictions, timestamp)
+    except (TypeError, KeyError, IndexError, AttributeError, ValueError):
+        return _from_mixed(predictions, timestamp)
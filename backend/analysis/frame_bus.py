@@ -0,0 +1,257 @@
+import threading #reader thread + frame condition
+import time #frame timestamps
+import numpy as np #wraps JPEG bytes for decoding
+import cv2 #decodes JPEG frames once for inference
+from inference.core.interfaces.camera.entities import VideoFrameProducer, SourceProperties
+from config import Config #stream settings
+from analysis.mjpeg_broadcaster import JpegFrameParser, MJPEGBroadcaster
+from log_utils import get_logger #reader errors
+
+logger = get_logger('frame_bus')
+
+
+class BusFrame:
+    """
+    one frame published on the bus
+    jpeg -> JPEG bytes for viewers (from ffmpeg in mjpeg mode, lazily encoded in rawvideo mode)
+    image -> decoded BGR array (handed to inference)
+    """
+    __slots__ = ('frame_id', 'jpeg', 'image', 'timestamp')
+
+    def __init__(self, frame_id, jpeg, image, timestamp):
+        self.frame_id = frame_id
+        self.jpeg = jpeg
+        self.image = image
+        self.timestamp = timestamp #time.monotonic() when the frame left ffmpeg
+
+
+class FrameBus:
+    """
+    in-process frame bus for one webcam
+    ffmpeg writes frames to its stdout pipe, one reader thread publishes
+    each frame once to every subscriber
+    mjpeg mode -> JPEGs are split and decoded once, viewers get the original bytes
+    rawvideo mode -> bgr24 frames are read straight into a preallocated ring of arrays with
+    no per-frame allocation, inference copies only the frames it admits, viewers get a JPEG
+    only if watching
+    replaces the ffmpeg -listen http server, which only serves one client
+    """
+    def __init__(self, webcam_id, ingest_mode=None, resolution=None, ring_size=None, metrics=None):
+        """
+        webcam_id -> webcam this bus carries frames for (used in logs)
+        ingest_mode -> 'mjpeg' or 'rawvideo', defaults to Config.FFMPEG_INGEST_MODE
+        resolution -> 'WIDTHxHEIGHT' of ffmpeg's output, defaults to Config.FFMPEG_RESOLUTION
+        ring_size -> rawvideo frame buffers, a frame is overwritten ring_size frames later
+        metrics -> optional PipelineMetrics, gets frame interval and decode times
+        """
+        self.webcam_id = webcam_id
+        self.ingest_mode = ingest_mode or Config.FFMPEG_INGEST_MODE
+        width, height = (int(v) for v in (resolution or Config.FFMPEG_RESOLUTION).split('x'))
+        self.frame_shape = (height, width, 3)
+        self.ring_size = ring_size or Config.FRAME_RING_SIZE
+        self.ring = None #rawvideo buffers, allocated on first attach
+        self.broadcaster = MJPEGBroadcaster() #mjpeg viewers
+        self.condition = threading.Condition()
+        self.latest = None #latest BusFrame
+        self.frame_count = 0
+        self.decode_errors = 0
+        self.running = False
+        self.reader_thread = None
+        self.metrics = metrics
+
+    def attach(self, pipe):
+        """
+        starts reading frames from an ffmpeg stdout pipe
+        called again with the new pipe whenever ffmpeg restarts
+        """
+        with self.condition:
+            self.running = True
+        self.broadcaster.start()
+        self.reader_thread = threading.Thread(target=self._read_loop, args=(pipe,), daemon=True)
+        self.reader_thread.start()
+
+    def stop(self):
+        """
+        stops the bus, wakes any waiting consumers, ends viewer streams
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.broadcaster.stop()
+
+    def _read_loop(self, pipe):
+        """
+        reads the pipe until ffmpeg exits or the bus stops
+        """
+        if self.ingest_mode == 'rawvideo':
+            self._read_raw_loop(pipe)
+        else:
+            self._read_mjpeg_loop(pipe)
+
+    def _read_mjpeg_loop(self, pipe):
+        """
+        splits JPEGs out of ffmpeg's mjpeg output
+        """
+        parser = JpegFrameParser()
+        read = getattr(pipe, 'read1', pipe.read)
+        try:
+            while self.running:
+                chunk = read(Config.STREAM_READ_CHUNK_BYTES)
+                if not chunk:
+                    break #ffmpeg exited, the pipeline supervisor restarts it
+                for jpeg in parser.feed(chunk):
+                    self.publish_jpeg(jpeg)
+        except Exception as e:
+            if self.running:
+                logger.error("webcam=%s frame bus read error: %s", self.webcam_id, e)
+
+    def _read_raw_loop(self, pipe):
+        """
+        reads fixed size bgr24 frames into the ring with readinto
+        the memoryview lets partial reads land directly in the array
+        """
+        if self.ring is None:
+            self.ring = [np.empty(self.frame_shape, dtype=np.uint8) for _ in range(self.ring_size)]
+        views = [memoryview(buffer).cast('B') for buffer in self.ring]
+        frame_bytes = len(views[0])
+        slot = 0
+        try:
+            while self.running:
+                view = views[slot]
+                got = 0
+                while got < frame_bytes:
+                    n = pipe.readinto(view[got:])
+                    if not n:
+                        return #ffmpeg exited, drops the partial frame
+                    got += n
+                self.publish_image(self.ring[slot])
+                slot = (slot + 1) % self.ring_size
+        except Exception as e:
+            if self.running:
+                logger.error("webcam=%s frame bus read error: %s", self.webcam_id, e)
+
+    def publish_image(self, image):
+        """
+        publishes one raw frame (a ring buffer view, not a copy)
+        the slot is overwritten ring_size frames later, anything holding the array longer
+        than that (inference) must copy it, see BusFrameProducer.retrieve
+        JPEG is encoded only when a viewer is connected
+        """
+        timestamp = time.monotonic()
+        jpeg = None
+        if self.broadcaster.client_count():
+            ok, encoded = cv2.imencode('.jpg', image)
+            if ok:
+                jpeg = encoded.tobytes()
+                self.broadcaster.publish(jpeg)
+
+        self._publish(BusFrame(0, jpeg, image, timestamp))
+
+    def publish_jpeg(self, jpeg):
+        """
+        publishes one complete JPEG frame
+        viewers get the bytes untouched, inference gets a single decode
+        """
+        timestamp = time.monotonic()
+        self.broadcaster.publish(jpeg)
+
+        image = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            self.decode_errors += 1
+            return
+
+        self._publish(BusFrame(0, jpeg, image, timestamp))
+
+    def _publish(self, frame):
+        """
+        numbers a frame, makes it the latest and wakes consumers
+        """
+        if self.metrics is not None:
+            if self.latest is not None:
+                self.metrics.observe('frame_interval', frame.timestamp - self.latest.timestamp)
+            self.metrics.observe('decode', time.monotonic() - frame.timestamp)
+        with self.condition:
+            self.frame_count += 1
+            frame.frame_id = self.frame_count
+            self.latest = frame
+            self.condition.notify_all()
+
+    def wait_for_frame(self, after_id=0, timeout=None):
+        """
+        blocks until a frame newer than after_id is published
+        returns BusFrame, or None on timeout / bus stopped
+        """
+        with self.condition:
+            self.condition.wait_for(
+                lambda: not self.running or (self.latest is not None and self.latest.frame_id > after_id),
+                timeout=timeout
+            )
+            if self.latest is not None and self.latest.frame_id > after_id:
+                return self.latest
+            return None
+
+    def producer_factory(self, admit=None):
+        """
+        returns callable for InferencePipeline's video_reference
+        the pipeline calls it (again on reconnect) to get a frame producer
+        admit -> optional callable(BusFrame) -> bool, frames it rejects are never handed to inference
+        """
+        return lambda: BusFrameProducer(self, admit)
+
+
+class BusFrameProducer(VideoFrameProducer):
+    """
+    cv2.VideoCapture-like adapter so InferencePipeline reads from the bus
+    instead of opening its own connection to ffmpeg
+    """
+    def __init__(self, bus, admit=None):
+        self.bus = bus
+        self.admit = admit
+        self.frame = None
+        self.last_id = 0
+        self.released = False
+
+    def grab(self):
+        """
+        waits for the next admitted frame on the bus
+        returns bool: false if the bus stopped or no frame arrived in time
+        """
+        while True:
+            frame = self.bus.wait_for_frame(self.last_id, timeout=Config.FFMPEG_TIMEOUT)
+            if frame is None:
+                return False
+            self.last_id = frame.frame_id
+            if self.admit is None or self.admit(frame):
+                self.frame = frame
+                return True
+
+    def retrieve(self):
+        """
+        returns (bool, ndarray) for the last grabbed frame
+        rawvideo frames are copied out of the ring, InferencePipeline buffers them and infers
+        on another thread long after the reader has lapped the ring
+        """
+        if self.frame is None:
+            return False, None
+        if self.bus.ring is not None:
+            return True, self.frame.image.copy()
+        return True, self.frame.image
+
+    def release(self):
+        self.released = True
+
+    def isOpened(self):
+        return not self.released and self.bus.running
+
+    def discover_source_properties(self):
+        """
+        returns SourceProperties for the live ffmpeg output
+        """
+        width, height = (int(v) for v in Config.FFMPEG_RESOLUTION.split('x'))
+        return SourceProperties(
+            width=width,
+            height=height,
+            total_frames=-1,
+            is_file=False,
+            fps=Config.MAX_FPS
+        )
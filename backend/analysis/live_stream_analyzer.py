@@ -2,170 +2,330 @@ import threading #enables concurrent execution for running multiple streams simu
 import time #time related functions (delays, etc)
 import subprocess #enables spawning of new processes (for FFmpeg vid conversion)
 import traceback #for debugging - detailed error info
+import logging #log levels for the sink's debug detail
 from datetime import datetime #timestamping analysis results
 from inference import InferencePipeline #roboflow's inference pipeline for object detection
 from config import Config #configuration settings (API keys, ports, etc)
+from analysis.frame_bus import FrameBus #single decode frame bus shared by viewers and inference
+from analysis.motion_gate import MotionGate #skips inference on static scenes
+from analysis.rate_controller import AdaptiveRateController #adapts inference rate to the lineup
+from analysis.detections import normalize_result #single normalizer -> array backed FrameResult
+from analysis.count_history import count_histories #bounded per webcam surfer count history
+from analysis.result_events import result_events #pushes count/status changes to subscribers
+from analysis.results_store import results_store #latest result per webcam, read by the api routes
+from analysis.stage_metrics import PipelineMetrics, process_usage #per stage latency, ffmpeg cpu/rss for /metrics
+from analysis.model_registry import model_registry #models shared by every webcam, loaded once
+from analysis.roboflow_utils import create_backend, create_model_manager #model loaders
+from log_utils import get_logger #queue backed logger, keeps stdout I/O off the inference thread
+
+logger = get_logger('live_stream_analyzer')
 
 class LiveStreamAnalyzer:
     """
     main class responsible for analyzing live vid streams to detect surfers
-    ffmpeg process -> convers HLS to MJPEG
+    ffmpeg process -> convers HLS to MJPEG on its stdout pipe
+    frame bus -> decodes each frame once for viewers and inference
     #roboflow pipeline -> inference to detect surfers
     #results management -> stores and updates detection results
     """
-    def __init__(self, webcam_id, hls_url):
+    def __init__(self, webcam_id, hls_url, motion_threshold=None, detector=None):
         """
         initlaizes live stream analyzer for specific webcam (surfcam)
         webcam_id -> unique identifier for webcam
         hls_url -> HLS url from webcam source
-        sets up stream conversion params, por allocation for local MJPEG stream, inital result state
+        motion_threshold -> per webcam motion gate threshold, Config default if None
+        detector -> per webcam local detector backend ('onnx', 'roboflow', 'fake'), runs the
+        webcam on the batch scheduler whatever Config.INFERENCE_MODE is
+        sets up stream conversion params, in-process frame bus, inital result state
         """
         self.webcam_id = webcam_id #unique id for webcam instance
         self.hls_url = hls_url #source webcam HLS url
         self.ffmpeg_process = None #will hold ffmpeg subprocess
         self.pipeline = None #will hold roboflow inference pipeline
-        #unique port for webcam's local mjpeg stream
-        self.port_number = Config.BASE_PORT + int(webcam_id) if webcam_id.isdigit() else Config.BASE_PORT + 1
-        self.stream_url = f"http://localhost:{self.port_number}/stream.mjpeg"
+        self.pipeline_thread = None #runs the pipeline, exits when inference stops
+        self.lifecycle_lock = threading.Lock() #restarts vs stop, so a stopped analyzer never respawns
+        self.stopping = False
+        #'batched' webcams are inferred by the shared BatchInferenceScheduler instead
+        self.inference_mode = 'batched' if detector else Config.INFERENCE_MODE
+        self.detector = detector or Config.INFERENCE_BACKEND #batch scheduler backend name
+        self.model_key = None #model_registry key this webcam holds a reference on
+        self.backend = None #batched mode DetectorBackend, shared with other webcams
+        self.model_manager = None #pipeline mode roboflow ModelManager, shared by every InferencePipeline
+        #skips inference when the scene has not changed since the last inferred frame
+        self.motion_gate = MotionGate(threshold=motion_threshold) if Config.MOTION_GATE_ENABLED else None
+        #speeds inference up when the lineup changes, slows it down when it's quiet
+        self.rate_controller = AdaptiveRateController(webcam_id) if Config.ADAPTIVE_FPS_ENABLED else None
+        self.count_history = count_histories.get(webcam_id) #kept across restarts of this webcam
+        self.metrics = PipelineMetrics(webcam_id) #stage latency, drops, restarts
+        #frames from ffmpeg's stdout, shared by /video_feed viewers and inference
+        self.frame_bus = FrameBus(webcam_id, metrics=self.metrics)
+        self.started_at = None #time.monotonic() when start_analysis was called
+        self.first_frame_seconds = None #start to first frame on the bus
+        self.startup_seconds = None #start to first online result
         self.latest_result = {
             'surfer_count': 0,
             'status': 'Starting',
-            'last_update': None
+            'last_update': None,
+            'detections': None #FrameResult of the last inferred frame
         }
     
-    #
     def roboflow_sink(self, result, video_frame):
         """
         callback function processes results from roboflow inference
         result -> inference result containing detection data
         video_frame -> actual vid frame
-        handles tuples, dicts
+        handles tuples, dicts, sv.Detections
+        runs on the inference thread every frame, so no per prediction work or stdout I/O
+        unless DEBUG logging is turned on
         """
+        sink_start = time.monotonic()
         try:
-            #intializes surfer count
-            surfer_count = 0
-            #debugging - data structure received
-            print(f"Result type: {type(result)}")
-            
-            data = result
-            #Checks if 'result' is a tuple
-            if isinstance(result, tuple):
-                print(f"Tuple length: {len(result)}")
-                data = result[0]
-            
-            #Checks if data is 'dict' and 'predicitons' key exists
-            if isinstance(data, dict) and 'predictions' in data:
-                print(f"Found predictions, count: {len(data['predictions'])}")
-
-                #loops through each prediciton
-                #enumerate gives index and item
-                for i, prediction in enumerate(data['predictions']):
-                    print(f"Prediction {i} type: {type(prediction)}")
-                    # checks if prediciton is tuple
-                    if isinstance(prediction, tuple) and len(prediction) >= 6:
-                        print(f"Prediction is tuple with {len(prediction)} elements")
-                        #extracts metadata and gets surfer count
-                        metadata = prediction[5] if len(prediction) > 5 else {}
-                        #checks if metadata is dict
-                        if isinstance(metadata, dict):
-                            #extracts class_name
-                            class_name = metadata.get('class_name', '')
-                            print(f"Class name from metadata: {class_name}")
-                            #checks if class_name is 'Surfer'
-                            #increments counter accordingly
-                            if class_name.lower() == 'surfer':
-                                surfer_count += 1
-                    #alternative, checks if prediciton is dict
-                    elif isinstance(prediction, dict):
-                        #checks class_name
-                        class_name = prediction.get('class', prediction.get('class_name', ''))
-                        print(f"Class name from dict: {class_name}")
-                        #checks if class_name is 'Surfer
-                        #increments counter accordingly
-                        if class_name.lower() == 'surfer':
-                            surfer_count += 1
-            else:
-                #debugging print if DS is unexpected
-                print(f"Data is not a dict with predictions: {type(data)}")
+            #tuples, dicts and sv.Detections all become one array backed FrameResult
+            detections = normalize_result(result)
+            surfer_count = detections.count('surfer')
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("webcam=%s result=%s detections=%s", self.webcam_id, type(result).__name__, list(detections))
 
+            previous_count = self.latest_result['surfer_count']
             #updates latest result
             self.latest_result = {
                 'surfer_count': surfer_count,
                 'status': 'online',
-                'last_update': datetime.now().isoformat()
+                'last_update': datetime.now().isoformat(),
+                'detections': detections
             }
 
-            # Import here to avoid circular imports
-            from routes.video_analysis import analysis_results
-            #stores global results
-            analysis_results[self.webcam_id] = self.latest_result
-            print(f"Updated Analysis for {self.webcam_id}: {surfer_count} surfers detected")
+            sink_done = time.monotonic()
+            self.publish_result()
+            self.metrics.inferred(sink_start, sink_done, time.monotonic())
+            self.count_history.record(surfer_count)
+            if self.rate_controller:
+                self.rate_controller.observe(surfer_count)
+            if surfer_count != previous_count:
+                logger.info("webcam=%s surfer_count=%d", self.webcam_id, surfer_count)
 
         except Exception as e:
-            print(f"Error Processing Result: {e}")
-            print(f"Error location: {traceback.format_exc()}")
-            self.latest_result['status'] = 'error'
+            logger.error("webcam=%s error processing result: %s\n%s", self.webcam_id, e, traceback.format_exc())
+            self.set_status('error')
+
+    def publish_result(self):
+        """
+        stores latest result in the global results read by the api routes
+        latest_result is replaced, never mutated, once published
+        """
+        if self.startup_seconds is None and self.started_at and self.latest_result['status'] == 'online':
+            self.startup_seconds = time.monotonic() - self.started_at
+            logger.info("webcam=%s first result after %.2fs", self.webcam_id, self.startup_seconds)
+        results_store.publish(self.webcam_id, self.latest_result)
+        #wakes event stream subscribers only if the count or status changed
+        result_events.publish(self.webcam_id, self.latest_result)
+
+    def set_status(self, status):
+        """
+        updates the status of the current result and publishes it
+        """
+        self.latest_result = dict(self.latest_result, status=status)
+        self.publish_result()
+
+    def admit_frame(self, frame):
+        """
+        decides if a bus frame goes to inference
+        frame -> BusFrame from the frame bus
+        frames arriving faster than the adaptive rate are dropped
+        gated frames reuse the previous result, only its timestamp is refreshed
+        returns bool: true if the frame should be inferred
+        """
+        metrics = self.metrics
+        metrics.frames_seen += 1
+        if self.rate_controller and not self.rate_controller.ready():
+            metrics.drops['rate_limited'] += 1
+            return False
+        if self.motion_gate is None or self.motion_gate.should_infer(frame.image):
+            if self.rate_controller:
+                self.rate_controller.mark_inferred()
+            metrics.admitted(frame.timestamp)
+            return True
+        metrics.drops['motion_gated'] += 1
+        if self.latest_result['status'] == 'online':
+            self.latest_result = dict(self.latest_result, last_update=datetime.now().isoformat())
+            self.publish_result()
+            self.count_history.record(self.latest_result['surfer_count'])
+            if self.rate_controller:
+                #unchanged scene counts as a stable result
+                self.rate_controller.observe(self.latest_result['surfer_count'])
+        return False
+
+    def stats(self):
+        """
+        returns dict of per webcam analysis stats
+        """
+        return {
+            'webcam_id': self.webcam_id,
+            'inference_mode': self.inference_mode,
+            'status': self.latest_result['status'],
+            'frames_received': self.frame_bus.frame_count,
+            'first_frame_seconds': self.first_frame_seconds,
+            'startup_seconds': self.startup_seconds,
+            'motion_gate': self.motion_gate.stats() if self.motion_gate else None,
+            'frame_rate': self.rate_controller.stats() if self.rate_controller else None,
+            'inference_fps': round(self.metrics.inference_fps(), 3),
+            'frames_dropped': self.frame_drops(),
+            'restarts': dict(self.metrics.restarts),
+            'ffmpeg': self.ffmpeg_usage(),
+        }
+
+    def frame_drops(self):
+        """
+        returns dict of bus frames that never reached inference, by reason
+        """
+        drops = dict(self.metrics.drops)
+        drops['decode_error'] = self.frame_bus.decode_errors
+        drops['skipped'] = max(self.frame_bus.frame_count - self.metrics.frames_seen, 0)
+        return drops
+
+    def ffmpeg_usage(self):
+        """
+        returns dict of ffmpeg's cpu seconds and rss bytes, None if it isn't running
+        """
+        process = self.ffmpeg_process
+        if process is None or process.poll() is not None:
+            return None
+        return process_usage(process.pid)
+
+    def check_health(self):
+        """
+        reports which parts of a started analysis have died, called by the pipeline supervisor
+        returns list of 'ffmpeg' and/or 'pipeline', empty if healthy, stopping or not started
+        """
+        if self.stopping or self.started_at is None:
+            return []
+        failed = []
+        #poll() returns none while ffmpeg is running
+        if self.ffmpeg_process is None or self.ffmpeg_process.poll() is not None:
+            failed.append('ffmpeg')
+        #the pipeline thread blocks in pipeline.join() until inference stops
+        #in batched mode it only loads the detector, it failed if there's none
+        if self.pipeline_thread is not None and not self.pipeline_thread.is_alive():
+            if self.inference_mode != 'batched' or self.backend is None:
+                failed.append('pipeline')
+        return failed
 
     def check_ffmpeg_process(self):
         """
         monitors FFmpeg process health, restarts if necessary
-        called by health check thread
         """
         #checks if ffmpeg process has terminated poll() returns none if running
         if self.ffmpeg_process and self.ffmpeg_process.poll() is not None:
-            print("FFmpeg process died, restarting...")
+            logger.warning("webcam=%s ffmpeg exited, restarting", self.webcam_id)
+            if self.restart_ffmpeg():
+                logger.info("webcam=%s ffmpeg restarted", self.webcam_id)
+                self.set_status('online')
+
+    def restart_ffmpeg(self):
+        """
+        reaps the old ffmpeg process and starts a new one on the same frame bus
+        returns bool: true if ffmpeg restarted
+        """
+        with self.lifecycle_lock:
+            if self.stopping:
+                return False
+            self.metrics.restarts['ffmpeg'] += 1
             try:
-                #clean up old process
-                if self.ffmpeg_process:
-                    self.ffmpeg_process.terminate()
-                    self.ffmpeg_process.wait(timeout=5)
-                
-                #restarts ffmpeg
+                self._stop_ffmpeg()
                 if not self.start_ffmpeg_conversion():
-                    print("Failed to restart FFmpeg")
-                    self.latest_result['status'] = 'ffmpeg_error'
-                else:
-                    print("FFmpeg restarted successfully")
-                    self.latest_result['status'] = 'online'
-                    
+                    logger.error("webcam=%s ffmpeg restart failed", self.webcam_id)
+                    self.set_status('ffmpeg_error')
+                    return False
+                return True
             except Exception as e:
-                print(f"Error restarting FFmpeg: {e}")
-                self.latest_result['status'] = 'error'
+                logger.error("webcam=%s error restarting ffmpeg: %s", self.webcam_id, e)
+                self.set_status('error')
+                return False
+
+    def restart_pipeline(self):
+        """
+        terminates the old inference pipeline, waits for its thread, then starts a new one
+        never runs two pipelines for one webcam, gives up if the old thread won't exit
+        returns bool: true if a new pipeline thread was started
+        """
+        with self.lifecycle_lock:
+            if self.stopping:
+                return False
+            self.metrics.restarts['pipeline'] += 1
+            old_pipeline, self.pipeline = self.pipeline, None
+            if old_pipeline:
+                try:
+                    old_pipeline.terminate()
+                except Exception as e:
+                    logger.error("webcam=%s error terminating pipeline: %s", self.webcam_id, e)
+            if self.pipeline_thread is not None:
+                self.pipeline_thread.join(timeout=Config.FFMPEG_TIMEOUT)
+                if self.pipeline_thread.is_alive():
+                    logger.error("webcam=%s old pipeline still running, not restarting", self.webcam_id)
+                    return False
+            logger.info("webcam=%s restarting inference pipeline", self.webcam_id)
+            self.pipeline_thread = threading.Thread(target=self.run_inference, daemon=True)
+            self.pipeline_thread.start()
+            return True
+
+    def _stop_ffmpeg(self):
+        """
+        terminates ffmpeg (killed if it ignores SIGTERM), reaps it and closes its pipe
+        """
+        process, self.ffmpeg_process = self.ffmpeg_process, None
+        if process is None:
+            return
+        process.terminate()
+        try:
+            process.wait(timeout=Config.FFMPEG_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        if process.stdout:
+            process.stdout.close()
 
     def start_ffmpeg_conversion(self):
         """
-        starts ffmpeg process to conver HLS stream to mjpeg
+        starts ffmpeg process to conver HLS stream to mjpeg (or raw bgr24)
+        frames are written to stdout and read by the frame bus
         returns bool: true if ffmpef started successfuly
         returns bool: false otherwise
         """
         #command configurations
-        ffmpeg_commands = [
-            'ffmpeg',
-            '-re',  #read input at native frame rate
+        ffmpeg_commands = [Config.FFMPEG_BINARY]
+        if Config.FFMPEG_REALTIME_INPUT:
+            ffmpeg_commands.append('-re')  #read input at native frame rate
+        ffmpeg_commands += [
             '-i', self.hls_url, #input
-            '-f', 'mjpeg', #output
             '-r', str(Config.MAX_FPS), #frame rate limit
             '-s', Config.FFMPEG_RESOLUTION, #vid res
-            '-q:v', str(Config.FFMPEG_QUALITY),  #quality level (2-31, lower is better)
-            '-listen', '1', #enables http server mode
-            '-timeout', str(Config.FFMPEG_TIMEOUT),  #timeout after 10 seconds of no connection
+        ]
+        if self.frame_bus.ingest_mode == 'rawvideo':
+            #raw bgr24 frames, no JPEG encode in ffmpeg or decode in python
+            ffmpeg_commands += ['-f', 'rawvideo', '-pix_fmt', 'bgr24']
+        else:
+            ffmpeg_commands += [
+                '-f', 'mjpeg', #output
+                '-q:v', str(Config.FFMPEG_QUALITY),  #quality level (2-31, lower is better)
+            ]
+        ffmpeg_commands += [
             '-analyzeduration', '1000000',  #faster stream analysis
             '-probesize', '1000000', #limits probe size, faster startup
-            '-y', #overwrite output
-            self.stream_url #output: local mjpeg stream url
+            'pipe:1' #output: frames on stdout
         ]
         
         try:
-            print(f"Starting FFmpeg Conversion for {self.webcam_id} on {self.stream_url}")
-            #starts ffmpeg as subprocess with output suppressed
+            logger.info("webcam=%s starting ffmpeg", self.webcam_id)
+            #starts ffmpeg as subprocess, frames come back over stdout
             self.ffmpeg_process = subprocess.Popen(
                 ffmpeg_commands,
                 stderr=subprocess.DEVNULL, #suppress error output
-                stdout=subprocess.DEVNULL  #supress standard output
+                stdout=subprocess.PIPE #frame bus reads frames from here
             )
+            self.frame_bus.attach(self.ffmpeg_process.stdout)
             return True
         except Exception as e:
-            print(f"Error Starting FFmpeg for {self.webcam_id}: {e}")
+            logger.error("webcam=%s error starting ffmpeg: %s", self.webcam_id, e)
             return False
     
     def start_roboflow_pipeline(self):
@@ -175,39 +335,115 @@ class LiveStreamAnalyzer:
         returns bool: false otherwise
         """
         try:
-            print(f"Connecting to stream: {self.stream_url}")
+            #weights are loaded once per process and kept across pipeline restarts
+            if not self.acquire_model():
+                return False
+        except Exception as e:
+            logger.error("webcam=%s error loading model: %s", self.webcam_id, e)
+            return False
+
+        if self.inference_mode == 'batched':
+            #the batch scheduler reads this webcam's frame bus, no pipeline needed
+            logger.info("webcam=%s using the batched inference scheduler", self.webcam_id)
+            return True
+        
+        try:
+            logger.info("webcam=%s connecting inference pipeline to the frame bus", self.webcam_id)
             #intilaizes roboflow pipeline w/ configurations
+            #frames come straight from the bus, no http loopback or re-decode
             self.pipeline = InferencePipeline.init_with_workflow(
                 api_key=Config.ROBOFLOW_API_KEY,
                 workspace_name=Config.ROBOFLOW_WORKSPACE,
                 workflow_id=Config.ROBOFLOW_WORKFLOW_ID,
-                video_reference=self.stream_url, 
+                video_reference=self.frame_bus.producer_factory(admit=self.admit_frame),
                 max_fps=Config.MAX_FPS,
-                on_prediction=self.roboflow_sink
+                on_prediction=self.roboflow_sink,
+                model_manager=self.model_manager
             )
 
-            time.sleep(5)
+            #starts the moment ffmpeg's first frame is on the bus, the model loaded meanwhile
+            if not self.wait_for_first_frame():
+                logger.error("webcam=%s no frames from ffmpeg", self.webcam_id)
+                self.set_status('ffmpeg_error')
+                return False
 
-            print("Starting Roboflow Pipeline for {self.webcam_id}...")
+            logger.info("webcam=%s starting inference pipeline", self.webcam_id)
             self.pipeline.start()
             return True
         
         except Exception as e:
-            print(f"Error Starting Roboflow Pipeline: for {self.webcam_id}: {e}")
+            logger.error("webcam=%s error starting inference pipeline: %s", self.webcam_id, e)
             return False
         
+    def acquire_model(self):
+        """
+        takes this webcam's reference on its shared model, loading it if no other webcam has
+        batched -> the detector backend, pipeline -> the ModelManager every InferencePipeline uses
+        the reference is kept across pipeline restarts and released by stop_analysis
+        returns bool: false if the analyzer was stopped meanwhile
+        """
+        if self.model_key is not None:
+            return True
+        if self.inference_mode == 'batched':
+            key = f'detector:{self.detector}'
+            model = model_registry.acquire(key, lambda: create_backend(self.detector))
+        else:
+            key = 'roboflow_model_manager'
+            model = model_registry.acquire(key, create_model_manager, unload=lambda manager: manager.clear())
+        with self.lifecycle_lock:
+            if not self.stopping:
+                self.model_key = key
+                if self.inference_mode == 'batched':
+                    self.backend = model
+                else:
+                    self.model_manager = model
+                return True
+        model_registry.release(key)
+        return False
+
+    def release_model(self):
+        """
+        drops this webcam's model reference, the last webcam using a model unloads it
+        """
+        if self.model_key is not None:
+            model_registry.release(self.model_key)
+        self.model_key = None
+        self.backend = None
+        self.model_manager = None
+
+    def wait_for_first_frame(self, deadline=None):
+        """
+        waits for a frame on the bus instead of sleeping a fixed time
+        the bus wakes the wait the instant a frame is published, between waits ffmpeg is checked
+        for an early exit, waits back off exponentially from READY_INITIAL_WAIT to READY_MAX_WAIT
+        deadline -> seconds to wait at most, Config.READY_DEADLINE if None
+        returns bool: true once a frame is available, false if ffmpeg exited or time ran out
+        """
+        give_up = time.monotonic() + (deadline or Config.READY_DEADLINE)
+        wait = Config.READY_INITIAL_WAIT
+        while self.frame_bus.running:
+            remaining = give_up - time.monotonic()
+            if self.frame_bus.wait_for_frame(0, timeout=max(min(wait, remaining), 0)) is not None:
+                if self.first_frame_seconds is None and self.started_at:
+                    self.first_frame_seconds = time.monotonic() - self.started_at
+                    logger.info("webcam=%s first frame after %.2fs", self.webcam_id, self.first_frame_seconds)
+                return True
+            if remaining <= 0 or (self.ffmpeg_process and self.ffmpeg_process.poll() is not None):
+                return False
+            wait = min(wait * 2, Config.READY_MAX_WAIT)
+        return False
+
     def start_analysis(self):
         """
         main method to start complete analysis pipeline
         starts ffmpeg for stream conversion
-        launches health monitoring
         starts roboflow processing
         handles errors
         runs in separate thread
         returns threading.Thread: The thread running the analysis pipeline
         """
-        print(f"Starting analysis for webcam: {self.webcam_id}")
-        print(f"HLS URL: {self.hls_url}")
+        self.started_at = time.monotonic()
+        logger.info("webcam=%s starting analysis of %s", self.webcam_id, self.hls_url)
 
         def run_pipeline():
             """
@@ -216,52 +452,44 @@ class LiveStreamAnalyzer:
             """
             try:
                 #step 1 - starts conversion
+                #the pipeline supervisor restarts ffmpeg or the pipeline if either dies
                 if not self.start_ffmpeg_conversion():
-                    self.latest_result['status'] = 'ffmpeg_error'
-                    return
-                
-                #step 2 - starts health monitoring
-                health_thread = threading.Thread(target=self.health_check, daemon=True)
-                health_thread.start()
-
-                #step 3 - starts roboflow process
-                if not self.start_roboflow_pipeline():
-                    self.latest_result['status'] = 'roboflow_error'
+                    self.set_status('ffmpeg_error')
                     return
-                
-                #step 4 - keeps pipeline running
-                self.pipeline.join()
-                
             except Exception as e:
-                print(f"Pipeline Error for {self.webcam_id}: {e}")
-                self.latest_result['status'] = 'error'
+                logger.error("webcam=%s pipeline error: %s", self.webcam_id, e)
+                self.set_status('error')
+                return
+            self.run_inference()
 
         #starts piepline in daemon thread
         #daemon threads auto exit when main progmram exits
         thread = threading.Thread(target=run_pipeline, daemon=True)
+        self.pipeline_thread = thread
         thread.start()
         return thread
 
-    def health_check(self):
-        """
-        continuously check FFmpeg and restart if needed
-        runs in background thread
-        checks ffmpeg process health
-        monitors roboflow pipeline status
-        auto restarts failed parts
-        prevents hanging on failures
-        runs indef until thread is terminated
-        """
-        while True:
-            #check every 5 seconds
-            time.sleep(Config.HEALTH_CHECK_INTERVAL)
-            self.check_ffmpeg_process()
-            
-            #check if Roboflow is still connected
-            if self.pipeline and not self.pipeline.is_running():
-                print("Roboflow pipeline stopped, attempting to restart...")
-                self.start_roboflow_pipeline()
-    
+    def run_inference(self):
+        """
+        starts roboflow processing and blocks until the pipeline stops
+        runs on the pipeline thread, again on every pipeline restart
+        """
+        try:
+            #step 2 - starts roboflow process once frames flow
+            if not self.start_roboflow_pipeline():
+                if self.latest_result['status'] != 'ffmpeg_error':
+                    self.set_status('roboflow_error')
+                return
+
+            #step 3 - keeps pipeline running (batched mode has no pipeline)
+            pipeline = self.pipeline
+            if pipeline:
+                pipeline.join()
+
+        except Exception as e:
+            logger.error("webcam=%s pipeline error: %s", self.webcam_id, e)
+            self.set_status('error')
+
     def stop_analysis(self):
         """
         clean shutfown of analysis pipeline
@@ -271,12 +499,22 @@ class LiveStreamAnalyzer:
         prevents resource leaks
         called when stopping analysis for webcam or applciation shutdown
         """
-
-        #stops roboflow inference pipeline
-        if self.pipeline:
-            self.pipeline.terminate()
-        
-        #stops ffmpeg conversion rpocess
-        if self.ffmpeg_process:
-            self.ffmpeg_process.terminate()
-            self.ffmpeg_process.wait()
\ No newline at end of file
+        #waits out a restart in progress, the supervisor won't start another
+        self.stopping = True
+        with self.lifecycle_lock:
+            #stops roboflow inference pipeline
+            if self.pipeline:
+                self.pipeline.terminate()
+            
+            #stops frame bus, ends viewer streams
+            self.frame_bus.stop()
+            
+            #frees this webcam's share of the inference budget
+            if self.rate_controller:
+                self.rate_controller.close()
+            
+            #stops ffmpeg conversion rpocess
+            self._stop_ffmpeg()
+            
+            #unloads the model if no other webcam uses it
+            self.release_model()
\ No newline at end of file
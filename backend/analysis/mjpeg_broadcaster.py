@@ -0,0 +1,255 @@
+import asyncio #viewers on the async server
+import threading #client registry lock
+import queue #bounded per client frame queues
+from collections import deque #async client frames
+from config import Config #stream/queue settings
+
+JPEG_SOI = b'\xff\xd8' #start of image marker
+JPEG_EOI = b'\xff\xd9' #end of image marker
+MULTIPART_BOUNDARY = 'frame'
+
+
+class JpegFrameParser:
+    """
+    splits a raw mjpeg byte stream into complete JPEG frames
+    ffmpeg's mjpeg muxer writes JPEGs back to back, so frames are found
+    by scanning for the SOI/EOI markers instead of multipart headers
+    """
+    def __init__(self, max_frame_bytes=None):
+        """
+        max_frame_bytes -> drops the buffer if a frame grows past this (corrupt stream guard)
+        """
+        self.buffer = bytearray()
+        self.max_frame_bytes = max_frame_bytes or Config.STREAM_MAX_FRAME_BYTES
+        self._scan_from = 0 #where the EOI search resumes, avoids rescanning partial frames
+
+    def feed(self, data):
+        """
+        appends bytes read from upstream
+        returns list of complete JPEG frames (bytes) found so far
+        """
+        self.buffer += data
+        frames = []
+        while True:
+            start = self.buffer.find(JPEG_SOI)
+            if start < 0:
+                #keeps last byte in case a marker is split across reads
+                del self.buffer[:-1]
+                self._scan_from = 0
+                break
+            if start:
+                #discards garbage before the frame start
+                del self.buffer[:start]
+                self._scan_from = max(self._scan_from - start, 0)
+            end = self.buffer.find(JPEG_EOI, max(self._scan_from, 2))
+            if end < 0:
+                #frame incomplete, resumes search one byte back next time
+                self._scan_from = max(len(self.buffer) - 1, 2)
+                if len(self.buffer) > self.max_frame_bytes:
+                    self.buffer.clear()
+                    self._scan_from = 0
+                break
+            frames.append(bytes(self.buffer[:end + 2]))
+            del self.buffer[:end + 2]
+            self._scan_from = 0
+        return frames
+
+
+def multipart_chunk(frame):
+    """
+    returns bytes: one JPEG as a multipart/x-mixed-replace part
+    """
+    return (
+        b'--' + MULTIPART_BOUNDARY.encode() + b'\r\n'
+        b'Content-Type: image/jpeg\r\n'
+        b'Content-Length: ' + str(len(frame)).encode() + b'\r\n\r\n'
+        + frame + b'\r\n'
+    )
+
+
+class AsyncFrameQueue:
+    """
+    bounded client queue for viewers served by an asyncio loop
+    same put_nowait/get_nowait contract as queue.Queue, so the broadcaster treats both alike
+    publish runs on the frame bus thread, the waiting coroutine is woken on its own loop
+    """
+    def __init__(self, maxsize, loop):
+        """
+        maxsize -> frames buffered before put_nowait raises queue.Full
+        loop -> event loop the reading coroutine runs on
+        """
+        self.maxsize = maxsize
+        self.loop = loop
+        self.frames = deque()
+        self.lock = threading.Lock()
+        self.ready = asyncio.Event()
+
+    def put_nowait(self, frame):
+        with self.lock:
+            if len(self.frames) >= self.maxsize:
+                raise queue.Full
+            self.frames.append(frame)
+        try:
+            self.loop.call_soon_threadsafe(self.ready.set)
+        except RuntimeError:
+            pass #loop already closed, the viewer is gone
+
+    def get_nowait(self):
+        with self.lock:
+            if not self.frames:
+                raise queue.Empty
+            return self.frames.popleft()
+
+    async def get(self, timeout):
+        """
+        waits for the next frame
+        raises asyncio.TimeoutError if none arrives within timeout seconds
+        """
+        while True:
+            try:
+                return self.get_nowait()
+            except queue.Empty:
+                pass
+            self.ready.clear()
+            #a frame put between the empty check and clear() would otherwise be missed
+            with self.lock:
+                if self.frames:
+                    continue
+            await asyncio.wait_for(self.ready.wait(), timeout)
+
+
+class MJPEGBroadcaster:
+    """
+    fans JPEG frames out to any number of browser clients
+    frames are published once by the webcam's frame bus
+    each client gets a small bounded queue, slow clients drop stale frames
+    so memory stays flat no matter how many viewers are connected
+    """
+    def __init__(self, client_queue_size=None):
+        """
+        client_queue_size -> max frames buffered per client before dropping old ones
+        """
+        self.client_queue_size = client_queue_size or Config.STREAM_CLIENT_QUEUE_SIZE
+        self.clients = set() #per client queues
+        self.lock = threading.Lock()
+        self.latest_frame = None #most recent JPEG, sent to new clients right away
+        self.frames_published = 0
+        self.frames_dropped = 0 #stale frames dropped for slow clients
+        self.running = False
+
+    def start(self):
+        """
+        opens the broadcaster for clients
+        """
+        with self.lock:
+            self.running = True
+
+    def stop(self):
+        """
+        ends every client stream
+        """
+        with self.lock:
+            self.running = False
+            clients = list(self.clients)
+        for client in clients:
+            self._offer(client, None) #sentinel ends the client generator
+
+    def subscribe(self, client=None):
+        """
+        registers a new client
+        client -> optional queue to register (AsyncFrameQueue for async viewers)
+        returns queue.Queue the client reads frames from
+        """
+        if client is None:
+            client = queue.Queue(maxsize=self.client_queue_size)
+        with self.lock:
+            self.clients.add(client)
+            latest = self.latest_frame
+        if latest is not None:
+            client.put_nowait(latest)
+        return client
+
+    def unsubscribe(self, client):
+        """
+        removes a client queue, safe to call twice
+        """
+        with self.lock:
+            self.clients.discard(client)
+
+    def client_count(self):
+        """
+        returns number of connected clients
+        """
+        with self.lock:
+            return len(self.clients)
+
+    def publish(self, frame):
+        """
+        hands a complete JPEG frame to every client
+        never blocks, full queues drop their oldest frame
+        """
+        with self.lock:
+            self.latest_frame = frame
+            self.frames_published += 1
+            clients = list(self.clients)
+        dropped = sum(self._offer(client, frame) for client in clients)
+        if dropped:
+            with self.lock: #publish runs on the reader thread, stats() reads from request threads
+                self.frames_dropped += dropped
+
+    def _offer(self, client, frame):
+        """
+        puts frame on a client queue, dropping the oldest frame if full
+        returns number of frames dropped
+        """
+        dropped = 0
+        while True:
+            try:
+                client.put_nowait(frame)
+                return dropped
+            except queue.Full:
+                try:
+                    client.get_nowait()
+                    dropped += 1
+                except queue.Empty:
+                    pass
+
+    def stream(self):
+        """
+        generator yielding multipart/x-mixed-replace chunks for one client
+        unsubscribes when the client disconnects or the broadcaster stops
+        """
+        client = self.subscribe()
+        try:
+            while True:
+                try:
+                    frame = client.get(timeout=Config.STREAM_CLIENT_TIMEOUT)
+                except queue.Empty:
+                    if not self.running:
+                        break
+                    continue
+                if frame is None:
+                    break
+                yield multipart_chunk(frame)
+        finally:
+            self.unsubscribe(client)
+
+    async def astream(self):
+        """
+        async generator version of stream() for the asyncio server
+        a viewer costs a coroutine instead of a thread
+        """
+        client = self.subscribe(AsyncFrameQueue(self.client_queue_size, asyncio.get_running_loop()))
+        try:
+            while True:
+                try:
+                    frame = await client.get(Config.STREAM_CLIENT_TIMEOUT)
+                except asyncio.TimeoutError:
+                    if not self.running:
+                        break
+                    continue
+                if frame is None:
+                    break
+                yield multipart_chunk(frame)
+        finally:
+            self.unsubscribe(client)
@@ -0,0 +1,122 @@
+import os #own pid for rss
+import threading #registry lock, serialized loads
+import time #load time
+from analysis.stage_metrics import process_usage #rss before/after a load
+from log_utils import get_logger #load/unload decisions
+
+logger = get_logger('model_registry')
+
+#process wide cache of loaded models, shared by every LiveStreamAnalyzer
+#each model is loaded once, every webcam using it holds a reference, the last webcam to stop
+#unloads it, restarting a webcam's pipeline keeps its reference so weights are never re-read
+#loads are serialized, so the rss growth measured around a load is that model's resident memory
+
+
+class ModelEntry:
+    """
+    one loaded model and its bookkeeping
+    """
+    __slots__ = ('model', 'refs', 'load_seconds', 'rss_bytes', 'unload')
+
+    def __init__(self, model, load_seconds, rss_bytes, unload):
+        self.model = model
+        self.refs = 1
+        self.load_seconds = load_seconds
+        self.rss_bytes = rss_bytes #process rss growth during the load
+        self.unload = unload
+
+
+class ModelRegistry:
+    """
+    reference counted model cache, thread safe
+    """
+    def __init__(self):
+        self.entries = {} #key -> ModelEntry
+        self.lock = threading.Lock() #entries and counters
+        self.load_lock = threading.Lock() #one load at a time
+        #stats
+        self.loads = 0
+        self.unloads = 0
+
+    def acquire(self, key, loader, unload=None):
+        """
+        returns the model for a key, loading it on first use, and takes a reference
+        key -> model identity, e.g. 'detector:onnx'
+        loader -> callable() returning the model, called once per load
+        unload -> optional callable(model) run when the last reference is released
+        raises whatever loader raises, nothing is cached then
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                entry.refs += 1
+                return entry.model
+        with self.load_lock:
+            #another thread may have loaded it while this one waited
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry is not None:
+                    entry.refs += 1
+                    return entry.model
+            before = self._rss()
+            start = time.monotonic()
+            model = loader()
+            entry = ModelEntry(model, time.monotonic() - start, max(self._rss() - before, 0), unload)
+            with self.lock:
+                self.entries[key] = entry
+                self.loads += 1
+        logger.info("model=%s loaded in %.2fs, rss +%.1f MB", key, entry.load_seconds, entry.rss_bytes / 1e6)
+        return model
+
+    def release(self, key):
+        """
+        drops a reference, unloads the model when it was the last one
+        returns bool: true if the model was unloaded
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return False
+            entry.refs -= 1
+            if entry.refs > 0:
+                return False
+            del self.entries[key]
+            self.unloads += 1
+        if entry.unload is not None:
+            try:
+                entry.unload(entry.model)
+            except Exception as e:
+                logger.error("model=%s unload failed: %s", key, e)
+        logger.info("model=%s unloaded, no webcams left", key)
+        return True
+
+    def _rss(self):
+        usage = process_usage(os.getpid())
+        return usage['rss_bytes'] if usage else 0
+
+    def stats(self):
+        """
+        returns dict of loaded models with references, load time and resident memory
+        """
+        with self.lock:
+            models = {
+                key: {
+                    'refs': entry.refs,
+                    'load_seconds': round(entry.load_seconds, 3),
+                    'rss_bytes': entry.rss_bytes,
+                }
+                for key, entry in self.entries.items()
+            }
+            loads, unloads = self.loads, self.unloads
+        usage = process_usage(os.getpid())
+        return {
+            'loads': loads,
+            'unloads': unloads,
+            'models': models,
+            'model_rss_bytes': sum(model['rss_bytes'] for model in models.values()),
+            'process_rss_bytes': usage['rss_bytes'] if usage else None,
+        }
+
+
+#shared by every analyzer and the batch scheduler
+model_registry = ModelRegistry()
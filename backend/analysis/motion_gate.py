@@ -0,0 +1,74 @@
+import time #forced refresh timing
+import numpy as np #vectorized thumbnail diff
+from config import Config #gate defaults
+
+#BGR -> luma weights for the grayscale thumbnail
+GRAY_WEIGHTS = np.array([0.114, 0.587, 0.299], dtype=np.float32)
+
+
+class MotionGate:
+    """
+    cheap change detector in front of inference
+    compares a strided grayscale thumbnail of each frame against the last inferred frame
+    frames that barely changed (flat days, night, fog) skip inference and reuse the last result
+    """
+    def __init__(self, threshold=None, thumbnail_width=None, max_skip_seconds=None):
+        """
+        threshold -> mean absolute gray level change (0-255) needed to run inference
+        thumbnail_width -> approx thumbnail width in pixels, frames are strided down to it
+        max_skip_seconds -> forces inference after this long even on a static scene
+        """
+        self.threshold = Config.MOTION_GATE_THRESHOLD if threshold is None else threshold
+        self.thumbnail_width = thumbnail_width or Config.MOTION_GATE_THUMBNAIL_WIDTH
+        self.max_skip_seconds = Config.MOTION_GATE_MAX_SKIP_SECONDS if max_skip_seconds is None else max_skip_seconds
+        self.reference = None #thumbnail of last inferred frame
+        self.reference_time = 0.0
+        self.last_change = 0.0 #change score of the last frame checked
+        self.frames_gated = 0
+        self.frames_inferred = 0
+
+    def thumbnail(self, image):
+        """
+        returns float32 grayscale thumbnail
+        strided slicing is a view, only the tiny thumbnail is computed
+        """
+        step = max(image.shape[1] // self.thumbnail_width, 1)
+        small = image[::step, ::step]
+        if small.ndim == 3:
+            return small @ GRAY_WEIGHTS
+        return small.astype(np.float32)
+
+    def should_infer(self, image, now=None):
+        """
+        decides if a frame is worth inferring
+        updates the reference thumbnail only when inference will run
+        returns bool
+        """
+        now = time.monotonic() if now is None else now
+        thumb = self.thumbnail(image)
+
+        if self.reference is None or self.reference.shape != thumb.shape:
+            change = float('inf')
+        else:
+            change = float(np.abs(thumb - self.reference).mean())
+        self.last_change = change
+
+        if change < self.threshold and now - self.reference_time < self.max_skip_seconds:
+            self.frames_gated += 1
+            return False
+
+        self.reference = thumb
+        self.reference_time = now
+        self.frames_inferred += 1
+        return True
+
+    def stats(self):
+        """
+        returns dict of gate counters for threshold tuning
+        """
+        return {
+            'threshold': self.threshold,
+            'frames_gated': self.frames_gated,
+            'frames_inferred': self.frames_inferred,
+            'last_change': None if self.last_change == float('inf') else round(self.last_change, 3),
+        }
@@ -0,0 +1,250 @@
+import threading #registry lock, sweeper thread
+import time #activity timestamps
+from config import Config #warm set, idle ttl, per host cap
+from analysis.result_events import result_events #event stream subscribers count as viewers
+from analysis.results_store import results_store #evicted webcams' results are dropped
+from log_utils import get_logger #start/evict decisions
+
+logger = get_logger('pipeline_manager')
+
+#owns the lifecycle of every webcam analysis pipeline
+#warm webcams are started up front and never evicted for being idle
+#other webcams start on first request and are stopped once nobody has polled, watched
+#or subscribed for PIPELINE_IDLE_TTL seconds
+#at most PIPELINE_MAX_ACTIVE pipelines run per host, the least recently used idle one
+#makes room for a new webcam
+#a start is reserved under the lock and run outside it, so a slow HLS source never blocks
+#requests for other webcams, concurrent requests for the starting webcam wait for that one start
+
+
+class PipelineLimitError(RuntimeError):
+    """
+    raised when the host is at its pipeline cap and every running pipeline is in use
+    """
+
+
+class PipelineManager:
+    """
+    starts, tracks and evicts LiveStreamAnalyzers
+    """
+    def __init__(self, pipelines, starter, warm=None, idle_ttl=None, max_active=None, sweep_interval=None):
+        """
+        pipelines -> dict webcam_id -> analyzer, shared with the routes (active_pipelines)
+        starter -> callable(webcam_id) returning a started analyzer
+        warm -> webcam ids kept running, Config.PIPELINE_WARM_WEBCAMS if None
+        idle_ttl -> seconds without activity before a pipeline is evicted
+        max_active -> pipelines allowed on this host at once
+        sweep_interval -> seconds between idle sweeps
+        """
+        self.pipelines = pipelines
+        self.starter = starter
+        self.warm = set(Config.PIPELINE_WARM_WEBCAMS if warm is None else warm)
+        self.idle_ttl = idle_ttl or Config.PIPELINE_IDLE_TTL
+        self.max_active = max_active or Config.PIPELINE_MAX_ACTIVE
+        self.sweep_interval = sweep_interval or Config.PIPELINE_SWEEP_INTERVAL
+        self.last_active = {} #webcam_id -> time.monotonic() of the last poll/viewer
+        self.pending = {} #webcam_id -> threading.Event set once its start finished or failed
+        self.lock = threading.Lock()
+        self.sweeper = None
+        #stats
+        self.started = 0
+        self.evicted = 0
+        self.rejected = 0
+        self.startup_seconds = [] #time to first result of recent starts
+
+    def start(self):
+        """
+        starts the warm webcams and the idle sweeper
+        """
+        for webcam_id in sorted(self.warm):
+            try:
+                self.acquire(webcam_id)
+            except PipelineLimitError:
+                logger.warning("webcam=%s not warmed, PIPELINE_MAX_ACTIVE=%d reached", webcam_id, self.max_active)
+        self._ensure_sweeper()
+
+    def _ensure_sweeper(self):
+        with self.lock:
+            if self.sweeper is not None:
+                return
+            self.sweeper = threading.Thread(target=self._sweep_loop, daemon=True)
+        self.sweeper.start()
+
+    def _sweep_loop(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error("idle sweep failed: %s", e)
+
+    def acquire(self, webcam_id):
+        """
+        returns the webcam's running analyzer, starting it if needed, and marks it active
+        returns (analyzer, bool: true if it was started by this call)
+        raises PipelineLimitError if at the cap with no idle pipeline to evict
+        raises whatever the starter raises, the reserved slot is given back
+        """
+        while True:
+            now = time.monotonic()
+            evicted = None
+            with self.lock:
+                self.last_active[webcam_id] = now
+                analyzer = self.pipelines.get(webcam_id)
+                if analyzer is not None:
+                    return analyzer, False
+                pending = self.pending.get(webcam_id)
+                if pending is None:
+                    #starts in progress hold a slot too
+                    if len(self.pipelines) + len(self.pending) >= self.max_active:
+                        evict = self._eviction_candidate(now, min_idle=0)
+                        if evict is None:
+                            self.rejected += 1
+                            del self.last_active[webcam_id]
+                            raise PipelineLimitError(f"{self.max_active} webcams already active")
+                        evicted = (evict, self.pipelines.pop(evict))
+                        self.last_active.pop(evict, None)
+                        self.evicted += 1
+                    pending = self.pending[webcam_id] = threading.Event()
+                    break
+            #another request is starting this webcam, its result (or failure) is picked up above
+            pending.wait()
+
+        try:
+            #the evicted pipeline is gone before the new one starts, the cap is never exceeded
+            if evicted is not None:
+                logger.info("webcam=%s evicted for webcam=%s", evicted[0], webcam_id)
+                self._stop(*evicted)
+            analyzer = self.starter(webcam_id)
+        except Exception:
+            with self.lock:
+                del self.pending[webcam_id]
+                self.last_active.pop(webcam_id, None)
+            pending.set()
+            raise
+        with self.lock:
+            self.pipelines[webcam_id] = analyzer
+            del self.pending[webcam_id]
+            self.started += 1
+        pending.set()
+        logger.info("webcam=%s pipeline started", webcam_id)
+        self._ensure_sweeper()
+        return analyzer, True
+
+    def touch(self, webcam_id):
+        """
+        marks a webcam active without starting it
+        """
+        with self.lock:
+            if webcam_id in self.pipelines:
+                self.last_active[webcam_id] = time.monotonic()
+
+    def in_use(self, webcam_id, analyzer):
+        """
+        returns bool: true if a /video_feed viewer or event stream is connected
+        """
+        frame_bus = getattr(analyzer, 'frame_bus', None)
+        if frame_bus is not None and frame_bus.broadcaster.client_count():
+            return True
+        return result_events.channel(webcam_id).subscribers > 0
+
+    def _eviction_candidate(self, now, min_idle):
+        """
+        returns least recently active webcam that isn't warm or in use and has been idle
+        at least min_idle seconds, None if there is none (caller holds the lock)
+        """
+        candidates = [
+            (self.last_active.get(webcam_id, 0), webcam_id)
+            for webcam_id, analyzer in self.pipelines.items()
+            if webcam_id not in self.warm and not self.in_use(webcam_id, analyzer)
+            and now - self.last_active.get(webcam_id, 0) >= min_idle
+        ]
+        return min(candidates)[1] if candidates else None
+
+    def sweep(self, now=None):
+        """
+        stops every pipeline idle longer than the ttl
+        connected viewers keep a pipeline active even if nobody polls
+        returns list of evicted webcam ids
+        """
+        now = time.monotonic() if now is None else now
+        evicted = []
+        with self.lock:
+            for webcam_id, analyzer in self.pipelines.items():
+                if self.in_use(webcam_id, analyzer):
+                    self.last_active[webcam_id] = now
+            while True:
+                webcam_id = self._eviction_candidate(now, min_idle=self.idle_ttl)
+                if webcam_id is None:
+                    break
+                evicted.append((webcam_id, self.pipelines.pop(webcam_id)))
+                self.last_active.pop(webcam_id, None)
+                self.evicted += 1
+        for webcam_id, analyzer in evicted:
+            logger.info("webcam=%s idle for %ds, evicted", webcam_id, self.idle_ttl)
+            self._stop(webcam_id, analyzer)
+        return [webcam_id for webcam_id, _ in evicted]
+
+    def stop(self, webcam_id):
+        """
+        stops a webcam's pipeline (warm webcams start again on their next request)
+        returns bool: false if it wasn't running
+        """
+        with self.lock:
+            analyzer = self.pipelines.pop(webcam_id, None)
+            self.last_active.pop(webcam_id, None)
+        if analyzer is None:
+            return False
+        self._stop(webcam_id, analyzer)
+        return True
+
+    def _stop(self, webcam_id, analyzer):
+        """
+        stops an analyzer already removed from the registry, records its startup latency
+        """
+        self._record_startup(analyzer)
+        try:
+            analyzer.stop_analysis()
+        except Exception as e:
+            logger.error("webcam=%s error stopping pipeline: %s", webcam_id, e)
+        results_store.remove(webcam_id)
+
+    def _record_startup(self, analyzer):
+        startup = getattr(analyzer, 'startup_seconds', None)
+        if isinstance(startup, (int, float)):
+            self.startup_seconds = (self.startup_seconds + [startup])[-100:]
+
+    def stats(self):
+        """
+        returns dict of lifecycle counters and per webcam idle time / startup latency
+        """
+        now = time.monotonic()
+        with self.lock:
+            pipelines = dict(self.pipelines)
+            last_active = dict(self.last_active)
+        startups = list(self.startup_seconds)
+        webcams = {}
+        for webcam_id, analyzer in pipelines.items():
+            startup = getattr(analyzer, 'startup_seconds', None)
+            if isinstance(startup, (int, float)):
+                startups.append(startup)
+            else:
+                startup = None
+            webcams[webcam_id] = {
+                'warm': webcam_id in self.warm,
+                'in_use': self.in_use(webcam_id, analyzer),
+                'idle_seconds': round(now - last_active.get(webcam_id, now), 1),
+                'startup_seconds': startup,
+            }
+        return {
+            'active': len(pipelines),
+            'starting': len(self.pending),
+            'max_active': self.max_active,
+            'idle_ttl': self.idle_ttl,
+            'started': self.started,
+            'evicted': self.evicted,
+            'rejected': self.rejected,
+            'avg_startup_seconds': round(sum(startups) / len(startups), 2) if startups else None,
+            'max_startup_seconds': round(max(startups), 2) if startups else None,
+            'webcams': webcams,
+        }
@@ -0,0 +1,120 @@
+import threading #budget registry lock
+import time #inference spacing
+from config import Config #rate limits and budget
+
+
+class FpsBudget:
+    """
+    process wide inference budget shared by every webcam's rate controller
+    when the webcams together ask for more than max_total_fps,
+    every webcam is scaled down by the same factor
+    """
+    def __init__(self, max_total_fps=None):
+        """
+        max_total_fps -> total inferences per second this host can afford
+        """
+        self.max_total_fps = max_total_fps or Config.INFERENCE_FPS_BUDGET
+        self.demands = {} #webcam_id -> requested fps
+        self.lock = threading.Lock()
+
+    def request(self, webcam_id, fps):
+        """
+        records a webcam's requested rate
+        """
+        with self.lock:
+            self.demands[webcam_id] = fps
+
+    def release(self, webcam_id):
+        """
+        removes a stopped webcam from the budget
+        """
+        with self.lock:
+            self.demands.pop(webcam_id, None)
+
+    def scale(self):
+        """
+        returns float (0, 1]: factor every webcam's rate is multiplied by
+        """
+        with self.lock:
+            total = sum(self.demands.values())
+        if total <= self.max_total_fps or total == 0:
+            return 1.0
+        return self.max_total_fps / total
+
+
+#shared by every LiveStreamAnalyzer in this process
+global_budget = FpsBudget()
+
+
+class AdaptiveRateController:
+    """
+    adaptive per webcam inference rate
+    jumps to max_fps when the surfer count changes or the lineup is busy
+    decays toward min_fps (e.g. one frame every 30s) while the count is stable or zero
+    the result is capped by the shared FpsBudget
+    """
+    def __init__(self, webcam_id, min_fps=None, max_fps=None, budget=None):
+        """
+        webcam_id -> webcam this controller paces
+        min_fps -> slowest inference rate for quiet scenes
+        max_fps -> fastest inference rate, ffmpeg still delivers frames at Config.MAX_FPS
+        budget -> FpsBudget shared across webcams, global_budget if None
+        """
+        self.webcam_id = webcam_id
+        self.min_fps = min_fps or Config.ADAPTIVE_MIN_FPS
+        self.max_fps = max_fps or Config.MAX_FPS
+        self.budget = budget or global_budget
+        self.target_fps = self.max_fps #starts fast so the first results come quickly
+        self.last_count = None
+        self.last_inference = None
+        self.budget.request(webcam_id, self.target_fps)
+
+    def effective_fps(self):
+        """
+        returns float: target rate after the shared budget is applied
+        """
+        return max(self.min_fps, self.target_fps * self.budget.scale())
+
+    def ready(self, now=None):
+        """
+        returns bool: true if enough time passed since the last inference
+        """
+        if self.last_inference is None:
+            return True
+        now = time.monotonic() if now is None else now
+        return now - self.last_inference >= 1.0 / self.effective_fps()
+
+    def mark_inferred(self, now=None):
+        """
+        records that a frame was sent to inference
+        """
+        self.last_inference = time.monotonic() if now is None else now
+
+    def observe(self, surfer_count):
+        """
+        adapts the target rate to the latest surfer count
+        """
+        changed = self.last_count is not None and surfer_count != self.last_count
+        busy = surfer_count >= Config.ADAPTIVE_BUSY_COUNT
+        if changed or busy:
+            self.target_fps = self.max_fps
+        else:
+            self.target_fps = max(self.min_fps, self.target_fps * Config.ADAPTIVE_DECAY)
+        self.last_count = surfer_count
+        self.budget.request(self.webcam_id, self.target_fps)
+
+    def close(self):
+        """
+        releases this webcam's share of the budget
+        """
+        self.budget.release(self.webcam_id)
+
+    def stats(self):
+        """
+        returns dict of current rates
+        """
+        return {
+            'target_fps': round(self.target_fps, 4),
+            'effective_fps': round(self.effective_fps(), 4),
+            'budget_scale': round(self.budget.scale(), 4),
+        }
@@ -0,0 +1,189 @@
+import asyncio #subscribers on the async server
+import json #messages are encoded once per change
+import threading #per webcam condition
+import time #coalescing window, heartbeats
+from config import Config #coalescing and heartbeat intervals
+
+#server push for surfer count updates (/api/video-analysis/events)
+#the analyzer publishes every result, a channel only bumps its version when the
+#count or status actually changed, and subscribers always read the latest message
+#so a burst of changes between two sends collapses into one event
+
+
+class ResultChannel:
+    """
+    latest pushed message of one webcam plus a version subscribers wait on
+    """
+    def __init__(self, webcam_id):
+        self.webcam_id = webcam_id
+        self.condition = threading.Condition()
+        self.version = 0
+        self.key = None #(surfer_count, status) of the latest message
+        self.data = None #latest message, JSON encoded
+        self.async_waiters = set() #(loop, asyncio.Event) of async subscribers
+        self.subscribers = 0 #open event streams
+        self.published = 0 #results offered
+        self.changes = 0 #results that changed count or status
+
+    def publish(self, result):
+        """
+        offers an analyzer result, a no-op unless surfer_count or status changed
+        result -> latest_result dict of the analyzer
+        returns bool: true if subscribers were woken
+        """
+        key = (result['surfer_count'], result['status'])
+        with self.condition:
+            self.published += 1
+            if key == self.key:
+                return False
+            self.key = key
+            self.data = json.dumps({
+                'webcam_id': self.webcam_id,
+                'surfer_count': result['surfer_count'],
+                'status': result['status'],
+                'last_update': result['last_update'],
+            }, separators=(',', ':'))
+            self.version += 1
+            self.changes += 1
+            self.condition.notify_all()
+            waiters = list(self.async_waiters)
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass #loop already closed
+        return True
+
+    def latest(self):
+        """
+        returns (version, JSON str or None)
+        """
+        with self.condition:
+            return self.version, self.data
+
+    def wait(self, after_version, timeout):
+        """
+        blocks until the version passes after_version
+        returns (version, JSON str), or None on timeout
+        """
+        with self.condition:
+            if self.condition.wait_for(lambda: self.version > after_version, timeout=timeout):
+                return self.version, self.data
+            return None
+
+    async def await_change(self, after_version, timeout):
+        """
+        async version of wait, the event loop thread never blocks
+        returns (version, JSON str), or None on timeout
+        """
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self.condition:
+            self.async_waiters.add(waiter)
+        try:
+            while True:
+                with self.condition:
+                    if self.version > after_version:
+                        return self.version, self.data
+                    waiter[1].clear()
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), timeout)
+                except asyncio.TimeoutError:
+                    return None
+        finally:
+            with self.condition:
+                self.async_waiters.discard(waiter)
+
+    def _resume_from(self, last_event_id):
+        """
+        returns version to resume after, ids from before a server restart start over
+        """
+        with self.condition:
+            return last_event_id if last_event_id <= self.version else 0
+
+    def _subscribe(self, delta):
+        with self.condition:
+            self.subscribers += delta
+
+    def stream(self, last_event_id=0):
+        """
+        generator yielding text/event-stream chunks for one client
+        last_event_id -> version the client already has (EventSource reconnects send it)
+        sends are at least Config.SSE_COALESCE_SECONDS apart, comments keep idle connections alive
+        """
+        seen, last_sent = self._resume_from(last_event_id), 0.0
+        self._subscribe(1)
+        try:
+            yield b'retry: 3000\n\n'
+            while True:
+                change = self.wait(seen, Config.SSE_HEARTBEAT_SECONDS)
+                if change is None:
+                    yield b': keepalive\n\n'
+                    continue
+                #changes landing inside the window are folded into the latest message
+                delay = last_sent + Config.SSE_COALESCE_SECONDS - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                seen, data = self.latest()
+                last_sent = time.monotonic()
+                yield sse_event(seen, data)
+        finally:
+            self._subscribe(-1)
+
+    async def astream(self, last_event_id=0):
+        """
+        async generator version of stream() for the asyncio server
+        """
+        seen, last_sent = self._resume_from(last_event_id), 0.0
+        self._subscribe(1)
+        try:
+            yield b'retry: 3000\n\n'
+            while True:
+                change = await self.await_change(seen, Config.SSE_HEARTBEAT_SECONDS)
+                if change is None:
+                    yield b': keepalive\n\n'
+                    continue
+                delay = last_sent + Config.SSE_COALESCE_SECONDS - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                seen, data = self.latest()
+                last_sent = time.monotonic()
+                yield sse_event(seen, data)
+        finally:
+            self._subscribe(-1)
+
+
+def sse_event(version, data):
+    """
+    returns bytes: one server-sent event, the version is the event id
+    """
+    return f'id: {version}\nevent: result\ndata: {data}\n\n'.encode()
+
+
+class ResultEvents:
+    """
+    registry of per webcam result channels
+    """
+    def __init__(self):
+        self.channels = {}
+        self.lock = threading.Lock()
+
+    def channel(self, webcam_id):
+        """
+        returns ResultChannel for a webcam, creating it on first use
+        """
+        with self.lock:
+            channel = self.channels.get(webcam_id)
+            if channel is None:
+                channel = self.channels[webcam_id] = ResultChannel(webcam_id)
+            return channel
+
+    def publish(self, webcam_id, result):
+        """
+        offers a result to the webcam's channel
+        returns bool: true if it was a change
+        """
+        return self.channel(webcam_id).publish(result)
+
+
+#shared by the analyzers and the events endpoint
+result_events = ResultEvents()
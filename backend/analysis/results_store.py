@@ -0,0 +1,122 @@
+import threading #serializes writers only
+
+#latest analysis result per webcam, shared by inference threads and request threads
+#writers build a new snapshot and swap one reference (copy-on-write), readers grab the
+#current snapshot with a single attribute read, so the read path takes no lock and never
+#sees a half applied update
+#results are treated as immutable records, analyzers publish a new dict instead of mutating
+
+
+class ResultsSnapshot:
+    """
+    immutable view of every webcam's latest result at one store version
+    """
+    __slots__ = ('version', 'results', 'versions', 'removed')
+
+    def __init__(self, version, results, versions, removed):
+        self.version = version #store version this snapshot was published at
+        self.results = results #webcam_id -> result dict
+        self.versions = versions #webcam_id -> version its result was published at
+        self.removed = removed #webcam_id -> version it was removed at
+
+
+class ResultsStore:
+    """
+    copy-on-write map of webcam_id -> latest result
+    dict-like (in, [], get, del, clear) so routes read it like the old module level dict
+    """
+    def __init__(self):
+        self._snapshot = ResultsSnapshot(0, {}, {}, {})
+        self._write_lock = threading.Lock()
+
+    def snapshot(self):
+        """
+        returns current ResultsSnapshot, lock free
+        """
+        return self._snapshot
+
+    @property
+    def version(self):
+        return self._snapshot.version
+
+    def publish(self, webcam_id, result):
+        """
+        stores a webcam's latest result
+        result -> dict, must not be mutated after publishing
+        returns int: the new store version
+        """
+        with self._write_lock:
+            current = self._snapshot
+            version = current.version + 1
+            removed = current.removed
+            if webcam_id in removed:
+                removed = {k: v for k, v in removed.items() if k != webcam_id}
+            self._snapshot = ResultsSnapshot(
+                version,
+                {**current.results, webcam_id: result},
+                {**current.versions, webcam_id: version},
+                removed,
+            )
+            return version
+
+    def remove(self, webcam_id):
+        """
+        drops a webcam's result
+        returns bool: false if there was none
+        """
+        with self._write_lock:
+            current = self._snapshot
+            if webcam_id not in current.results:
+                return False
+            version = current.version + 1
+            self._snapshot = ResultsSnapshot(
+                version,
+                {k: v for k, v in current.results.items() if k != webcam_id},
+                {k: v for k, v in current.versions.items() if k != webcam_id},
+                {**current.removed, webcam_id: version},
+            )
+            return True
+
+    def changed_since(self, version):
+        """
+        results published and webcams removed after a store version
+        version -> store version the caller last saw, 0 for everything
+        returns (current version, {webcam_id: result}, [removed webcam_ids])
+        """
+        snapshot = self._snapshot
+        changed = {
+            webcam_id: snapshot.results[webcam_id]
+            for webcam_id, published in snapshot.versions.items() if published > version
+        }
+        removed = [webcam_id for webcam_id, at in snapshot.removed.items() if at > version]
+        return snapshot.version, changed, removed
+
+    def get(self, webcam_id, default=None):
+        return self._snapshot.results.get(webcam_id, default)
+
+    def clear(self):
+        with self._write_lock:
+            self._snapshot = ResultsSnapshot(self._snapshot.version + 1, {}, {}, {})
+
+    def __contains__(self, webcam_id):
+        return webcam_id in self._snapshot.results
+
+    def __getitem__(self, webcam_id):
+        return self._snapshot.results[webcam_id]
+
+    def __setitem__(self, webcam_id, result):
+        self.publish(webcam_id, result)
+
+    def __delitem__(self, webcam_id):
+        if not self.remove(webcam_id):
+            raise KeyError(webcam_id)
+
+    def __iter__(self):
+        return iter(self._snapshot.results)
+
+    def __len__(self):
+        return len(self._snapshot.results)
+
+
+#shared by the analyzers (writers) and the api routes (readers)
+results_store = ResultsStore()
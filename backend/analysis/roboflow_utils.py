@@ -0,0 +1,218 @@
+import os #model file check
+import time #fake detector latency
+import numpy as np #onnx input/output tensors
+import cv2 #letterbox resize, NMS
+from config import Config #model settings
+
+#detector backends used by the batched inference scheduler
+#selected per webcam with the 'detector' key in WEBCAM_CONFIGS, Config.INFERENCE_BACKEND otherwise
+#every backend takes a list of BGR frames and returns one result per frame
+#in the same dict format roboflow_sink already handles:
+#{'predictions': [{'class': 'Surfer', 'confidence': 0.9, 'x': .., 'y': .., 'width': .., 'height': ..}]}
+
+
+class DetectorBackend:
+    """
+    base class for pluggable detector backends
+    """
+    name = 'base'
+
+    def infer_batch(self, images):
+        """
+        runs detection on a batch of frames
+        images -> list of BGR numpy arrays
+        returns list of result dicts, same order as images
+        """
+        raise NotImplementedError
+
+
+class FakeDetector(DetectorBackend):
+    """
+    deterministic local detector for tests and benchmarks
+    reports the same surfers for every frame, no model or network needed
+    """
+    name = 'fake'
+
+    def __init__(self, surfers=1, latency=0.0):
+        """
+        surfers -> surfer detections returned per frame
+        latency -> seconds each batch call sleeps, simulates model cost
+        """
+        self.surfers = surfers
+        self.latency = latency
+        self.batch_sizes = [] #size of every batch received
+
+    def infer_batch(self, images):
+        self.batch_sizes.append(len(images))
+        if self.latency:
+            time.sleep(self.latency)
+        results = []
+        for image in images:
+            height, width = image.shape[:2]
+            predictions = [{
+                'class': 'Surfer',
+                'confidence': 0.9,
+                'x': width * (i + 1) / (self.surfers + 1),
+                'y': height / 2,
+                'width': 20.0,
+                'height': 40.0
+            } for i in range(self.surfers)]
+            results.append({'predictions': predictions})
+        return results
+
+
+class RoboflowModelBackend(DetectorBackend):
+    """
+    runs the roboflow model in process with inference.get_model
+    one model instance serves every webcam, frames are inferred as one batch
+    """
+    name = 'roboflow'
+
+    def __init__(self, model_id=None, api_key=None):
+        """
+        model_id -> roboflow model id ('project/version'), defaults to Config.ROBOFLOW_MODEL_ID
+        api_key -> roboflow api key, defaults to Config.ROBOFLOW_API_KEY
+        """
+        from inference import get_model #imported here, loading inference models is slow
+        self.model_id = model_id or Config.ROBOFLOW_MODEL_ID
+        self.model = get_model(model_id=self.model_id, api_key=api_key or Config.ROBOFLOW_API_KEY)
+
+    def infer_batch(self, images):
+        responses = self.model.infer(images, confidence=Config.DETECTION_CONFIDENCE)
+        results = []
+        for response in responses:
+            #pydantic responses, aliases give 'class' instead of 'class_name'
+            dump = getattr(response, 'model_dump', None) or response.dict
+            results.append(dump(by_alias=True, exclude_none=True))
+        return results
+
+
+class OnnxDetector(DetectorBackend):
+    """
+    runs an exported YOLO detection model (ultralytics style ONNX, output (batch, 4 + classes, anchors))
+    with ONNX Runtime on the CPU
+    the model file is read once when the backend is created, nothing goes over the network
+    on start, restart or per frame
+    """
+    name = 'onnx'
+
+    def __init__(self, model_path=None, class_names=None, confidence=None, iou=None):
+        """
+        model_path -> exported .onnx file, defaults to Config.ONNX_MODEL_PATH
+        class_names -> class id -> name, defaults to Config.ONNX_CLASS_NAMES
+        confidence -> min class score, defaults to Config.DETECTION_CONFIDENCE
+        iou -> NMS overlap threshold, defaults to Config.ONNX_NMS_IOU
+        raises FileNotFoundError if the model hasn't been exported to model_path
+        """
+        import onnxruntime #imported here, only this backend needs it
+        self.model_path = model_path or Config.ONNX_MODEL_PATH
+        if not os.path.exists(self.model_path):
+            raise FileNotFoundError(f"ONNX model not found at {self.model_path}, export it and set ONNX_MODEL_PATH")
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = Config.ONNX_THREADS
+        self.session = onnxruntime.InferenceSession(self.model_path, sess_options=options, providers=['CPUExecutionProvider'])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        #NCHW, square input, a symbolic size falls back to the config
+        size = model_input.shape[2]
+        self.input_size = size if isinstance(size, int) else Config.ONNX_INPUT_SIZE
+        #exports with a fixed batch dimension get frames in chunks of that size
+        batch = model_input.shape[0]
+        self.max_batch = batch if isinstance(batch, int) else None
+        self.class_names = class_names or Config.ONNX_CLASS_NAMES
+        self.confidence = Config.DETECTION_CONFIDENCE if confidence is None else confidence
+        self.iou = iou or Config.ONNX_NMS_IOU
+
+    def infer_batch(self, images):
+        if not images:
+            return []
+        blobs, transforms = zip(*(self.letterbox(image) for image in images))
+        step = self.max_batch or len(blobs)
+        outputs = []
+        for i in range(0, len(blobs), step):
+            outputs.extend(self.session.run(None, {self.input_name: np.stack(blobs[i:i + step])})[0])
+        return [self.decode(output, transform) for output, transform in zip(outputs, transforms)]
+
+    def letterbox(self, image):
+        """
+        fits a BGR frame into the square model input, keeping its aspect ratio
+        returns (float32 CHW RGB blob in 0-1, (scale, pad_x, pad_y) to map boxes back)
+        """
+        size = self.input_size
+        height, width = image.shape[:2]
+        scale = min(size / width, size / height)
+        resized_w, resized_h = round(width * scale), round(height * scale)
+        pad_x, pad_y = (size - resized_w) // 2, (size - resized_h) // 2
+        canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+        canvas[pad_y:pad_y + resized_h, pad_x:pad_x + resized_w] = cv2.resize(image, (resized_w, resized_h))
+        blob = canvas[:, :, ::-1].transpose(2, 0, 1).astype(np.float32)
+        blob *= 1 / 255
+        return blob, (scale, pad_x, pad_y)
+
+    def decode(self, output, transform):
+        """
+        turns one frame's raw output into predictions in original frame pixels
+        output -> (4 + classes, anchors) array, rows are cx, cy, w, h then class scores
+        returns result dict
+        """
+        rows = output.T
+        class_ids = rows[:, 4:].argmax(axis=1)
+        confidences = rows[np.arange(len(rows)), 4 + class_ids]
+        keep = confidences >= self.confidence
+        if not keep.any():
+            return {'predictions': []}
+        rows, class_ids, confidences = rows[keep], class_ids[keep], confidences[keep]
+
+        scale, pad_x, pad_y = transform
+        boxes = rows[:, :4] / scale
+        boxes[:, 0] -= pad_x / scale
+        boxes[:, 1] -= pad_y / scale
+        #NMS per class, on top left x, y, w, h boxes
+        corners = np.column_stack([boxes[:, :2] - boxes[:, 2:] / 2, boxes[:, 2:]])
+        kept = cv2.dnn.NMSBoxesBatched(corners.tolist(), confidences.tolist(), class_ids.tolist(), self.confidence, self.iou)
+        return {'predictions': [{
+            'class': self.class_names[class_ids[i]] if class_ids[i] < len(self.class_names) else str(class_ids[i]),
+            'confidence': float(confidences[i]),
+            'x': float(boxes[i, 0]),
+            'y': float(boxes[i, 1]),
+            'width': float(boxes[i, 2]),
+            'height': float(boxes[i, 3]),
+        } for i in np.asarray(kept, dtype=int).reshape(-1)]}
+
+
+#name -> backend class, selected per webcam ('detector') or with Config.INFERENCE_BACKEND
+DETECTOR_BACKENDS = {
+    FakeDetector.name: FakeDetector,
+    RoboflowModelBackend.name: RoboflowModelBackend,
+    OnnxDetector.name: OnnxDetector,
+}
+
+
+def create_model_manager(model_id=None, api_key=None):
+    """
+    builds one roboflow ModelManager shared by every InferencePipeline in the process
+    the workflow's model (Config.ROBOFLOW_MODEL_ID, if set) is loaded up front, so its load time
+    and memory are measured once instead of inside the first pipeline
+    returns inference ModelManager
+    """
+    #imported here, loading inference models is slow
+    from inference.core.managers.base import ModelManager
+    from inference.core.registries.roboflow import RoboflowModelRegistry
+    from inference.models.utils import ROBOFLOW_MODEL_TYPES
+    manager = ModelManager(model_registry=RoboflowModelRegistry(ROBOFLOW_MODEL_TYPES))
+    model_id = model_id or Config.ROBOFLOW_MODEL_ID
+    if model_id:
+        manager.add_model(model_id, api_key=api_key or Config.ROBOFLOW_API_KEY)
+    return manager
+
+
+def create_backend(name=None):
+    """
+    builds a detector backend by name
+    returns DetectorBackend instance
+    raises ValueError for unknown backends
+    """
+    name = name or Config.INFERENCE_BACKEND
+    if name not in DETECTOR_BACKENDS:
+        raise ValueError(f"Unknown detector backend: {name}")
+    return DETECTOR_BACKENDS[name]()
@@ -0,0 +1,208 @@
+import struct #binary response header
+import threading #lru and per buoy locks
+from collections import OrderedDict #lru order
+import numpy as np #float32 chunks
+from config import Config #chunk size and byte budget
+from analysis.buoy_fetcher import buoy_cache, open_wave_dataset #remote sizes, lazy datasets
+
+#lazy, chunked spectral reads for /api/surfdata/spectrum
+#spectral variables are (waveTime, waveFrequency) arrays, orders of magnitude larger than the
+#summary parameters, so they are only read for the requested window, in fixed waveTime chunks,
+#and decoded chunks are kept in an lru bounded by bytes
+
+#spectral variables served by the endpoint
+SPECTRAL_VARIABLES = ('waveEnergyDensity', 'waveMeanDirection', 'waveA1Value', 'waveB1Value', 'waveA2Value', 'waveB2Value')
+
+
+class ChunkLRU:
+    """
+    least recently used cache of numpy arrays with a total byte budget
+    """
+    def __init__(self, max_bytes=None):
+        """
+        max_bytes -> total array bytes kept, oldest chunks are evicted past it
+        """
+        self.max_bytes = max_bytes or Config.SPECTRUM_CACHE_BYTES
+        self.chunks = OrderedDict() #key -> numpy array
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """
+        returns cached array or None
+        """
+        with self.lock:
+            chunk = self.chunks.get(key)
+            if chunk is None:
+                self.misses += 1
+                return None
+            self.chunks.move_to_end(key)
+            self.hits += 1
+            return chunk
+
+    def put(self, key, chunk):
+        """
+        caches an array, evicting least recently used chunks over the budget
+        arrays bigger than the whole budget are not cached
+        """
+        if chunk.nbytes > self.max_bytes:
+            return
+        with self.lock:
+            old = self.chunks.pop(key, None)
+            if old is not None:
+                self.nbytes -= old.nbytes
+            self.chunks[key] = chunk
+            self.nbytes += chunk.nbytes
+            while self.nbytes > self.max_bytes:
+                _, evicted = self.chunks.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+
+    def stats(self):
+        """
+        returns dict of lru counters
+        """
+        return {
+            'chunks': len(self.chunks),
+            'bytes': self.nbytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+class SpectrumLoader:
+    """
+    reads spectral windows chunk by chunk, only chunks missing from the lru touch the server
+    """
+    def __init__(self, cache=None, lru=None, chunk_records=None):
+        """
+        cache -> BuoyCache, gives the remote waveTime length and url template
+        lru -> ChunkLRU for decoded chunks
+        chunk_records -> waveTime records per chunk
+        """
+        self.cache = cache or buoy_cache
+        self.lru = lru or ChunkLRU()
+        self.chunk_records = chunk_records or Config.SPECTRUM_CHUNK_RECORDS
+        self.times = {} #buoy_id -> full waveTime axis, extended incrementally
+        self.frequencies = {} #buoy_id -> waveFrequency axis
+        self.locks = {} #buoy_id -> lock, one reader per buoy
+        self.lock = threading.Lock()
+
+    def _buoy_lock(self, buoy_id):
+        with self.lock:
+            return self.locks.setdefault(buoy_id, threading.Lock())
+
+    def window(self, buoy_id, variable, start=None, end=None, max_records=None):
+        """
+        spectral values for start <= waveTime <= end
+        variable -> one of SPECTRAL_VARIABLES
+        start/end -> datetime64 bounds, default is the latest 48 records
+        max_records -> largest window served
+        returns (times datetime64[ns] (T,), frequencies float32 (F,), values float32 (T, F))
+        raises ValueError for unknown variables or windows over max_records
+        """
+        if variable not in SPECTRAL_VARIABLES:
+            raise ValueError(f"Unknown spectral variable: {variable}")
+        max_records = max_records or Config.SPECTRUM_MAX_RECORDS
+        #keeps the buoy's remote size current, usually served from memory
+        self.cache.get(buoy_id)
+        size = self.cache.buoys[buoy_id].remote_size
+
+        with self._buoy_lock(buoy_id):
+            ds = None
+            try:
+                times = self.times.get(buoy_id)
+                if times is None or len(times) < size or buoy_id not in self.frequencies:
+                    ds = self._open(buoy_id)
+                    self._extend_axes(buoy_id, ds, size)
+                    times = self.times[buoy_id]
+                times = times[:size]
+                if start is None and end is None:
+                    lo, hi = max(0, size - 48), size
+                else:
+                    lo = 0 if start is None else int(np.searchsorted(times, start, side='left'))
+                    hi = size if end is None else int(np.searchsorted(times, end, side='right'))
+                if hi - lo > max_records:
+                    raise ValueError(f"Window has {hi - lo} records, max is {max_records}")
+
+                parts = []
+                chunks = range(lo // self.chunk_records, (hi - 1) // self.chunk_records + 1) if hi > lo else ()
+                for index in chunks:
+                    chunk_start = index * self.chunk_records
+                    chunk_end = min(chunk_start + self.chunk_records, size)
+                    #a partial tail chunk is keyed by its length, it grows as records arrive
+                    key = (buoy_id, variable, index, chunk_end - chunk_start)
+                    chunk = self.lru.get(key)
+                    if chunk is None:
+                        if ds is None:
+                            ds = self._open(buoy_id)
+                        chunk = np.ascontiguousarray(ds[variable][chunk_start:chunk_end].values, dtype=np.float32)
+                        self.lru.put(key, chunk)
+                    parts.append(chunk[max(lo, chunk_start) - chunk_start:min(hi, chunk_end) - chunk_start])
+            finally:
+                if ds is not None:
+                    ds.close()
+
+        frequencies = self.frequencies[buoy_id]
+        values = np.concatenate(parts) if parts else np.empty((0, len(frequencies)), dtype=np.float32)
+        return times[lo:hi], frequencies, values
+
+    def clear(self):
+        """
+        drops cached axes and chunks
+        """
+        with self.lock:
+            self.times.clear()
+            self.frequencies.clear()
+        self.lru = ChunkLRU(self.lru.max_bytes)
+
+    def _open(self, buoy_id):
+        return open_wave_dataset(self.cache.url_template.format(buoy_id=buoy_id))
+
+    def _extend_axes(self, buoy_id, ds, size):
+        """
+        reads only the waveTime records not seen yet, and waveFrequency once
+        """
+        times = self.times.get(buoy_id, np.empty(0, dtype='datetime64[ns]'))
+        if len(times) < size:
+            new = ds['waveTime'][len(times):size].values.astype('datetime64[ns]')
+            self.times[buoy_id] = np.concatenate((times, new))
+        if buoy_id not in self.frequencies:
+            self.frequencies[buoy_id] = ds['waveFrequency'].values.astype(np.float32)
+
+
+def encode_spectrum(times, frequencies, values):
+    """
+    packs a spectral window as little endian binary
+    layout: uint32 T, uint32 F | float64 unix seconds (T) | float32 frequencies Hz (F) | float32 values (T*F, row per time)
+    every section starts 8 or 4 byte aligned, so JS typed arrays can view the buffer directly
+    returns bytes
+    """
+    seconds = times.astype('datetime64[ns]').astype(np.int64) / 1e9
+    return b''.join((
+        struct.pack('<II', len(times), len(frequencies)),
+        seconds.astype('<f8').tobytes(),
+        frequencies.astype('<f4').tobytes(),
+        values.astype('<f4').tobytes(),
+    ))
+
+
+def decode_spectrum(body):
+    """
+    inverse of encode_spectrum
+    returns (unix seconds float64 (T,), frequencies float32 (F,), values float32 (T, F))
+    """
+    count, bins = struct.unpack_from('<II', body)
+    offset = 8
+    seconds = np.frombuffer(body, dtype='<f8', count=count, offset=offset)
+    offset += 8 * count
+    frequencies = np.frombuffer(body, dtype='<f4', count=bins, offset=offset)
+    offset += 4 * bins
+    values = np.frombuffer(body, dtype='<f4', count=count * bins, offset=offset).reshape(count, bins)
+    return seconds, frequencies, values
+
+
+#shared by every request in this process
+spectrum_loader = SpectrumLoader()
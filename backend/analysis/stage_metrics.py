@@ -0,0 +1,148 @@
+import os #/proc fallback page size and clock ticks
+import time #monotonic stage timestamps
+from array import array #preallocated histogram buckets
+from bisect import bisect_left #bucket lookup
+try:
+    import psutil #optional, process stats on any platform
+except ImportError:
+    psutil = None
+
+#per stage timing of the frame path, exposed by routes/metrics.py as /metrics
+#frames carry the time.monotonic() they left ffmpeg (BusFrame.timestamp), every stage after that
+#is measured against it, so end to end latency needs no extra bookkeeping per frame
+#an observation is one bisect over a short tuple and two adds into preallocated storage, no locks:
+#each histogram has a single writer thread, a scrape may see a count one ahead of the sum
+
+#seconds, upper bounds of the histogram buckets (+Inf is implicit)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+#frame_interval -> gap between frames out of ffmpeg, HLS fetch and transcode stalls show up here
+#decode -> JPEG split/decode (or encode in rawvideo mode) and fan-out to viewers
+#handoff -> frame on the bus until inference takes it
+#inference -> taken by inference until its result reaches roboflow_sink
+#sink -> roboflow_sink normalizing and counting the result
+#publish -> results store and event stream publish
+#end_to_end -> frame on the bus until its result is published
+STAGES = ('frame_interval', 'decode', 'handoff', 'inference', 'sink', 'publish', 'end_to_end')
+
+#skipped -> replaced on the bus before inference looked at it
+#rate_limited -> arrived faster than the adaptive inference rate
+#motion_gated -> static scene, previous result reused
+#decode_error -> ffmpeg output that didn't decode
+DROP_REASONS = ('skipped', 'rate_limited', 'motion_gated', 'decode_error')
+
+
+class Histogram:
+    """
+    fixed bucket latency histogram, Prometheus 'le' semantics
+    """
+    __slots__ = ('bounds', 'counts', 'total')
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = array('q', bytes(8 * (len(bounds) + 1))) #last slot is +Inf
+        self.total = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+        self.total += seconds
+
+    def snapshot(self):
+        """
+        returns (list of cumulative bucket counts ending with +Inf, count, sum)
+        """
+        cumulative = []
+        running = 0
+        for count in self.counts:
+            running += count
+            cumulative.append(running)
+        return cumulative, running, self.total
+
+
+class PipelineMetrics:
+    """
+    stage histograms and frame counters for one webcam's analyzer
+    """
+    def __init__(self, webcam_id, fps_window=32):
+        """
+        webcam_id -> webcam these metrics describe (metric label)
+        fps_window -> recent inferences the inference fps is measured over
+        """
+        self.webcam_id = webcam_id
+        self.stages = {stage: Histogram() for stage in STAGES}
+        self.drops = dict.fromkeys(DROP_REASONS, 0) #decode_error and skipped are filled in at scrape
+        self.frames_seen = 0 #bus frames offered to admit_frame
+        self.inferences = 0
+        self.restarts = {'ffmpeg': 0, 'pipeline': 0}
+        self.inference_times = array('d', bytes(8 * fps_window)) #ring of recent inference times
+        self.last_admitted = None #(bus timestamp, admitted at) of the frame inference took last
+
+    def observe(self, stage, seconds):
+        self.stages[stage].observe(seconds)
+
+    def admitted(self, bus_timestamp):
+        """
+        records a frame handed to inference
+        bus_timestamp -> BusFrame.timestamp
+        """
+        now = time.monotonic()
+        self.stages['handoff'].observe(now - bus_timestamp)
+        self.last_admitted = (bus_timestamp, now)
+
+    def inferred(self, sink_start, sink_done, published):
+        """
+        records the result of the last admitted frame
+        sink_start, sink_done, published -> time.monotonic() when roboflow_sink was called,
+        finished with the result and had published it
+        """
+        stages = self.stages
+        stages['sink'].observe(sink_done - sink_start)
+        stages['publish'].observe(published - sink_done)
+        if self.last_admitted is not None:
+            bus_timestamp, admitted_at = self.last_admitted
+            stages['inference'].observe(sink_start - admitted_at)
+            stages['end_to_end'].observe(published - bus_timestamp)
+            self.last_admitted = None
+        self.inference_times[self.inferences % len(self.inference_times)] = published
+        self.inferences += 1
+
+    def inference_fps(self, now=None):
+        """
+        returns inferences per second over the recent window, 0 if idle for the whole window
+        """
+        n = min(self.inferences, len(self.inference_times))
+        if n < 2:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        newest = self.inference_times[(self.inferences - 1) % len(self.inference_times)]
+        oldest = self.inference_times[(self.inferences - n) % len(self.inference_times)]
+        #a stalled webcam decays to 0 instead of reporting its last rate forever
+        span = max(newest, now) - oldest
+        return (n - 1) / span if span > 0 else 0.0
+
+
+def process_usage(pid):
+    """
+    cpu time and resident memory of a process (ffmpeg), psutil if installed else /proc
+    returns dict {'cpu_seconds', 'rss_bytes'}, None if the process is gone or unsupported
+    """
+    if psutil is not None:
+        try:
+            process = psutil.Process(pid)
+            cpu = process.cpu_times()
+            return {'cpu_seconds': cpu.user + cpu.system, 'rss_bytes': process.memory_info().rss}
+        except psutil.Error:
+            return None
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            #fields after the ')' of the command name start at field 3, utime/stime are 14/15
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open(f'/proc/{pid}/statm') as f:
+            rss_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    ticks = os.sysconf('SC_CLK_TCK')
+    return {
+        'cpu_seconds': (int(fields[11]) + int(fields[12])) / ticks,
+        'rss_bytes': rss_pages * os.sysconf('SC_PAGE_SIZE'),
+    }
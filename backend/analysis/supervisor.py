@@ -0,0 +1,189 @@
+import random #backoff jitter
+import threading #supervisor thread
+import time #backoff schedule, crash loop window
+from collections import deque #recent restart times per webcam
+from config import Config #check interval, backoff, crash loop limits
+from log_utils import get_logger #restart decisions
+
+logger = get_logger('supervisor')
+
+#one thread watches every running analyzer, replaces the sleeping health check thread each
+#analyzer used to spawn
+#a dead ffmpeg or inference pipeline is restarted after a jittered exponential backoff, so a
+#webcam whose source is down isn't respawned every check and webcams that failed together
+#don't all retry in the same second
+#a webcam restarted SUPERVISOR_CRASH_LIMIT times within SUPERVISOR_CRASH_WINDOW seconds is
+#marked 'crash_loop' and left alone for SUPERVISOR_BACKOFF_MAX seconds
+
+
+class RestartState:
+    """
+    restart bookkeeping for one analyzer, reset when its webcam gets a new analyzer
+    """
+    __slots__ = ('analyzer', 'failures', 'next_attempt', 'last_restart', 'restarts', 'crash_loops')
+
+    def __init__(self, analyzer):
+        self.analyzer = analyzer
+        self.failures = 0 #restarts since the analyzer was last stable
+        self.next_attempt = 0.0 #time.monotonic() before which no restart is tried
+        self.last_restart = None
+        self.restarts = deque() #time.monotonic() of restarts inside the crash window
+        self.crash_loops = 0
+
+
+class PipelineSupervisor:
+    """
+    health checks and restarts every analyzer from a single thread
+    """
+    def __init__(self, sources, interval=None, base_backoff=None, max_backoff=None, jitter=None,
+                 crash_window=None, crash_limit=None, stable_seconds=None):
+        """
+        sources -> callable returning dict of webcam_id -> LiveStreamAnalyzer (active_pipelines)
+        interval -> seconds between checks, Config.HEALTH_CHECK_INTERVAL if None
+        base_backoff -> seconds before the second restart, doubles with every further restart
+        max_backoff -> backoff ceiling, also the crash loop cooldown
+        jitter -> +/- fraction applied to every backoff
+        crash_window -> seconds restarts are counted over for crash loop detection
+        crash_limit -> restarts within crash_window that make a crash loop
+        stable_seconds -> healthy time after a restart before the backoff resets
+        """
+        self.sources = sources
+        self.interval = interval or Config.HEALTH_CHECK_INTERVAL
+        self.base_backoff = base_backoff or Config.SUPERVISOR_BACKOFF_BASE
+        self.max_backoff = max_backoff or Config.SUPERVISOR_BACKOFF_MAX
+        self.jitter = Config.SUPERVISOR_JITTER if jitter is None else jitter
+        self.crash_window = crash_window or Config.SUPERVISOR_CRASH_WINDOW
+        self.crash_limit = crash_limit or Config.SUPERVISOR_CRASH_LIMIT
+        self.stable_seconds = stable_seconds or Config.SUPERVISOR_STABLE_SECONDS
+        self.states = {} #webcam_id -> RestartState
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        #stats
+        self.checks = 0
+        self.restarts = 0
+        self.crash_loops = 0
+
+    def start(self):
+        """
+        starts the supervisor thread if not already running
+        """
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        """
+        stops the supervisor after the current check
+        """
+        self.stop_event.set()
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error("supervisor check failed: %s", e)
+
+    def backoff(self, failures):
+        """
+        returns seconds to wait after a webcam's nth consecutive restart
+        """
+        delay = min(self.base_backoff * 2 ** (failures - 1), self.max_backoff)
+        return min(delay * random.uniform(1 - self.jitter, 1 + self.jitter), self.max_backoff)
+
+    def tick(self, now=None):
+        """
+        checks every analyzer once, restarts the failed ones that are due
+        returns list of webcam ids restarted
+        """
+        now = time.monotonic() if now is None else now
+        pipelines = dict(self.sources())
+        due = []
+        with self.lock:
+            self.checks += 1
+            for webcam_id in list(self.states):
+                if webcam_id not in pipelines:
+                    del self.states[webcam_id]
+            for webcam_id, analyzer in pipelines.items():
+                state = self.states.get(webcam_id)
+                if state is None or state.analyzer is not analyzer:
+                    state = self.states[webcam_id] = RestartState(analyzer)
+                failed = analyzer.check_health()
+                if not failed:
+                    if state.failures and now - state.last_restart >= self.stable_seconds:
+                        logger.info("webcam=%s stable again after %d restarts", webcam_id, state.failures)
+                        state.failures = 0
+                    continue
+                if now >= state.next_attempt and self._schedule_restart(webcam_id, analyzer, state, failed, now):
+                    due.append((webcam_id, analyzer, failed))
+        #restarts wait on the old processes, done outside the lock
+        for webcam_id, analyzer, failed in due:
+            self._restart(webcam_id, analyzer, failed)
+        return [webcam_id for webcam_id, _, _ in due]
+
+    def _schedule_restart(self, webcam_id, analyzer, state, failed, now):
+        """
+        records a restart and its backoff unless the webcam is crash looping (caller holds the lock)
+        failed -> list of 'ffmpeg' and/or 'pipeline'
+        returns bool: true if the restart should be made
+        """
+        while state.restarts and now - state.restarts[0] > self.crash_window:
+            state.restarts.popleft()
+        if len(state.restarts) >= self.crash_limit:
+            logger.error("webcam=%s crash loop, %d restarts in %ds, next attempt in %ds",
+                         webcam_id, len(state.restarts), self.crash_window, self.max_backoff)
+            state.restarts.clear()
+            state.crash_loops += 1
+            state.next_attempt = now + self.max_backoff
+            self.crash_loops += 1
+            analyzer.set_status('crash_loop')
+            return False
+
+        state.failures += 1
+        state.restarts.append(now)
+        state.last_restart = now
+        state.next_attempt = now + self.backoff(state.failures)
+        self.restarts += 1
+        logger.warning("webcam=%s %s down, restart %d, next attempt not before %.1fs",
+                       webcam_id, '+'.join(failed), state.failures, state.next_attempt - now)
+        return True
+
+    def _restart(self, webcam_id, analyzer, failed):
+        """
+        restarts an analyzer's failed parts
+        """
+        try:
+            #ffmpeg first, a new pipeline waits for its first frame
+            if 'ffmpeg' in failed:
+                analyzer.restart_ffmpeg()
+            if 'pipeline' in failed:
+                analyzer.restart_pipeline()
+        except Exception as e:
+            logger.error("webcam=%s restart failed: %s", webcam_id, e)
+
+    def stats(self):
+        """
+        returns dict of restart counters and per webcam backoff state
+        """
+        now = time.monotonic()
+        with self.lock:
+            webcams = {
+                webcam_id: {
+                    'failures': state.failures,
+                    'recent_restarts': len(state.restarts),
+                    'crash_loops': state.crash_loops,
+                    'retry_in': round(max(state.next_attempt - now, 0.0), 1),
+                }
+                for webcam_id, state in self.states.items()
+            }
+        return {
+            'interval': self.interval,
+            'checks': self.checks,
+            'restarts': self.restarts,
+            'crash_loops': self.crash_loops,
+            'webcams': webcams,
+        }
@@ -0,0 +1,235 @@
+import os #store directories
+import threading #append lock
+import numpy as np #columnar files, memmap reads, resampling
+from config import Config #store location and limits
+
+#persistent columnar wave history
+#<root>/<buoy_id>/<YYYY-MM>/<column>.bin, one raw little endian array per column
+#writes are append only (new records are appended to the month's files),
+#reads memory map the files and copy just the requested slice
+
+#column -> on disk dtype
+COLUMNS = {
+    'waveHs': '<f4',
+    'waveTp': '<f4',
+    'waveDp': '<f4',
+    'waveTa': '<f4',
+    'waveTz': '<f4',
+    'wavePeakPSD': '<f4',
+    'waveFlagPrimary': '<i1',
+    'waveTime': '<M8[ns]', #written last, so a torn append never exposes a time without values
+}
+
+#resolution name -> bucket width
+RESOLUTIONS = {
+    'raw': None,
+    '1h': np.timedelta64(1, 'h'),
+    '3h': np.timedelta64(3, 'h'),
+    '6h': np.timedelta64(6, 'h'),
+    '1d': np.timedelta64(1, 'D'),
+}
+
+#directions are averaged as unit vectors, 350 and 10 degrees average to 0 not 180
+CIRCULAR_COLUMNS = ('waveDp',)
+
+
+def _as_column(values, dtype):
+    """
+    returns values cast to a column's on disk dtype, NaN flags become 0 (missing)
+    """
+    values = np.asarray(values)
+    if np.dtype(dtype).kind == 'i' and values.dtype.kind == 'f':
+        values = np.nan_to_num(values, nan=0)
+    return values.astype(dtype)
+
+
+def resample(columns, step):
+    """
+    averages records into fixed time buckets
+    columns -> dict of arrays incl. 'waveTime', sorted by time
+    step -> numpy timedelta64 bucket width
+    returns dict of arrays, one row per non empty bucket, time = bucket start
+    """
+    times = columns['waveTime']
+    if not len(times):
+        return columns
+    buckets = times.astype('datetime64[ns]').astype(np.int64) // step.astype('timedelta64[ns]').astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    out = {'waveTime': (buckets[starts] * step.astype('timedelta64[ns]').astype(np.int64)).astype('datetime64[ns]')}
+    for name, values in columns.items():
+        if name in ('waveTime', 'waveFlagPrimary'):
+            continue
+        values = values.astype(np.float64)
+        valid = ~np.isnan(values)
+        counts = np.add.reduceat(valid.astype(np.int64), starts)
+        if name in CIRCULAR_COLUMNS:
+            radians = np.deg2rad(values)
+            sin = np.add.reduceat(np.nan_to_num(np.sin(radians)), starts)
+            cos = np.add.reduceat(np.nan_to_num(np.cos(radians)), starts)
+            #a bucket with no valid direction is missing, not arctan2(0, 0) = due north
+            out[name] = np.where(counts > 0, np.rad2deg(np.arctan2(sin, cos)) % 360, np.nan).astype(np.float32)
+            continue
+        sums = np.add.reduceat(np.where(valid, values, 0), starts)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out[name] = (sums / counts).astype(np.float32)
+    return out
+
+
+class WaveStore:
+    """
+    append only, memory mapped wave history per buoy per month
+    """
+    def __init__(self, root=None):
+        """
+        root -> directory the store lives in
+        """
+        self.root = root or Config.WAVE_STORE_DIR
+        self.last_times = {} #buoy_id -> newest stored datetime64, read from disk once
+        self.lock = threading.Lock()
+
+    def _buoy_dir(self, buoy_id):
+        """
+        returns the buoy's directory, the store never touches paths outside root
+        raises ValueError for ids that aren't plain digits or resolve outside root (symlinks)
+        """
+        if not (isinstance(buoy_id, str) and buoy_id.isascii() and buoy_id.isdigit()):
+            raise ValueError(f"Invalid buoy id: {buoy_id!r}")
+        path = os.path.join(self.root, buoy_id)
+        root = os.path.realpath(self.root)
+        if os.path.commonpath((root, os.path.realpath(path))) != root:
+            raise ValueError(f"Buoy id {buoy_id!r} resolves outside the wave store")
+        return path
+
+    def _month_dir(self, buoy_id, month):
+        return os.path.join(self._buoy_dir(buoy_id), str(month))
+
+    def months(self, buoy_id):
+        """
+        returns sorted list of 'YYYY-MM' partitions stored for a buoy
+        raises ValueError for invalid buoy ids
+        """
+        path = self._buoy_dir(buoy_id)
+        if not os.path.isdir(path):
+            return []
+        return sorted(name for name in os.listdir(path) if len(name) == 7 and name[4] == '-')
+
+    def _length(self, path):
+        """
+        returns int: complete records in a month directory, the shortest column wins
+        """
+        lengths = []
+        for name, dtype in COLUMNS.items():
+            file = os.path.join(path, f'{name}.bin')
+            lengths.append(os.path.getsize(file) // np.dtype(dtype).itemsize if os.path.exists(file) else 0)
+        return min(lengths)
+
+    def _open_month(self, buoy_id, month):
+        """
+        memory maps one month of columns
+        returns dict of read only arrays cut to the shortest column (guards torn appends)
+        """
+        path = self._month_dir(buoy_id, month)
+        length = self._length(path)
+        if length == 0:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+        return {
+            name: np.memmap(os.path.join(path, f'{name}.bin'), dtype=dtype, mode='r', shape=(length,))
+            for name, dtype in COLUMNS.items()
+        }
+
+    def last_time(self, buoy_id):
+        """
+        returns datetime64 of the newest stored record, None if the buoy has no history
+        """
+        if buoy_id not in self.last_times:
+            last = None
+            for month in reversed(self.months(buoy_id)):
+                times = self._open_month(buoy_id, month)['waveTime']
+                if len(times):
+                    last = times[-1].copy()
+                    break
+            self.last_times[buoy_id] = last
+        return self.last_times[buoy_id]
+
+    def append(self, buoy_id, records):
+        """
+        appends records newer than the newest stored one
+        records -> dict of arrays with 'waveTime' and every column in COLUMNS, sorted by time
+        returns int: records written
+        """
+        with self.lock:
+            times = np.asarray(records['waveTime']).astype('datetime64[ns]')
+            last = self.last_time(buoy_id)
+            keep = slice(int(np.searchsorted(times, last, side='right')), None) if last is not None else slice(None)
+            times = times[keep]
+            if not len(times):
+                return 0
+
+            columns = {
+                name: times if name == 'waveTime' else _as_column(np.asarray(records[name])[keep], dtype)
+                for name, dtype in COLUMNS.items()
+            }
+            #splits at month boundaries, each month is its own partition
+            months = times.astype('datetime64[M]')
+            bounds = np.flatnonzero(np.r_[True, months[1:] != months[:-1]])
+            for lo, hi in zip(bounds, np.r_[bounds[1:], len(times)]):
+                path = self._month_dir(buoy_id, months[lo])
+                os.makedirs(path, exist_ok=True)
+                length = self._length(path)
+                for name, values in columns.items():
+                    with open(os.path.join(path, f'{name}.bin'), 'ab') as f:
+                        #drops the tail of an earlier torn append so columns stay aligned
+                        f.truncate(length * values.itemsize)
+                        f.write(values[lo:hi].tobytes())
+            self.last_times[buoy_id] = times[-1]
+            return len(times)
+
+    def read(self, buoy_id, start=None, end=None, good_only=True):
+        """
+        records with start <= waveTime <= end, only the matching slice of each month is copied
+        start/end -> datetime64 bounds, open ended if None
+        good_only -> drops records not flagged good (waveFlagPrimary == 1)
+        returns dict of arrays (empty if nothing matches)
+        """
+        parts = []
+        for month in self.months(buoy_id):
+            #whole months outside the range are never opened
+            month_key = np.datetime64(month, 'M')
+            if start is not None and month_key < start.astype('datetime64[M]'):
+                continue
+            if end is not None and month_key > end.astype('datetime64[M]'):
+                break
+            columns = self._open_month(buoy_id, month)
+            times = columns['waveTime']
+            lo = 0 if start is None else int(np.searchsorted(times, start, side='left'))
+            hi = len(times) if end is None else int(np.searchsorted(times, end, side='right'))
+            if hi > lo:
+                parts.append({name: np.array(values[lo:hi]) for name, values in columns.items()})
+        if not parts:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+        result = {name: np.concatenate([part[name] for part in parts]) for name in COLUMNS}
+        if good_only:
+            good = result['waveFlagPrimary'] == 1
+            result = {name: values[good] for name, values in result.items()}
+        return result
+
+    def query(self, buoy_id, start=None, end=None, resolution=None, max_points=None):
+        """
+        range read + optional resampling for the api
+        resolution -> key of RESOLUTIONS, the finest one staying under max_points if None
+        returns (resolution, dict of arrays)
+        raises ValueError for unknown resolutions
+        """
+        max_points = max_points or Config.WAVE_STORE_MAX_POINTS
+        if resolution is not None and resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution: {resolution}")
+        columns = self.read(buoy_id, start, end)
+        if resolution is None:
+            for name, step in RESOLUTIONS.items():
+                resolution = name
+                resampled = columns if step is None else resample(columns, step)
+                if len(resampled['waveTime']) <= max_points:
+                    return name, resampled
+            return resolution, resampled
+        step = RESOLUTIONS[resolution]
+        return resolution, columns if step is None else resample(columns, step)
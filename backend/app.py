@@ -4,6 +4,10 @@ from flask_cors import CORS #handles cross origin resource sharing for api acess
 from routes.video_analysis import video_analysis_bp #handles surfer detection
 from routes.surf_data import surf_data_bp #handles surf conditons
 from routes.frontend import frontend_bp #serves main frotned
+from routes.metrics import metrics_bp #prometheus /metrics
+import os #reloader detection
+from analysis.buoy_prefetcher import buoy_prefetcher #keeps buoy data warm
+from routes.video_analysis import pipeline_manager #warm webcams, idle eviction
 from config import Config #app settings and constants
 
 def create_app():
@@ -23,9 +27,15 @@ def create_app():
     app.register_blueprint(video_analysis_bp)
     app.register_blueprint(surf_data_bp)
     app.register_blueprint(frontend_bp)
+    app.register_blueprint(metrics_bp)
     
     return app
 
 if __name__ == '__main__':
     app = create_app()
+    #the debug reloader runs this twice, only the serving child prefetches and warms webcams
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        if Config.BUOY_PREFETCH_ENABLED:
+            buoy_prefetcher.start()
+        pipeline_manager.start()
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,131 @@
+import asyncio #event loop, executor handoff
+from concurrent.futures import ThreadPoolExecutor #runs the Flask views off the loop
+from aiohttp import web #asyncio http server
+from multidict import CIMultiDict #response headers
+from werkzeug.test import EnvironBuilder #aiohttp request -> WSGI environ
+from werkzeug.wrappers import Response as WSGIResponse #collects a WSGI app's response
+from app import create_app #same blueprints as the threaded server
+from routes.video_analysis import active_pipelines, pipeline_manager #webcams with a frame bus, lifecycle
+from analysis.result_events import result_events #surfer count pushes
+from webcam_configs import WEBCAM_CONFIGS
+from analysis.mjpeg_broadcaster import MULTIPART_BOUNDARY
+from analysis.buoy_prefetcher import buoy_prefetcher #keeps buoy data warm
+from config import Config #host, port, worker threads
+
+#asyncio entry point, alternative to app.py's threaded dev server
+#/video_feed viewers and /api/video-analysis/events subscribers are coroutines
+#every other request (/api/video-analysis, /api/surfdata, /) runs the unchanged Flask views
+#on a small thread pool, so idle keep-alive and streaming connections hold no thread
+#python async_app.py
+
+#response headers aiohttp sets itself from the body
+_HOP_HEADERS = ('content-length', 'transfer-encoding', 'connection')
+
+
+def wsgi_handler(flask_app, executor):
+    """
+    returns aiohttp handler serving requests through a Flask app on the executor
+    the response is buffered, only meant for the short non streaming endpoints
+    """
+    async def handle(request):
+        body = await request.read()
+        environ = EnvironBuilder(
+            path=request.path,
+            method=request.method,
+            query_string=request.query_string,
+            headers=list(request.headers.items()),
+            data=body,
+        ).get_environ()
+        environ['REMOTE_ADDR'] = request.remote or ''
+
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(executor, WSGIResponse.from_app, flask_app, environ, True)
+        headers = CIMultiDict((k, v) for k, v in response.headers.items() if k.lower() not in _HOP_HEADERS)
+        return web.Response(body=response.get_data(), status=response.status_code, headers=headers)
+    return handle
+
+
+async def video_feed(request):
+    """
+    async /video_feed/<webcam_id>, same stream as the Flask route
+    returns streaming response with mjpeg vid data, 404 for inactive webcams
+    """
+    webcam_id = request.match_info['webcam_id']
+    analyzer = active_pipelines.get(webcam_id)
+    if analyzer is None:
+        return web.Response(text="Webcam not active", status=404)
+
+    response = web.StreamResponse(headers={
+        'Content-Type': f'multipart/x-mixed-replace; boundary={MULTIPART_BOUNDARY}',
+        'Cache-Control': 'no-cache',
+    })
+    await response.prepare(request)
+    stream = analyzer.frame_bus.broadcaster.astream()
+    try:
+        async for chunk in stream:
+            await response.write(chunk)
+    except ConnectionResetError:
+        pass #viewer left
+    finally:
+        await stream.aclose()
+    return response
+
+
+async def analysis_events(request):
+    """
+    async /api/video-analysis/events, same stream as the Flask route
+    returns text/event-stream response, 400/404 for missing or unknown webcams
+    """
+    webcam_id = request.query.get('webcam_id')
+    if not webcam_id:
+        return web.json_response({'error': 'No Webcam Selected'}, status=400)
+    if webcam_id not in WEBCAM_CONFIGS:
+        return web.json_response({'error': 'Webcam Not Available'}, status=404)
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID', 0))
+    except ValueError:
+        last_event_id = 0
+
+    response = web.StreamResponse(headers={
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'Access-Control-Allow-Origin': '*',
+    })
+    await response.prepare(request)
+    stream = result_events.channel(webcam_id).astream(last_event_id)
+    try:
+        async for chunk in stream:
+            await response.write(chunk)
+    except ConnectionResetError:
+        pass #client left
+    finally:
+        await stream.aclose()
+    return response
+
+
+def create_async_app(flask_app=None, workers=None):
+    """
+    builds the aiohttp application
+    flask_app -> Flask app whose views serve the non streaming routes, create_app() if None
+    workers -> threads for those views, Config.ASYNC_WORKERS if None
+    returns aiohttp web.Application
+    """
+    flask_app = flask_app or create_app()
+    executor = ThreadPoolExecutor(max_workers=workers or Config.ASYNC_WORKERS, thread_name_prefix='async-wsgi')
+
+    app = web.Application()
+    app.router.add_get('/video_feed/{webcam_id}', video_feed)
+    app.router.add_get('/api/video-analysis/events', analysis_events)
+    app.router.add_route('*', '/{tail:.*}', wsgi_handler(flask_app, executor))
+
+    async def shutdown(app):
+        executor.shutdown(wait=False)
+    app.on_cleanup.append(shutdown)
+    return app
+
+
+if __name__ == '__main__':
+    if Config.BUOY_PREFETCH_ENABLED:
+        buoy_prefetcher.start()
+    pipeline_manager.start()
+    web.run_app(create_async_app(), host=Config.ASYNC_HOST, port=Config.ASYNC_PORT)
@@ -1,23 +1,58 @@
 import unittest
 from unittest.mock import Mock, patch, MagicMock
+import asyncio
+import io
 import json
+import logging
 import threading
 import time
 from datetime import datetime
 import subprocess
 import sys
 import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import cv2
+import xarray as xr
+import pandas as pd
 
 #adds backend directory to the Python path so we can import modules
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from analysis.live_stream_analyzer import LiveStreamAnalyzer
+from analysis.mjpeg_broadcaster import JpegFrameParser, MJPEGBroadcaster
+from analysis.frame_bus import FrameBus
+from analysis.batch_scheduler import BatchInferenceScheduler
+from analysis.roboflow_utils import FakeDetector, OnnxDetector, create_backend
+from analysis.detections import normalize_result, FrameResult
+from analysis.motion_gate import MotionGate
+from analysis.rate_controller import AdaptiveRateController, FpsBudget
+from analysis.count_history import CountRing, CountHistory, count_histories
+from analysis.result_events import ResultChannel, result_events
+from analysis.results_store import ResultsStore
+from analysis.pipeline_manager import PipelineManager, PipelineLimitError
+from analysis.model_registry import ModelRegistry, model_registry
+from analysis.supervisor import PipelineSupervisor
+from analysis import stage_metrics
+from analysis.stage_metrics import Histogram, PipelineMetrics, process_usage
+from analysis.buoy_fetcher import BuoyCache, buoy_cache, open_wave_dataset, load_wave_records
+from analysis.buoy_prefetcher import BuoyPrefetcher
+from analysis.wave_store import WaveStore, resample
+from analysis.spectrum_loader import ChunkLRU, SpectrumLoader, encode_spectrum, decode_spectrum, spectrum_loader
 from routes.video_analysis import video_analysis_bp, analysis_results, active_pipelines
-from routes.surf_data import surf_data_bp
+from routes.surf_data import surf_data_bp, build_surf_payload
 from routes.frontend import frontend_bp
 from config import Config
+from log_utils import get_logger
 from webcam_configs import WEBCAM_CONFIGS
 from app import create_app
+from async_app import create_async_app
+from aiohttp.test_utils import AioHTTPTestCase
+try:
+    import onnx #only needed to build the tiny test model, not by the app
+except ImportError:
+    onnx = None
 
 
 class TestConfig(unittest.TestCase):
@@ -41,7 +76,6 @@ class TestConfig(unittest.TestCase):
         
         #tests all required analysis settings exist
         self.assertTrue(hasattr(Config, 'MAX_FPS'))
-        self.assertTrue(hasattr(Config, 'BASE_PORT'))
         
         #tests all required FFmpeg settings exist
         self.assertTrue(hasattr(Config, 'FFMPEG_QUALITY'))
@@ -62,10 +96,6 @@ class TestConfig(unittest.TestCase):
         self.assertGreaterEqual(Config.MAX_FPS, 1)
         self.assertLessEqual(Config.MAX_FPS, 30)
         
-        #tests that port is in valid range
-        self.assertGreaterEqual(Config.BASE_PORT, 1024)  #above reserved ports
-        self.assertLessEqual(Config.BASE_PORT, 65535)    #below max ports
-        
         #tests that FFmpeg quality is valid (1-31)
         self.assertGreaterEqual(Config.FFMPEG_QUALITY, 1)
         self.assertLessEqual(Config.FFMPEG_QUALITY, 31)
@@ -142,47 +172,87 @@ class TestLiveStreamAnalyzer(unittest.TestCase):
         self.assertIsNone(self.analyzer.ffmpeg_process)
         self.assertIsNone(self.analyzer.pipeline)
         
-        #test port calculation
-        expected_port = Config.BASE_PORT + 1  # Since webcam_id is not digit
-        self.assertEqual(self.analyzer.port_number, expected_port)
-        
-        #test stream URL construction
-        expected_stream_url = f"http://localhost:{expected_port}/stream.mjpeg"
-        self.assertEqual(self.analyzer.stream_url, expected_stream_url)
+        #test frame bus is created but not running yet
+        self.assertEqual(self.analyzer.frame_bus.webcam_id, self.webcam_id)
+        self.assertFalse(self.analyzer.frame_bus.running)
         
         #test initial result structure
         self.assertEqual(self.analyzer.latest_result['surfer_count'], 0)
         self.assertEqual(self.analyzer.latest_result['status'], 'Starting')
         self.assertIsNone(self.analyzer.latest_result['last_update'])
     
-    def test_port_calculation_with_numeric_id(self):
-        """
-        tests port calculation when webcam_id is numerical
-        """
-        numeric_analyzer = LiveStreamAnalyzer("123", self.hls_url)
-        expected_port = Config.BASE_PORT + 123
-        self.assertEqual(numeric_analyzer.port_number, expected_port)
-    
     @patch('subprocess.Popen')
     def test_start_ffmpeg_conversion_success(self, mock_popen):
         """
         tests successful FFmpeg process startup.
         """
-        #mock successful process creation
+        #mock successful process creation, empty stdout pipe
         mock_process = Mock()
+        mock_process.stdout = io.BytesIO(b'')
         mock_popen.return_value = mock_process
         
         #test successful start
         result = self.analyzer.start_ffmpeg_conversion()
         self.assertTrue(result)
         self.assertEqual(self.analyzer.ffmpeg_process, mock_process)
+        self.analyzer.frame_bus.stop()
         
         #verify FFmpeg was called with correct parameters
         mock_popen.assert_called_once()
         call_args = mock_popen.call_args[0][0]  # Get the command list
         self.assertIn('ffmpeg', call_args)
         self.assertIn(self.hls_url, call_args)
-        self.assertIn(self.analyzer.stream_url, call_args)
+        self.assertIn('pipe:1', call_args)
+        self.assertNotIn('-listen', call_args)
+        self.assertEqual(mock_popen.call_args[1]['stdout'], subprocess.PIPE)
+    
+    @patch('subprocess.Popen')
+    def test_realtime_input_flag_is_optional(self, mock_popen):
+        """
+        tests -re is only passed while FFMPEG_REALTIME_INPUT is on
+        """
+        mock_process = Mock()
+        mock_process.stdout = io.BytesIO(b'')
+        mock_popen.return_value = mock_process
+        
+        with patch.object(Config, 'FFMPEG_REALTIME_INPUT', False):
+            self.analyzer.start_ffmpeg_conversion()
+        self.assertNotIn('-re', mock_popen.call_args[0][0])
+        with patch.object(Config, 'FFMPEG_REALTIME_INPUT', True):
+            self.analyzer.start_ffmpeg_conversion()
+        self.assertIn('-re', mock_popen.call_args[0][0])
+        self.analyzer.frame_bus.stop()
+    
+    def test_wait_for_first_frame_wakes_on_publish(self):
+        """
+        tests readiness returns as soon as the first frame is published, not after a fixed sleep
+        """
+        _, jpeg = cv2.imencode('.jpg', np.zeros((8, 8, 3), dtype=np.uint8))
+        self.analyzer.frame_bus.running = True
+        self.analyzer.started_at = time.monotonic()
+        threading.Timer(0.2, self.analyzer.frame_bus.publish_jpeg, args=(jpeg.tobytes(),)).start()
+        
+        started = time.monotonic()
+        self.assertTrue(self.analyzer.wait_for_first_frame(deadline=5))
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertGreaterEqual(self.analyzer.first_frame_seconds, 0.2)
+        self.analyzer.frame_bus.stop()
+    
+    def test_wait_for_first_frame_gives_up(self):
+        """
+        tests readiness fails fast when ffmpeg exits, and at the deadline otherwise
+        """
+        self.analyzer.frame_bus.running = True
+        self.analyzer.ffmpeg_process = Mock()
+        self.analyzer.ffmpeg_process.poll.return_value = 1
+        started = time.monotonic()
+        self.assertFalse(self.analyzer.wait_for_first_frame(deadline=10))
+        self.assertLess(time.monotonic() - started, 1)
+        
+        self.analyzer.ffmpeg_process.poll.return_value = None
+        self.assertFalse(self.analyzer.wait_for_first_frame(deadline=0.3))
+        self.assertIsNone(self.analyzer.first_frame_seconds)
+        self.analyzer.frame_bus.stop()
     
     @patch('subprocess.Popen')
     def test_start_ffmpeg_conversion_failure(self, mock_popen):
@@ -251,6 +321,85 @@ class TestLiveStreamAnalyzer(unittest.TestCase):
         #verify system handled the error gracefully
         self.assertEqual(self.analyzer.latest_result['surfer_count'], 0)
     
+    def test_roboflow_sink_with_detections_array(self):
+        """
+        tests the sink counts sv.Detections style results (class names in a numpy array)
+        """
+        detections = Mock()
+        detections.xyxy = np.array([[0, 0, 10, 10], [5, 5, 15, 15], [0, 0, 50, 20]])
+        detections.confidence = np.array([0.9, 0.8, 0.7])
+        detections.data = {'class_name': np.array(['Surfer', 'surfer', 'Wave'])}
+        
+        #InferencePipeline can also wrap results in a tuple
+        self.analyzer.roboflow_sink(({'predictions': detections},), None)
+        self.assertEqual(self.analyzer.latest_result['surfer_count'], 2)
+        self.assertIsInstance(self.analyzer.latest_result['detections'], FrameResult)
+    
+    def test_log_records_are_queued_unformatted(self):
+        """
+        tests logging from the sink only enqueues, the message is built by the writer thread
+        """
+        formatted = []
+
+        class Arg:
+            def __str__(self):
+                formatted.append(threading.current_thread())
+                return 'arg'
+
+        get_logger('test')
+        handler = logging.getLogger('surf_reporter').handlers[0]
+        record = logging.LogRecord('surf_reporter.test', logging.WARNING, __file__, 1, "formatted %s", (Arg(),), None)
+        self.assertIs(handler.prepare(record), record)
+        self.assertEqual(formatted, [])
+        self.assertIsNone(getattr(record, 'message', None))
+
+    def test_normalize_result_formats(self):
+        """
+        tests every prediction format normalizes to the same FrameResult
+        """
+        tuples = [([0, 0, 10, 20], None, 0.9, 0, None, {'class_name': 'Surfer'})] * 3
+        dicts = [{'class': 'Surfer', 'x': 5, 'y': 10, 'width': 10, 'height': 20, 'confidence': 0.8},
+                 {'class_name': 'surfer'}, {'class': 'Bird'}]
+        mixed = tuples[:1] + dicts + [(1, 2), 'junk']
+        
+        self.assertEqual(normalize_result({'predictions': tuples}).count('surfer'), 3)
+        self.assertEqual(normalize_result({'predictions': dicts}).count('Surfer'), 2)
+        self.assertEqual(normalize_result({'predictions': mixed}).count('surfer'), 3)
+        self.assertEqual(len(normalize_result({'predictions': []})), 0)
+        self.assertEqual(len(normalize_result('invalid_data')), 0)
+        
+        #dict center boxes become xyxy, same as the tuple rows
+        result = normalize_result({'predictions': dicts})
+        np.testing.assert_allclose(result.boxes[0], [0, 0, 10, 20])
+        self.assertEqual(result.count('surfer', min_confidence=0.5), 1)
+
+    def test_sink_keeps_only_arrays(self):
+        """
+        tests the stored result holds the normalized arrays, not the raw prediction list
+        """
+        predictions = [{'class': 'Surfer', 'x': 5, 'y': 10, 'width': 10, 'height': 20, 'confidence': 0.8}] * 2
+        self.analyzer.roboflow_sink({'predictions': predictions}, None)
+        detections = self.analyzer.latest_result['detections']
+        self.assertEqual(self.analyzer.latest_result['surfer_count'], 2)
+        self.assertEqual(FrameResult.__slots__, ('boxes', 'confidences', 'class_ids', 'timestamp'))
+        self.assertIsInstance(detections.boxes, np.ndarray)
+        np.testing.assert_allclose(detections.boxes, [[0, 0, 10, 20]] * 2)
+
+    def test_frame_result_arrays(self):
+        """
+        tests FrameResult dtypes, iteration and api dict
+        """
+        result = normalize_result({'predictions': [
+            {'class': 'Surfer', 'x': 5, 'y': 5, 'width': 10, 'height': 10, 'confidence': 0.9}
+        ]})
+        
+        self.assertEqual(result.boxes.dtype, np.float32)
+        self.assertEqual(result.confidences.dtype, np.float32)
+        self.assertEqual(result.class_ids.dtype, np.int16)
+        self.assertFalse(hasattr(result, '__dict__'))
+        self.assertEqual([d.class_name for d in result], ['Surfer'])
+        self.assertEqual(result.to_dict(), {'boxes': [[0.0, 0.0, 10.0, 10.0]], 'confidences': [0.9], 'classes': ['Surfer']})
+    
     def test_check_ffmpeg_process_running(self):
         """
         tests FFmpeg process health check when process is running.
@@ -305,268 +454,2070 @@ class TestLiveStreamAnalyzer(unittest.TestCase):
         mock_process.wait.assert_called_once()
 
 
-class TestVideoAnalysisRoutes(unittest.TestCase):
+class TestMJPEGBroadcaster(unittest.TestCase):
     """
-    tests for video analysis API routes
+    tests for JPEG frame parsing and viewer fan-out
     """
     
-    def setUp(self):
+    def test_parser_splits_frames_across_chunks(self):
         """
-        creates a test Flask app and clears global state.
+        tests frames split over several reads are reassembled
         """
-        self.app = create_app()
-        self.client = self.app.test_client()
-        self.app_context = self.app.app_context()
-        self.app_context.push()
+        frame_a = b'\xff\xd8' + b'aaaa' + b'\xff\xd9'
+        frame_b = b'\xff\xd8' + b'bbbbbb' + b'\xff\xd9'
+        data = b'junk' + frame_a + frame_b
         
-        #clear global state
-        analysis_results.clear()
-        active_pipelines.clear()
+        parser = JpegFrameParser()
+        frames = []
+        #feeds 3 bytes at a time so markers get split
+        for i in range(0, len(data), 3):
+            frames.extend(parser.feed(data[i:i + 3]))
+        
+        self.assertEqual(frames, [frame_a, frame_b])
     
-    def tearDown(self):
+    def test_slow_client_drops_stale_frames(self):
         """
-        cleans up after each test method
+        tests a client that never reads only keeps the newest frames
         """
-        self.app_context.pop()
-    
-    def test_get_video_analysis_no_webcam_id(self):
+        broadcaster = MJPEGBroadcaster(client_queue_size=2)
+        client = broadcaster.subscribe()
+        
+        for i in range(5):
+            broadcaster.publish(bytes([i]))
+        
+        self.assertEqual(client.qsize(), 2)
+        self.assertEqual(client.get_nowait(), bytes([3]))
+        self.assertEqual(client.get_nowait(), bytes([4]))
+        self.assertEqual(broadcaster.frames_dropped, 3)
+
+    def test_concurrent_publishers_count_every_drop(self):
         """
-        tests video analysis endpoint when no webcam_id is provided.
+        tests frames_dropped stays exact when several threads publish at once
         """
-        response = self.client.get('/api/video-analysis')
-        self.assertEqual(response.status_code, 400)
+        broadcaster = MJPEGBroadcaster(client_queue_size=1)
+        client = broadcaster.subscribe()
+
+        def publish_many():
+            for _ in range(2000):
+                broadcaster.publish(b'x')
+
+        threads = [threading.Thread(target=publish_many) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        #every published frame is either still queued or was counted as dropped
+        self.assertEqual(broadcaster.frames_published, 8000)
+        self.assertEqual(client.qsize() + broadcaster.frames_dropped, 8000)
+
+    def test_stream_yields_multipart_and_unsubscribes(self):
+        """
+        tests the client generator yields multipart chunks and cleans up on stop
+        """
+        broadcaster = MJPEGBroadcaster()
+        broadcaster.running = True
+        broadcaster.publish(b'\xff\xd8jpeg\xff\xd9')
         
-        data = json.loads(response.data)
-        self.assertIn('error', data)
-        self.assertEqual(data['error'], 'No Webcam Selected')
+        stream = broadcaster.stream()
+        chunk = next(stream)
+        self.assertIn(b'--frame', chunk)
+        self.assertIn(b'\xff\xd8jpeg\xff\xd9', chunk)
+        self.assertEqual(broadcaster.client_count(), 1)
+        
+        broadcaster.stop()
+        self.assertEqual(list(stream), [])
+        self.assertEqual(broadcaster.client_count(), 0)
+
+
+class TestFrameBus(unittest.TestCase):
+    """
+    tests for the single decode frame bus
+    """
     
-    def test_get_video_analysis_invalid_webcam_id(self):
+    def setUp(self):
         """
-        tests video analysis endpoint with invalid webcam_id.
+        encodes a small test JPEG
         """
-        response = self.client.get('/api/video-analysis?webcam_id=invalid_webcam')
-        self.assertEqual(response.status_code, 404)
-        
-        data = json.loads(response.data)
-        self.assertIn('error', data)
-        self.assertEqual(data['error'], 'Webcam Not Available')
+        image = np.zeros((8, 8, 3), dtype=np.uint8)
+        self.jpeg = cv2.imencode('.jpg', image)[1].tobytes()
     
-    @patch('routes.video_analysis.LiveStreamAnalyzer')
-    def test_get_video_analysis_start_new_analysis(self, mock_analyzer_class):
+    def test_pipe_frames_reach_viewers_and_inference(self):
         """
-        tests starting a new video analysis for a valid webcam.
+        tests frames read from the ffmpeg pipe go to viewers untouched and to inference decoded
         """
-        #mock analyzer instance
-        mock_analyzer = Mock()
-        mock_analyzer_class.return_value = mock_analyzer
-        
-        #use a valid webcam ID from config
-        webcam_id = list(WEBCAM_CONFIGS.keys())[0]
-        
-        response = self.client.get(f'/api/video-analysis?webcam_id={webcam_id}')
-        self.assertEqual(response.status_code, 200)
-        
-        data = json.loads(response.data)
-        self.assertEqual(data['webcam_id'], webcam_id)
-        self.assertEqual(data['status'], 'Starting')
-        self.assertEqual(data['surfer_count'], 0)
-        self.assertIn('message', data)
+        bus = FrameBus('test_webcam')
+        viewer = bus.broadcaster.subscribe()
+        bus.attach(io.BytesIO(self.jpeg * 3))
+        bus.reader_thread.join(timeout=5)
         
-        #verify analyzer was created and started
-        mock_analyzer_class.assert_called_once()
-        mock_analyzer.start_analysis.assert_called_once()
-      
-    def test_stop_analysis_existing_pipeline(self):
+        frame = bus.wait_for_frame(after_id=0, timeout=1)
+        self.assertEqual(frame.frame_id, 3)
+        self.assertEqual(frame.image.shape, (8, 8, 3))
+        self.assertEqual(viewer.get_nowait(), self.jpeg)
+        bus.stop()
+    
+    def test_rawvideo_frames_use_preallocated_ring(self):
         """
-        tests stopping an existing video analysis pipeline.
+        tests rawvideo frames are read into the ring buffers without new allocations
         """
-        #set up existing pipeline
-        webcam_id = "test_webcam"
-        mock_analyzer = Mock()
-        active_pipelines[webcam_id] = mock_analyzer
-        analysis_results[webcam_id] = {'surfer_count': 1, 'status': 'online'}
-        
-        response = self.client.get(f'/api/stop-analysis/{webcam_id}')
-        self.assertEqual(response.status_code, 200)
-        
-        data = json.loads(response.data)
-        self.assertIn('message', data)
+        bus = FrameBus('test_webcam', ingest_mode='rawvideo', resolution='4x2', ring_size=2)
+        raw = bytes(range(24)) + bytes([7]) * 24 + bytes([9]) * 24
+        bus.attach(io.BytesIO(raw))
+        bus.reader_thread.join(timeout=5)
         
-        #verify cleanup
-        mock_analyzer.stop_analysis.assert_called_once()
-        self.assertNotIn(webcam_id, active_pipelines)
-        self.assertNotIn(webcam_id, analysis_results)
-    
-    def test_stop_analysis_no_active_pipeline(self):
+        frame = bus.wait_for_frame(after_id=0, timeout=1)
+        self.assertEqual(frame.frame_id, 3)
+        self.assertEqual(frame.image.shape, (2, 4, 3))
+        self.assertTrue((frame.image == 9).all())
+        #third frame wraps around into the first ring slot
+        self.assertIs(frame.image, bus.ring[0])
+        #no viewers connected, so no JPEG was encoded
+        self.assertIsNone(frame.jpeg)
+        bus.stop()
+
+    def test_retrieved_rawvideo_frame_survives_ring_lap(self):
         """
-        tests stopping analysis when no active pipeline exists.
+        tests a frame handed to inference is not overwritten when the reader laps the ring
         """
-        response = self.client.get('/api/stop-analysis/nonexistent_webcam')
-        self.assertEqual(response.status_code, 404)
+        bus = FrameBus('test_webcam', ingest_mode='rawvideo', resolution='4x2', ring_size=2)
+        read_fd, write_fd = os.pipe()
+        pipe = os.fdopen(read_fd, 'rb', buffering=0)
+        bus.attach(pipe)
+        producer = bus.producer_factory()()
+
+        os.write(write_fd, bytes([1]) * 24)
+        self.assertTrue(producer.grab())
+        ok, image = producer.retrieve()
+        self.assertTrue(ok)
+
+        #two more frames wrap the ring back onto the retrieved frame's slot
+        os.write(write_fd, bytes([2]) * 24 + bytes([3]) * 24)
+        frame = bus.wait_for_frame(after_id=2, timeout=5)
+        self.assertEqual(frame.frame_id, 3)
+        self.assertIs(frame.image, bus.ring[0])
+        self.assertTrue((image == 1).all())
+
+        os.close(write_fd)
+        bus.reader_thread.join(timeout=5)
+        bus.stop()
+        pipe.close()
+
+    @patch('subprocess.Popen')
+    def test_rawvideo_ffmpeg_command(self, mock_popen):
+        """
+        tests rawvideo ingest asks ffmpeg for bgr24 instead of mjpeg
+        """
+        mock_process = Mock()
+        mock_process.stdout = io.BytesIO(b'')
+        mock_popen.return_value = mock_process
         
-        data = json.loads(response.data)
-        self.assertIn('error', data)
-        self.assertEqual(data['error'], 'No Active Analysis Found')
+        analyzer = LiveStreamAnalyzer('test_webcam', 'https://test.example.com/stream.m3u8')
+        analyzer.frame_bus.ingest_mode = 'rawvideo'
+        self.assertTrue(analyzer.start_ffmpeg_conversion())
+        analyzer.frame_bus.stop()
+        
+        call_args = mock_popen.call_args[0][0]
+        self.assertIn('rawvideo', call_args)
+        self.assertIn('bgr24', call_args)
+        self.assertNotIn('mjpeg', call_args)
     
-    def test_video_feed_no_active_pipeline(self):
+    def test_producer_reads_new_frames_only(self):
         """
-        tests video feed endpoint when no active pipeline exists.
+        tests the InferencePipeline producer only grabs frames it has not seen
         """
-        response = self.client.get('/video_feed/nonexistent_webcam')
-        self.assertEqual(response.status_code, 404)
-        self.assertEqual(response.data.decode(), 'Webcam not active')
+        bus = FrameBus('test_webcam')
+        bus.running = True
+        producer = bus.producer_factory()()
+        
+        bus.publish_jpeg(self.jpeg)
+        self.assertTrue(producer.grab())
+        ok, image = producer.retrieve()
+        self.assertTrue(ok)
+        self.assertEqual(image.shape, (8, 8, 3))
+        
+        #no new frame, bus stopped -> grab fails instead of hanging
+        bus.stop()
+        self.assertFalse(producer.grab())
+        self.assertFalse(producer.isOpened())
 
 
-class TestSurfDataRoutes(unittest.TestCase):
+class TestMotionGate(unittest.TestCase):
     """
-    tests for surf data API routes.
+    tests for frame difference gating in front of inference
     """
     
     def setUp(self):
         """
-        sets up test fixtures before each test method.
+        creates a dark frame and a bright frame
         """
-        self.app = create_app()
-        self.client = self.app.test_client()
-        self.app_context = self.app.app_context()
-        self.app_context.push()
+        self.dark = np.zeros((72, 128, 3), dtype=np.uint8)
+        self.bright = np.full((72, 128, 3), 200, dtype=np.uint8)
     
-    def tearDown(self):
+    def test_static_frames_are_gated(self):
         """
-        cleans up after each test method.
+        tests identical frames skip inference and changed frames do not
         """
-        self.app_context.pop()
+        gate = MotionGate(threshold=2.0, thumbnail_width=16, max_skip_seconds=60)
+        self.assertTrue(gate.should_infer(self.dark, now=0))   #first frame always inferred
+        self.assertFalse(gate.should_infer(self.dark, now=1))
+        self.assertFalse(gate.should_infer(self.dark, now=2))
+        self.assertTrue(gate.should_infer(self.bright, now=3))
+        
+        stats = gate.stats()
+        self.assertEqual(stats['frames_gated'], 2)
+        self.assertEqual(stats['frames_inferred'], 2)
     
-    @patch('xarray.open_dataset')
-    def test_get_surf_data_success(self, mock_open_dataset):
+    def test_static_scene_refreshes_after_max_skip(self):
         """
-        tests successful retrieval of surf data from CDIP buoys.
+        tests a static scene is still re-inferred every max_skip_seconds
         """
-        #mock dataset with valid wave data
-        mock_dataset = Mock()
-        mock_dataset.isel.return_value = mock_dataset
-        mock_dataset.where.return_value = mock_dataset
-        mock_dataset.waveTime.size = 10
-        
-        #mock wave data arrays
-        mock_times = ['2023-01-01T12:00:00'] * 10
-        mock_dataset.__getitem__.side_effect = lambda key: Mock(values=([1.5] * 10 if 'Hs' in key else [10.0] * 10))
-        mock_dataset['waveTime'].values = mock_times
-        
-        mock_open_dataset.return_value = mock_dataset
-        
-        response = self.client.get('/api/surfdata?buoy_id=273')
-        self.assertEqual(response.status_code, 200)
-        
-        data = json.loads(response.data)
-        self.assertIn('time', data)
-        self.assertIn('waveHs', data)
-        self.assertIn('waveTp', data)
-        self.assertIn('waveDp', data)
-        self.assertIn('waveTa', data)
-        self.assertIn('waveTz', data)
-        self.assertIn('wavePeakPSD', data)
+        gate = MotionGate(threshold=2.0, max_skip_seconds=30)
+        self.assertTrue(gate.should_infer(self.dark, now=0))
+        self.assertFalse(gate.should_infer(self.dark, now=29))
+        self.assertTrue(gate.should_infer(self.dark, now=31))
     
-    @patch('xarray.open_dataset')
-    def test_get_surf_data_network_error(self, mock_open_dataset):
+    def test_analyzer_reuses_previous_result_when_gated(self):
         """
-        tests surf data endpoint when network/connection errors occur.
+        tests gated frames keep the previous surfer count
         """
-        #mock network error
-        mock_open_dataset.side_effect = Exception("Network error")
+        analyzer = LiveStreamAnalyzer('test_webcam', 'https://test.example.com/stream.m3u8')
+        analyzer.rate_controller = None #isolates the gate from rate limiting
+        analyzer.frame_bus.running = True
+        jpeg = cv2.imencode('.jpg', self.dark)[1].tobytes()
         
-        response = self.client.get('/api/surfdata?buoy_id=273')
-        self.assertEqual(response.status_code, 500)
+        analyzer.frame_bus.publish_jpeg(jpeg)
+        self.assertTrue(analyzer.admit_frame(analyzer.frame_bus.latest))
+        analyzer.roboflow_sink({'predictions': [{'class': 'Surfer'}]}, None)
         
-        data = json.loads(response.data)
-        self.assertIn('error', data)
+        analyzer.frame_bus.publish_jpeg(jpeg)
+        self.assertFalse(analyzer.admit_frame(analyzer.frame_bus.latest))
+        self.assertEqual(analyzer.latest_result['surfer_count'], 1)
+        self.assertEqual(analyzer.stats()['motion_gate']['frames_gated'], 1)
     
-    def test_get_surf_data_default_buoy(self):
+    def test_producer_skips_gated_frames(self):
         """
-        tests surf data endpoint with default buoy ID.
+        tests the InferencePipeline producer never hands gated frames to inference
         """
-        with patch('xarray.open_dataset') as mock_open_dataset:
-            #mock successful dataset
-            mock_dataset = Mock()
-            mock_dataset.isel.return_value = mock_dataset
-            mock_dataset.where.return_value = mock_dataset
-            mock_dataset.waveTime.size = 10
-            mock_open_dataset.return_value = mock_dataset
-            
-            response = self.client.get('/api/surfdata')
-            #should use default buoy_id without errors
-            mock_open_dataset.assert_called_once()
-            call_args = mock_open_dataset.call_args[0][0]
-            self.assertIn('273', call_args)  # Default buoy ID
+        bus = FrameBus('test_webcam')
+        bus.running = True
+        jpeg = cv2.imencode('.jpg', self.dark)[1].tobytes()
+        for _ in range(3):
+            bus.publish_jpeg(jpeg)
+        
+        producer = bus.producer_factory(admit=lambda frame: frame.frame_id == 3)()
+        self.assertTrue(producer.grab())
+        self.assertEqual(producer.frame.frame_id, 3)
 
 
-class TestFrontendRoutes(unittest.TestCase):
+class TestAdaptiveRateController(unittest.TestCase):
     """
-    tests for frontend serving routes.
+    tests for adaptive per camera inference rate
     """
     
     def setUp(self):
         """
-        aets up test fixtures before each test method.
+        creates a controller with its own budget
         """
-        self.app = create_app()
-        self.client = self.app.test_client()
-        self.app_context = self.app.app_context()
-        self.app_context.push()
+        self.budget = FpsBudget(max_total_fps=10)
+        self.controller = AdaptiveRateController('cam_a', min_fps=1 / 30, max_fps=2, budget=self.budget)
     
-    def tearDown(self):
+    def test_stable_counts_slow_down_to_min_fps(self):
         """
-        cleans up after each test method.
+        tests a quiet lineup decays to the minimum rate
         """
-        self.app_context.pop()
+        for _ in range(50):
+            self.controller.observe(0)
+        self.assertAlmostEqual(self.controller.effective_fps(), 1 / 30)
+        
+        #one inference every 30s
+        self.controller.mark_inferred(now=100)
+        self.assertFalse(self.controller.ready(now=120))
+        self.assertTrue(self.controller.ready(now=130))
     
-    @patch('routes.frontend.render_template')
-    def test_serve_frontend(self, mock_render_template):
+    def test_changing_or_busy_counts_speed_up(self):
         """
-        tests that the frontend route serves the main application page.
+        tests a count change or busy lineup returns to max rate
         """
-        mock_render_template.return_value = "<html>Frontend</html>"
+        for _ in range(50):
+            self.controller.observe(1)
+        self.controller.observe(2)
+        self.assertEqual(self.controller.target_fps, 2)
         
-        response = self.client.get('/')
-        self.assertEqual(response.status_code, 200)
+        for _ in range(5):
+            self.controller.observe(Config.ADAPTIVE_BUSY_COUNT)
+        self.assertEqual(self.controller.target_fps, 2)
+    
+    def test_budget_scales_webcams_down(self):
+        """
+        tests webcams share the host budget once they ask for too much
+        """
+        others = [AdaptiveRateController(f'cam_{i}', max_fps=2, budget=self.budget) for i in range(9)]
+        #10 webcams x 2 fps against a 10 fps budget
+        self.assertAlmostEqual(self.budget.scale(), 0.5)
+        self.assertAlmostEqual(self.controller.effective_fps(), 1.0)
         
-        mock_render_template.assert_called_once_with('frontend.html')
+        for other in others:
+            other.close()
+        self.assertEqual(self.budget.scale(), 1.0)
 
 
-class TestAppCreation(unittest.TestCase):
+class TestBatchInferenceScheduler(unittest.TestCase):
     """
-    tests for Flask application creation and configuration.
+    tests for the batched multi-camera inference scheduler
     """
     
-    def test_create_app_returns_flask_instance(self):
-        """
-        tests that create_app returns a proper Flask application instance
+    def setUp(self):
         """
-        app = create_app()
-        self.assertIsNotNone(app)
-        self.assertEqual(app.__class__.__name__, 'Flask')
+        creates three batched analyzers each with one frame on its bus
+        """
+        jpeg = cv2.imencode('.jpg', np.zeros((8, 8, 3), dtype=np.uint8))[1].tobytes()
+        self.analyzers = {}
+        for webcam_id in ('cam_a', 'cam_b', 'cam_c'):
+            analyzer = LiveStreamAnalyzer(webcam_id, 'https://test.example.com/stream.m3u8')
+            analyzer.inference_mode = 'batched'
+            analyzer.frame_bus.running = True
+            analyzer.frame_bus.publish_jpeg(jpeg)
+            self.analyzers[webcam_id] = analyzer
+        self.detector = FakeDetector(surfers=2)
+        self.scheduler = BatchInferenceScheduler(lambda: self.analyzers, backend=self.detector)
     
-    def test_app_has_required_blueprints(self):
+    def test_tick_runs_one_batch_for_all_webcams(self):
         """
-        tests that the application has all required blueprints registered
+        tests every webcam's latest frame goes through a single inference call
         """
-        app = create_app()
+        self.assertEqual(self.scheduler.tick(), 3)
+        self.assertEqual(self.detector.batch_sizes, [3])
         
-        #check that blueprints are registered
-        blueprint_names = [bp.name for bp in app.blueprints.values()]
-        self.assertIn('video_analysis', blueprint_names)
-        self.assertIn('surf_data', blueprint_names)
-        self.assertIn('frontend', blueprint_names)
+        #results dispatched back through each analyzer's sink
+        for analyzer in self.analyzers.values():
+            self.assertEqual(analyzer.latest_result['surfer_count'], 2)
+            self.assertEqual(analyzer.latest_result['status'], 'online')
+        
+        stats = self.scheduler.stats()
+        self.assertEqual(stats['batches'], 1)
+        self.assertEqual(stats['last_batch_size'], 3)
+        self.assertGreaterEqual(stats['last_queue_wait_ms'], 0)
+        self.assertGreaterEqual(stats['last_batch_latency_ms'], 0)
     
-    def test_app_config_loaded(self):
+    def test_frames_are_only_inferred_once(self):
         """
-        tests that the application configuration is properly loaded
+        tests a tick with no new frames skips inference entirely
         """
-        app = create_app()
-        
-        #check that config is loaded from Config class
-        self.assertEqual(app.config['DEBUG'], Config.DEBUG)
-        self.assertEqual(app.config['MAX_FPS'], Config.MAX_FPS)
+        self.scheduler.tick()
+        self.assertEqual(self.scheduler.tick(), 0)
+        self.assertEqual(self.detector.batch_sizes, [3])
+
+    def test_rawvideo_frames_are_copied_before_inference(self):
+        """
+        tests batched inference never gets a view into a rawvideo frame ring
+        """
+        bus = FrameBus('cam_a', ingest_mode='rawvideo', resolution='4x2', ring_size=2)
+        bus.attach(io.BytesIO(bytes([5]) * 24))
+        bus.reader_thread.join(timeout=5)
+        self.analyzers['cam_a'].frame_bus = bus
+        received = []
+        self.detector.infer_batch = lambda images: received.extend(images) or FakeDetector().infer_batch(images)
+
+        self.assertEqual(self.scheduler.tick(), 3)
+        raw = [image for image in received if image.shape == (2, 4, 3)]
+        self.assertEqual(len(raw), 1)
+        self.assertTrue((raw[0] == 5).all())
+        self.assertFalse(any(np.shares_memory(raw[0], slot) for slot in bus.ring))
+        bus.stop()
+
+    def test_pipeline_mode_webcams_are_skipped(self):
+        """
+        tests webcams running their own InferencePipeline are not batched
+        """
+        self.analyzers['cam_c'].inference_mode = 'pipeline'
+        self.assertEqual(self.scheduler.tick(), 2)
+    
+    def test_webcams_are_grouped_by_detector(self):
+        """
+        tests each detector gets one call with its webcams, a failing detector doesn't stop the others
+        """
+        scheduler = BatchInferenceScheduler(lambda: self.analyzers)
+        one, three = FakeDetector(surfers=1), FakeDetector(surfers=3)
+        one.name, three.name = 'one', 'three'
+        broken = Mock()
+        broken.infer_batch.side_effect = RuntimeError('model missing')
+        self.analyzers['cam_a'].backend = one
+        self.analyzers['cam_b'].backend = one
+        self.analyzers['cam_c'].backend = three
+        
+        self.assertEqual(scheduler.tick(), 3)
+        self.assertEqual(one.batch_sizes, [2])
+        self.assertEqual(three.batch_sizes, [1])
+        self.assertEqual(self.analyzers['cam_c'].latest_result['surfer_count'], 3)
+        self.assertEqual(scheduler.stats()['backends'], {'one': 2, 'three': 1})
+        
+        jpeg = cv2.imencode('.jpg', np.zeros((8, 8, 3), dtype=np.uint8))[1].tobytes()
+        for analyzer in self.analyzers.values():
+            #same scene again, bypass the gate and rate limit
+            analyzer.motion_gate = analyzer.rate_controller = None
+            analyzer.frame_bus.publish_jpeg(jpeg)
+        self.analyzers['cam_a'].backend = broken
+        self.assertEqual(scheduler.tick(), 3)
+        self.assertEqual(self.analyzers['cam_a'].latest_result['status'], 'error')
+        self.assertEqual(one.batch_sizes, [2, 1])
+        
+        #webcams whose detector is still loading wait
+        self.analyzers['cam_b'].backend = None
+        self.analyzers['cam_b'].frame_bus.publish_jpeg(jpeg)
+        self.assertEqual(scheduler.tick(), 0)
+    
+    def test_webcam_detector_selects_batched_mode(self):
+        """
+        tests a webcam with its own detector skips the InferencePipeline
+        """
+        analyzer = LiveStreamAnalyzer('local_cam', 'https://test.example.com/stream.m3u8', detector='fake')
+        self.assertEqual(analyzer.inference_mode, 'batched')
+        self.assertTrue(analyzer.start_roboflow_pipeline())
+        self.assertIsNone(analyzer.pipeline)
+        self.assertIsInstance(analyzer.backend, FakeDetector)
+        analyzer.stop_analysis()
+    
+    def test_unknown_backend_raises(self):
+        """
+        tests backend factory rejects unknown names
+        """
+        self.assertIsInstance(create_backend('fake'), FakeDetector)
+        with self.assertRaises(ValueError):
+            create_backend('does_not_exist')
+
+
+def write_constant_yolo_model(path, anchors, size=64):
+    """
+    writes a tiny ONNX model shaped like a YOLO export (batch, 3, size, size) -> (batch, 5, anchors)
+    every frame gets the same raw anchors, so decoding can be checked exactly
+    anchors -> list of (cx, cy, w, h, score) in model input pixels
+    """
+    from onnx import helper, TensorProto
+    values = np.array(anchors, dtype=np.float32).T[np.newaxis]
+    graph = helper.make_graph(
+        [
+            helper.make_node('ReduceMean', ['images'], ['mean'], axes=[1, 2, 3], keepdims=0),
+            helper.make_node('Unsqueeze', ['mean', 'axes'], ['mean3d']),
+            helper.make_node('Mul', ['mean3d', 'zero'], ['zeros']),
+            helper.make_node('Add', ['zeros', 'anchors'], ['output0']),
+        ],
+        'constant_yolo',
+        [helper.make_tensor_value_info('images', TensorProto.FLOAT, ['batch', 3, size, size])],
+        [helper.make_tensor_value_info('output0', TensorProto.FLOAT, ['batch', 5, len(anchors)])],
+        [
+            helper.make_tensor('axes', TensorProto.INT64, [2], [1, 2]),
+            helper.make_tensor('zero', TensorProto.FLOAT, [], [0.0]),
+            helper.make_tensor('anchors', TensorProto.FLOAT, values.shape, values.flatten()),
+        ],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', 13)])
+    model.ir_version = 8
+    onnx.save(model, path)
+
+
+@unittest.skipUnless(onnx, 'onnx is not installed')
+class TestOnnxDetector(unittest.TestCase):
+    """
+    tests for the local ONNX Runtime detector backend
+    """
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.model_path = os.path.join(self.tmp.name, 'surfer.onnx')
+        write_constant_yolo_model(self.model_path, [
+            (32, 32, 10, 20, 0.9), #surfer
+            (33, 32, 10, 20, 0.8), #overlaps it, removed by NMS
+            (10, 10, 5, 5, 0.1), #below the confidence threshold
+        ])
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def test_detections_map_back_to_frame_pixels(self):
+        """
+        tests letterboxed model boxes come back in each frame's own pixels, batched in one call
+        """
+        detector = OnnxDetector(model_path=self.model_path, class_names=['Surfer'], confidence=0.4)
+        self.assertEqual(detector.input_size, 64)
+        wide = np.zeros((64, 128, 3), dtype=np.uint8)
+        square = np.zeros((64, 64, 3), dtype=np.uint8)
+        
+        wide_result, square_result = detector.infer_batch([wide, square])
+        
+        #128x64 frame is scaled by 0.5 and padded 16px top and bottom
+        self.assertEqual(len(wide_result['predictions']), 1)
+        prediction = wide_result['predictions'][0]
+        self.assertEqual(prediction['class'], 'Surfer')
+        self.assertAlmostEqual(prediction['confidence'], 0.9, places=5)
+        self.assertEqual([prediction[k] for k in ('x', 'y', 'width', 'height')], [64.0, 32.0, 20.0, 40.0])
+        self.assertEqual([square_result['predictions'][0][k] for k in ('x', 'y')], [32.0, 32.0])
+        self.assertEqual(normalize_result(wide_result).count('surfer'), 1)
+    
+    def test_missing_model_raises(self):
+        """
+        tests a missing export fails loudly instead of downloading anything
+        """
+        with self.assertRaises(FileNotFoundError):
+            OnnxDetector(model_path=os.path.join(self.tmp.name, 'missing.onnx'))
+
+
+class TestModelRegistry(unittest.TestCase):
+    """
+    tests for the shared, reference counted model registry
+    """
+    
+    def test_concurrent_acquires_load_once(self):
+        """
+        tests webcams starting together share one load and the last release unloads
+        """
+        registry = ModelRegistry()
+        loads = []
+        unloaded = []
+        def loader():
+            loads.append(1)
+            time.sleep(0.05)
+            return object()
+        
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            models = list(pool.map(lambda _: registry.acquire('detector:x', loader, unload=unloaded.append), range(4)))
+        self.assertEqual(len(loads), 1)
+        self.assertTrue(all(model is models[0] for model in models))
+        stats = registry.stats()
+        self.assertEqual(stats['models']['detector:x']['refs'], 4)
+        self.assertGreater(stats['models']['detector:x']['load_seconds'], 0)
+        self.assertGreater(stats['process_rss_bytes'], 0)
+        
+        for _ in range(3):
+            self.assertFalse(registry.release('detector:x'))
+        self.assertTrue(registry.release('detector:x'))
+        self.assertEqual(unloaded, [models[0]])
+        self.assertEqual(registry.stats()['models'], {})
+    
+    def test_failed_load_is_not_cached(self):
+        """
+        tests a loader error reaches the caller and the next acquire loads again
+        """
+        registry = ModelRegistry()
+        with self.assertRaises(FileNotFoundError):
+            registry.acquire('detector:onnx', Mock(side_effect=FileNotFoundError('no model')))
+        self.assertEqual(registry.acquire('detector:onnx', lambda: 'model'), 'model')
+        self.assertEqual(registry.loads, 1)
+    
+    def test_analyzers_share_detector_across_restarts(self):
+        """
+        tests webcams share one detector, restarts keep it, stopping the last webcam unloads it
+        """
+        analyzers = [LiveStreamAnalyzer(f'shared_{i}', 'https://test.example.com/stream.m3u8', detector='fake') for i in range(2)]
+        for analyzer in analyzers:
+            self.assertTrue(analyzer.start_roboflow_pipeline())
+        self.assertIs(analyzers[0].backend, analyzers[1].backend)
+        self.assertEqual(model_registry.stats()['models']['detector:fake']['refs'], 2)
+        
+        #a pipeline restart reuses the loaded detector
+        backend = analyzers[0].backend
+        self.assertTrue(analyzers[0].start_roboflow_pipeline())
+        self.assertIs(analyzers[0].backend, backend)
+        self.assertEqual(model_registry.stats()['models']['detector:fake']['refs'], 2)
+        
+        analyzers[0].stop_analysis()
+        self.assertEqual(model_registry.stats()['models']['detector:fake']['refs'], 1)
+        analyzers[1].stop_analysis()
+        self.assertNotIn('detector:fake', model_registry.stats()['models'])
+
+
+class TestCountHistory(unittest.TestCase):
+    """
+    tests for the fixed memory surfer count history
+    """
+    
+    def test_ring_wraps_without_growing(self):
+        """
+        tests a full ring overwrites its oldest rows and keeps its size
+        """
+        ring = CountRing(capacity=4)
+        nbytes = ring.nbytes()
+        for t in range(10):
+            ring.append(float(t), t)
+        
+        times, avg, peak = ring.window(0, 100)
+        self.assertEqual(times.tolist(), [6.0, 7.0, 8.0, 9.0])
+        self.assertEqual(peak.tolist(), [6, 7, 8, 9])
+        self.assertEqual(ring.nbytes(), nbytes)
+        self.assertFalse(ring.covers(5))
+        self.assertTrue(ring.covers(6))
+    
+    def test_window_across_wrap(self):
+        """
+        tests a window spanning the wrap point returns rows in time order
+        """
+        ring = CountRing(capacity=5)
+        for t in range(7):
+            ring.append(float(t), t)
+        
+        times, _, _ = ring.window(3, 5)
+        self.assertEqual(times.tolist(), [3.0, 4.0, 5.0])
+        self.assertEqual(len(ring.window(100, 200)[0]), 0)
+    
+    def test_rollups_average_and_max(self):
+        """
+        tests 1 minute buckets fold samples into avg/max
+        """
+        history = CountHistory('cam', raw_size=100, minute_size=10, quarter_size=10)
+        for t, count in [(0, 1), (20, 3), (40, 5), (60, 2)]:
+            history.record(count, timestamp=float(t))
+        
+        minute = history.window(0, 120, '1m')
+        self.assertEqual(minute['timestamps'], [0.0, 60.0])
+        self.assertEqual(minute['avg'], [3.0, 2.0])
+        self.assertEqual(minute['max'], [5, 2])
+        self.assertEqual(len(history.window(0, 120, 'raw')['timestamps']), 4)
+        with self.assertRaises(ValueError):
+            history.window(0, 120, '5s')
+    
+    def test_resolution_picked_from_coverage(self):
+        """
+        tests raw samples are served until the raw ring no longer reaches back far enough
+        """
+        history = CountHistory('cam', raw_size=10, minute_size=100, quarter_size=10)
+        for t in range(0, 600, 10):
+            history.record(1, timestamp=float(t))
+        
+        self.assertEqual(history.window(550, 600)['resolution'], 'raw')
+        self.assertEqual(history.window(0, 600)['resolution'], '1m')
+    
+    def test_sink_records_history(self):
+        """
+        tests every inference result lands in the webcam's history
+        """
+        analyzer = LiveStreamAnalyzer('history_cam', 'https://test.example.com/stream.m3u8')
+        analyzer.rate_controller = None
+        analyzer.roboflow_sink({'predictions': [{'class': 'Surfer'}, {'class': 'Surfer'}]}, None)
+        
+        window = count_histories.find('history_cam').window()
+        self.assertEqual(window['max'][-1], 2)
+
+
+def make_cdip_dataset(records, start='2024-01-01', frequencies=0):
+    """
+    builds an in memory dataset with the CDIP realtime variables
+    records -> waveTime length, every third record is flagged as not evaluated
+    frequencies -> spectral bins, adds (waveTime, waveFrequency) spectra if non zero
+    """
+    times = pd.date_range(start, periods=records, freq='30min').values
+    values = np.arange(records, dtype=np.float32)
+    flags = np.where(np.arange(records) % 3 == 0, 2, 1).astype(np.int8)
+    data = {name: ('waveTime', values + offset) for offset, name in enumerate(('waveHs', 'waveTp', 'waveDp', 'waveTa', 'waveTz', 'wavePeakPSD'))}
+    data['waveFlagPrimary'] = ('waveTime', flags)
+    coords = {'waveTime': times}
+    if frequencies:
+        #record i, bin j -> i * 100 + j
+        spectrum = values[:, None] * 100 + np.arange(frequencies, dtype=np.float32)
+        data['waveEnergyDensity'] = (('waveTime', 'waveFrequency'), spectrum)
+        data['waveA1Value'] = (('waveTime', 'waveFrequency'), -spectrum)
+        coords['waveFrequency'] = np.linspace(0.025, 0.58, frequencies).astype(np.float32)
+    return xr.Dataset(data, coords=coords)
+
+
+class TestResultEvents(unittest.TestCase):
+    """
+    tests for the surfer count push channel
+    """
+    
+    def result(self, count, status='online'):
+        return {'surfer_count': count, 'status': status, 'last_update': f'2024-01-01T00:00:0{count}'}
+    
+    def test_only_changes_bump_the_version(self):
+        """
+        tests results with the same count and status don't wake subscribers
+        """
+        channel = ResultChannel('cam')
+        self.assertTrue(channel.publish(self.result(1)))
+        self.assertFalse(channel.publish(self.result(1)))
+        self.assertTrue(channel.publish(self.result(1, 'error')))
+        self.assertEqual(channel.version, 2)
+        self.assertEqual(channel.published, 3)
+        self.assertIsNone(channel.wait(2, timeout=0.01))
+        self.assertEqual(json.loads(channel.wait(1, timeout=0.01)[1])['status'], 'error')
+    
+    @patch.object(Config, 'SSE_COALESCE_SECONDS', 0.1)
+    def test_stream_coalesces_bursts(self):
+        """
+        tests changes published inside the coalescing window reach the client as one event
+        """
+        channel = ResultChannel('cam')
+        stream = channel.stream()
+        self.assertEqual(next(stream), b'retry: 3000\n\n')
+        channel.publish(self.result(1))
+        self.assertIn(b'"surfer_count":1', next(stream))
+        
+        for count in (2, 3, 4):
+            channel.publish(self.result(count))
+        event = next(stream)
+        self.assertTrue(event.startswith(b'id: 4\n'))
+        self.assertIn(b'"surfer_count":4', event)
+        
+        #a reconnect with the latest id gets nothing until the next change
+        resumed = channel.stream(last_event_id=4)
+        next(resumed)
+        threading.Timer(0.05, channel.publish, args=(self.result(5),)).start()
+        self.assertTrue(next(resumed).startswith(b'id: 5\n'))
+    
+    def test_analyzer_status_changes_are_pushed(self):
+        """
+        tests status changes outside the sink reach the webcam's channel
+        """
+        analyzer = LiveStreamAnalyzer('events_webcam', 'https://example.com/stream.m3u8')
+        channel = result_events.channel('events_webcam')
+        version = channel.version
+        analyzer.set_status('ffmpeg_error')
+        self.assertEqual(channel.version, version + 1)
+        self.assertEqual(json.loads(channel.latest()[1])['status'], 'ffmpeg_error')
+
+
+class TestResultsStore(unittest.TestCase):
+    """
+    tests for the copy-on-write results store
+    """
+    
+    def test_dict_compatible(self):
+        """
+        tests the store reads and writes like the dict it replaced
+        """
+        store = ResultsStore()
+        store['cam1'] = {'surfer_count': 1}
+        self.assertIn('cam1', store)
+        self.assertEqual(store['cam1'], {'surfer_count': 1})
+        self.assertIsNone(store.get('cam2'))
+        del store['cam1']
+        self.assertNotIn('cam1', store)
+        with self.assertRaises(KeyError):
+            del store['cam1']
+    
+    def test_changed_since(self):
+        """
+        tests versioned queries return only results published or removed after a version
+        """
+        store = ResultsStore()
+        store.publish('cam1', {'surfer_count': 1})
+        version = store.publish('cam2', {'surfer_count': 2})
+        store.publish('cam1', {'surfer_count': 3})
+        store.remove('cam2')
+        
+        current, changed, removed = store.changed_since(version)
+        self.assertEqual(current, 4)
+        self.assertEqual(changed, {'cam1': {'surfer_count': 3}})
+        self.assertEqual(removed, ['cam2'])
+        self.assertEqual(store.changed_since(current), (4, {}, []))
+        self.assertEqual(set(store.changed_since(0)[1]), {'cam1'})
+    
+    def test_snapshots_are_not_mutated_by_writers(self):
+        """
+        tests a snapshot held by a reader stays consistent while writers publish
+        """
+        store = ResultsStore()
+        store.publish('cam1', {'surfer_count': 0})
+        snapshot = store.snapshot()
+        
+        def writer():
+            for i in range(1, 2001):
+                store.publish('cam1', {'surfer_count': i})
+                store.publish('cam2', {'surfer_count': i})
+        thread = threading.Thread(target=writer)
+        thread.start()
+        while thread.is_alive():
+            current = store.snapshot()
+            #versions never run ahead of the results they describe
+            for webcam_id, published in current.versions.items():
+                self.assertLessEqual(published, current.version)
+                self.assertIn(webcam_id, current.results)
+        thread.join()
+        
+        self.assertEqual(snapshot.results, {'cam1': {'surfer_count': 0}})
+        self.assertEqual(store['cam2'], {'surfer_count': 2000})
+        self.assertEqual(store.version, 4001)
+
+
+class FakePipeline:
+    """
+    analyzer stand-in with a real broadcaster, so viewers can be connected
+    """
+    def __init__(self, webcam_id):
+        self.webcam_id = webcam_id
+        self.frame_bus = Mock()
+        self.frame_bus.broadcaster = MJPEGBroadcaster()
+        self.startup_seconds = 1.5
+        self.stopped = False
+    
+    def stop_analysis(self):
+        self.stopped = True
+
+
+class TestPipelineManager(unittest.TestCase):
+    """
+    tests for pipeline warm set, idle eviction and per host cap
+    """
+    
+    def setUp(self):
+        self.pipelines = {}
+        self.manager = PipelineManager(self.pipelines, FakePipeline, warm=['warm_cam'], idle_ttl=60, max_active=2, sweep_interval=3600)
+    
+    def test_acquire_starts_once(self):
+        """
+        tests repeat requests reuse the running pipeline
+        """
+        first, started = self.manager.acquire('cam_a')
+        self.assertTrue(started)
+        second, started = self.manager.acquire('cam_a')
+        self.assertFalse(started)
+        self.assertIs(first, second)
+        self.assertEqual(self.manager.started, 1)
+    
+    def test_cap_evicts_least_recently_used_idle_pipeline(self):
+        """
+        tests a new webcam at the cap replaces the idle pipeline, never a watched or warm one
+        """
+        self.manager.start()
+        cam_a, _ = self.manager.acquire('cam_a')
+        cam_b, _ = self.manager.acquire('cam_b')
+        self.assertTrue(cam_a.stopped)
+        self.assertEqual(set(self.pipelines), {'warm_cam', 'cam_b'})
+        
+        #cam_b has a viewer, warm_cam is warm, nothing can make room
+        cam_b.frame_bus.broadcaster.subscribe()
+        with self.assertRaises(PipelineLimitError):
+            self.manager.acquire('cam_c')
+        self.assertEqual(self.manager.rejected, 1)
+
+    def test_slow_start_blocks_only_its_own_webcam(self):
+        """
+        tests a start runs outside the lock: other webcams are served meanwhile,
+        concurrent requests for the starting webcam share one start
+        """
+        release = threading.Event()
+        starts = []
+
+        def slow_starter(webcam_id):
+            starts.append(webcam_id)
+            if webcam_id == 'slow_cam':
+                release.wait(timeout=5)
+            return FakePipeline(webcam_id)
+
+        manager = PipelineManager(self.pipelines, slow_starter, warm=[], idle_ttl=60, max_active=4, sweep_interval=3600)
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            slow = [pool.submit(manager.acquire, 'slow_cam') for _ in range(2)]
+            while not starts:
+                time.sleep(0.01)
+            #another webcam starts and is touched while slow_cam is still starting
+            fast, started = manager.acquire('fast_cam')
+            self.assertTrue(started)
+            manager.touch('fast_cam')
+            self.assertEqual(manager.stats()['starting'], 1)
+            release.set()
+            results = [future.result(timeout=5) for future in slow]
+
+        self.assertEqual(starts.count('slow_cam'), 1)
+        self.assertIs(results[0][0], results[1][0])
+        self.assertEqual(sorted(started for _, started in results), [False, True])
+
+    def test_evicted_pipeline_stops_before_the_new_one_starts(self):
+        """
+        tests the cap is never exceeded while a replacement starts, and a failed start gives its slot back
+        """
+        created, running = [], []
+
+        def starter(webcam_id):
+            #analyzers still running at the moment this one starts
+            running.append(sum(not analyzer.stopped for analyzer in created))
+            if webcam_id == 'broken_cam':
+                raise RuntimeError('no stream')
+            created.append(FakePipeline(webcam_id))
+            return created[-1]
+
+        manager = PipelineManager(self.pipelines, starter, warm=[], idle_ttl=60, max_active=1, sweep_interval=3600)
+        cam_a, _ = manager.acquire('cam_a')
+        manager.acquire('cam_b')
+        self.assertTrue(cam_a.stopped)
+        self.assertEqual(running, [0, 0])
+
+        with self.assertRaises(RuntimeError):
+            manager.acquire('broken_cam')
+        self.assertEqual(manager.pending, {})
+        self.assertNotIn('broken_cam', manager.last_active)
+        cam_c, started = manager.acquire('cam_c')
+        self.assertTrue(started)
+
+    def test_sweep_evicts_idle_pipelines(self):
+        """
+        tests pipelines idle past the ttl are stopped unless warm or watched
+        """
+        self.manager.max_active = 4
+        self.manager.start()
+        idle, _ = self.manager.acquire('idle_cam')
+        watched, _ = self.manager.acquire('watched_cam')
+        watched.frame_bus.broadcaster.subscribe()
+        
+        self.assertEqual(self.manager.sweep(), [])
+        self.assertEqual(self.manager.sweep(time.monotonic() + 120), ['idle_cam'])
+        self.assertTrue(idle.stopped)
+        self.assertEqual(set(self.pipelines), {'warm_cam', 'watched_cam'})
+        
+        stats = self.manager.stats()
+        self.assertEqual(stats['evicted'], 1)
+        self.assertEqual(stats['avg_startup_seconds'], 1.5)
+        self.assertTrue(stats['webcams']['warm_cam']['warm'])
+        self.assertTrue(stats['webcams']['watched_cam']['in_use'])
+
+
+#stands in for ffmpeg, writes JPEGs to stdout until the control file exists
+FAKE_FFMPEG = """import os, sys, time
+jpeg = open(os.environ['FAKE_FFMPEG_JPEG'], 'rb').read()
+while not os.path.exists(os.environ['FAKE_FFMPEG_EXIT']):
+    sys.stdout.buffer.write(jpeg)
+    sys.stdout.buffer.flush()
+    time.sleep(0.02)
+"""
+
+
+class TestPipelineSupervisor(unittest.TestCase):
+    """
+    tests for restart backoff, crash loop detection and reaping of old processes
+    """
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        script = os.path.join(self.tmp.name, 'ffmpeg')
+        with open(script, 'w') as f:
+            f.write(f"#!{sys.executable}\n{FAKE_FFMPEG}")
+        os.chmod(script, 0o755)
+        jpeg = os.path.join(self.tmp.name, 'frame.jpg')
+        with open(jpeg, 'wb') as f:
+            f.write(cv2.imencode('.jpg', np.zeros((8, 8, 3), dtype=np.uint8))[1].tobytes())
+        self.exit_file = os.path.join(self.tmp.name, 'exit')
+        self.patches = [
+            patch.object(Config, 'FFMPEG_BINARY', script),
+            patch.dict(os.environ, {'FAKE_FFMPEG_JPEG': jpeg, 'FAKE_FFMPEG_EXIT': self.exit_file}),
+        ]
+        for p in self.patches:
+            p.start()
+        
+        self.analyzer = LiveStreamAnalyzer('supervised_cam', 'https://test.example.com/stream.m3u8')
+        self.analyzer.inference_mode = 'batched'
+        self.supervisor = PipelineSupervisor(
+            lambda: {'supervised_cam': self.analyzer},
+            interval=3600, base_backoff=10, max_backoff=100, jitter=0,
+            crash_window=1000, crash_limit=2, stable_seconds=50
+        )
+    
+    def tearDown(self):
+        self.analyzer.stop_analysis()
+        for p in self.patches:
+            p.stop()
+        self.tmp.cleanup()
+    
+    def kill_ffmpeg(self):
+        """
+        tells the fake ffmpeg to exit and waits for it
+        """
+        process = self.analyzer.ffmpeg_process
+        open(self.exit_file, 'w').close()
+        process.wait(timeout=5)
+        os.remove(self.exit_file)
+        return process
+    
+    def test_restart_backoff_and_crash_loop(self):
+        """
+        tests dead ffmpeg is reaped and restarted, retries back off, repeated crashes stop retries
+        """
+        self.analyzer.started_at = time.monotonic()
+        self.assertTrue(self.analyzer.start_ffmpeg_conversion())
+        self.assertTrue(self.analyzer.wait_for_first_frame(deadline=5))
+        self.assertEqual(self.supervisor.tick(now=0), [])
+        
+        old = self.kill_ffmpeg()
+        self.assertEqual(self.analyzer.check_health(), ['ffmpeg'])
+        self.assertEqual(self.supervisor.tick(now=1), ['supervised_cam'])
+        #old process reaped and its pipe closed, new one running
+        self.assertIsNotNone(old.returncode)
+        self.assertTrue(old.stdout.closed)
+        self.assertIsNot(self.analyzer.ffmpeg_process, old)
+        self.assertIsNone(self.analyzer.ffmpeg_process.poll())
+        
+        #second crash waits out the 10s backoff
+        self.kill_ffmpeg()
+        self.assertEqual(self.supervisor.tick(now=5), [])
+        self.assertEqual(self.supervisor.tick(now=11), ['supervised_cam'])
+        self.assertEqual(self.supervisor.stats()['webcams']['supervised_cam']['failures'], 2)
+        
+        #third crash inside the window is a crash loop, no restart until the cooldown
+        self.kill_ffmpeg()
+        self.assertEqual(self.supervisor.tick(now=31), [])
+        self.assertEqual(self.analyzer.latest_result['status'], 'crash_loop')
+        self.assertEqual(self.supervisor.tick(now=100), [])
+        self.assertEqual(self.supervisor.tick(now=131), ['supervised_cam'])
+        self.assertEqual(self.supervisor.stats()['crash_loops'], 1)
+        
+        #stopping reaps the last process
+        process = self.analyzer.ffmpeg_process
+        self.analyzer.stop_analysis()
+        self.assertIsNotNone(process.returncode)
+        self.assertEqual(self.analyzer.check_health(), [])
+    
+    def test_restart_pipeline_terminates_old_pipeline(self):
+        """
+        tests a dead pipeline is terminated and joined before a new one starts
+        """
+        self.analyzer.inference_mode = 'pipeline'
+        self.analyzer.started_at = time.monotonic()
+        self.analyzer.ffmpeg_process = Mock()
+        self.analyzer.ffmpeg_process.poll.return_value = None
+        old_pipeline = Mock()
+        self.analyzer.pipeline = old_pipeline
+        self.analyzer.pipeline_thread = threading.Thread(target=lambda: None)
+        self.analyzer.pipeline_thread.start()
+        self.analyzer.pipeline_thread.join()
+        self.assertEqual(self.analyzer.check_health(), ['pipeline'])
+        
+        with patch.object(self.analyzer, 'run_inference') as run_inference:
+            self.assertTrue(self.analyzer.restart_pipeline())
+            self.analyzer.pipeline_thread.join(timeout=5)
+        old_pipeline.terminate.assert_called_once()
+        run_inference.assert_called_once()
+        
+        #a stopped analyzer is never restarted
+        self.analyzer.stop_analysis()
+        self.assertFalse(self.analyzer.restart_pipeline())
+        self.assertEqual(self.analyzer.check_health(), [])
+    
+    def test_backoff_jitter(self):
+        """
+        tests backoff doubles per restart within the jitter and stays under the ceiling
+        """
+        supervisor = PipelineSupervisor(lambda: {}, base_backoff=2, max_backoff=30, jitter=0.2)
+        for failures, expected in [(1, 2), (2, 4), (3, 8)]:
+            delay = supervisor.backoff(failures)
+            self.assertGreaterEqual(delay, expected * 0.8)
+            self.assertLessEqual(delay, expected * 1.2)
+        self.assertLessEqual(supervisor.backoff(10), 30)
+
+
+class TestStageMetrics(unittest.TestCase):
+    """
+    tests for stage histograms, frame timestamps through the analyzer and process stats
+    """
+    
+    def test_histogram_buckets(self):
+        """
+        tests values land in the first bucket whose bound they don't exceed
+        """
+        histogram = Histogram(bounds=(0.01, 0.1))
+        for seconds in (0.005, 0.01, 0.05, 5.0):
+            histogram.observe(seconds)
+        cumulative, count, total = histogram.snapshot()
+        self.assertEqual(cumulative, [2, 3, 4])
+        self.assertEqual(count, 4)
+        self.assertAlmostEqual(total, 5.065)
+    
+    def test_frame_timestamps_reach_every_stage(self):
+        """
+        tests a bus frame's timestamp is carried through admit and sink into every stage
+        """
+        analyzer = LiveStreamAnalyzer('metrics_cam', 'https://test.example.com/stream.m3u8')
+        analyzer.rate_controller = None
+        analyzer.motion_gate = None
+        analyzer.frame_bus.running = True
+        jpeg = cv2.imencode('.jpg', np.zeros((8, 8, 3), dtype=np.uint8))[1].tobytes()
+        for _ in range(3):
+            analyzer.frame_bus.publish_jpeg(jpeg)
+        
+        frame = analyzer.frame_bus.latest
+        self.assertTrue(analyzer.admit_frame(frame))
+        analyzer.roboflow_sink({'predictions': []}, frame)
+        
+        stages = analyzer.metrics.stages
+        self.assertEqual(stages['frame_interval'].snapshot()[1], 2)
+        self.assertEqual(stages['decode'].snapshot()[1], 3)
+        for stage in ('handoff', 'inference', 'sink', 'publish', 'end_to_end'):
+            self.assertEqual(stages[stage].snapshot()[1], 1, stage)
+        self.assertEqual(analyzer.frame_drops()['skipped'], 2)
+        self.assertEqual(analyzer.metrics.inferences, 1)
+        analysis_results.remove('metrics_cam')
+    
+    def test_inference_fps(self):
+        """
+        tests fps over the recent window, decaying once results stop
+        """
+        metrics = PipelineMetrics('fps_cam', fps_window=4)
+        for i in range(10):
+            metrics.inferred(i, i, float(i))
+        self.assertAlmostEqual(metrics.inference_fps(now=9.0), 1.0)
+        self.assertAlmostEqual(metrics.inference_fps(now=15.0), 3 / 9)
+    
+    def test_process_usage(self):
+        """
+        tests cpu/rss are read with psutil and from /proc without it
+        """
+        usage = process_usage(os.getpid())
+        self.assertGreater(usage['rss_bytes'], 0)
+        with patch.object(stage_metrics, 'psutil', None):
+            proc_usage = process_usage(os.getpid())
+        self.assertGreater(proc_usage['rss_bytes'], 0)
+        self.assertGreaterEqual(proc_usage['cpu_seconds'], 0)
+        self.assertIsNone(process_usage(2 ** 22 + 1))
+
+
+class TestBuoyCache(unittest.TestCase):
+    """
+    tests for the cached, incremental CDIP fetcher (local NetCDF stand in)
+    """
+    
+    def setUp(self):
+        """
+        writes a local NetCDF file the cache reads instead of THREDDS
+        """
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, '{buoy_id}p1_rt.nc')
+        self.write(40)
+    
+    def tearDown(self):
+        self.tmpdir.cleanup()
+    
+    def write(self, records):
+        make_cdip_dataset(records).to_netcdf(self.path.format(buoy_id='273'))
+    
+    def test_first_fetch_keeps_latest_records(self):
+        """
+        tests only the latest max_records are pulled and cached
+        """
+        cache = BuoyCache(ttl=60, max_records=30, url_template=self.path)
+        records = cache.get('273')
+        
+        self.assertEqual(len(records['waveTime']), 30)
+        self.assertEqual(records['waveHs'][-1], 39)
+        self.assertEqual(cache.records_pulled, 30)
+        
+        #inside the ttl nothing is re-opened
+        cache.get('273')
+        self.assertEqual(cache.refreshes, 1)
+        self.assertEqual(cache.hits, 1)
+    
+    def test_refresh_only_pulls_new_records(self):
+        """
+        tests a refresh after new records arrive transfers just the new ones
+        """
+        cache = BuoyCache(ttl=0, max_records=30, url_template=self.path)
+        cache.get('273')
+        self.write(45)
+        self.assertTrue(cache.refresh_buoy('273'))
+        records = cache.get('273')
+        
+        self.assertEqual(cache.records_pulled, 35)
+        self.assertEqual(len(records['waveTime']), 30)
+        self.assertEqual(records['waveHs'].tolist(), list(range(15, 45)))
+        
+        #unchanged server side, nothing pulled
+        cache.refresh_buoy('273')
+        self.assertEqual(cache.records_pulled, 35)
+    
+    def test_lean_loader_reads_only_new_wave_records(self):
+        """
+        tests the loader returns just the served variables, and only records after newest
+        """
+        ds = open_wave_dataset(self.path.format(buoy_id='273'))
+        full = load_wave_records(ds, max_records=30)
+        newer = load_wave_records(ds, max_records=30, newest=full['waveTime'][-6])
+        ds.close()
+        
+        self.assertEqual(set(full), {'waveTime', 'waveFlagPrimary', 'waveHs', 'waveTp', 'waveDp', 'waveTa', 'waveTz', 'wavePeakPSD'})
+        self.assertEqual(len(full['waveHs']), 30)
+        self.assertEqual(newer['waveHs'].tolist(), [35, 36, 37, 38, 39])
+        self.assertEqual(newer['waveTime'].dtype.kind, 'M')
+    
+    def test_stale_data_served_while_revalidating(self):
+        """
+        tests a stale buoy answers from memory and hands the refresh to the revalidator
+        """
+        cache = BuoyCache(ttl=0, max_records=30, url_template=self.path)
+        cache.revalidator = Mock()
+        cache.get('273')
+        
+        records = cache.get('273')
+        self.assertEqual(len(records['waveTime']), 30)
+        cache.revalidator.assert_called_once_with('273')
+        self.assertEqual(cache.refreshes, 1)
+    
+    def test_failed_refresh_keeps_stale_data(self):
+        """
+        tests a failing server keeps the cached records and reports the error
+        """
+        cache = BuoyCache(ttl=0, max_records=30, url_template=self.path)
+        cache.get('273')
+        with patch('xarray.open_dataset', side_effect=OSError('THREDDS down')):
+            self.assertFalse(cache.refresh_buoy('273'))
+        
+        self.assertEqual(len(cache.get('273')['waveTime']), 30)
+        buoy = cache.stats()['buoys']['273']
+        self.assertEqual(buoy['last_error'], 'THREDDS down')
+        self.assertIsNotNone(buoy['fetch_latency_ms'])
+    
+    def test_concurrent_refreshes_are_single_flight(self):
+        """
+        tests concurrent requests for a cold buoy open the dataset once
+        """
+        cache = BuoyCache(ttl=60, max_records=30, url_template=self.path)
+        real_open = xr.open_dataset
+        
+        def slow_open(*args, **kwargs):
+            time.sleep(0.05)
+            return real_open(*args, **kwargs)
+        
+        with patch('xarray.open_dataset', side_effect=slow_open) as mock_open:
+            threads = [threading.Thread(target=cache.get, args=('273',)) for _ in range(5)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        
+        self.assertEqual(mock_open.call_count, 1)
+        self.assertEqual(cache.hits, 4)
+
+
+class TestWaveStore(unittest.TestCase):
+    """
+    tests for the append only columnar wave history
+    """
+    
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = WaveStore(self.tmpdir.name)
+    
+    def tearDown(self):
+        self.tmpdir.cleanup()
+    
+    def records(self, records, start='2024-01-31'):
+        ds = make_cdip_dataset(records, start)
+        return {name: ds[name].values for name in ds.variables}
+    
+    def test_append_splits_months_and_skips_stored_records(self):
+        """
+        tests appends partition by month and never duplicate records
+        """
+        #48 half hour records from Jan 31 spill into Feb
+        self.assertEqual(self.store.append('273', self.records(72)), 72)
+        self.assertEqual(self.store.months('273'), ['2024-01', '2024-02'])
+        self.assertEqual(self.store.append('273', self.records(80)), 8)
+        
+        #a fresh store instance reads the same history back from disk
+        reopened = WaveStore(self.tmpdir.name)
+        self.assertEqual(reopened.last_time('273'), self.records(80)['waveTime'][-1])
+        self.assertEqual(len(reopened.read('273', good_only=False)['waveTime']), 80)
+    
+    def test_buoy_ids_cannot_escape_the_store(self):
+        """
+        tests traversal ids and symlinked buoy directories never reach files outside root
+        """
+        outside = tempfile.TemporaryDirectory()
+        self.addCleanup(outside.cleanup)
+        WaveStore(outside.name).append('273', self.records(4))
+        escape = os.path.relpath(os.path.join(outside.name, '273'), self.tmpdir.name)
+        os.symlink(os.path.join(outside.name, '273'), os.path.join(self.tmpdir.name, '100'))
+
+        for buoy_id in (escape, '..', '/etc', '273/../..', '\u0663\u0664\u0665', '100'):
+            with self.assertRaises(ValueError):
+                self.store.query(buoy_id)
+            with self.assertRaises(ValueError):
+                self.store.append(buoy_id, self.records(4))
+        self.assertEqual(len(WaveStore(outside.name).read('273', good_only=False)['waveTime']), 4)
+
+    def test_read_range_and_good_only(self):
+        """
+        tests range reads across months keep only good records inside the range
+        """
+        self.store.append('273', self.records(96))
+        start, end = np.datetime64('2024-01-31T20:00'), np.datetime64('2024-02-01T04:00')
+        records = self.store.read('273', start, end)
+        
+        self.assertTrue((records['waveTime'] >= start).all() and (records['waveTime'] <= end).all())
+        self.assertTrue((records['waveFlagPrimary'] == 1).all())
+        self.assertEqual(len(self.store.read('273', start, end, good_only=False)['waveTime']), 17)
+    
+    def test_torn_append_is_repaired(self):
+        """
+        tests a crash between column writes doesn't misalign later appends
+        """
+        self.store.append('273', self.records(10))
+        #simulates a crash after only waveHs was written
+        month_dir = os.path.join(self.tmpdir.name, '273', '2024-01')
+        with open(os.path.join(month_dir, 'waveHs.bin'), 'ab') as f:
+            f.write(np.zeros(3, dtype='<f4').tobytes())
+        
+        self.store.append('273', self.records(12))
+        records = self.store.read('273', good_only=False)
+        self.assertEqual(records['waveHs'].tolist(), list(range(12)))
+    
+    def test_resample_buckets(self):
+        """
+        tests hourly buckets average values and circular mean directions
+        """
+        columns = {
+            'waveTime': np.array(['2024-01-01T00:00', '2024-01-01T00:30', '2024-01-01T01:00'], dtype='datetime64[ns]'),
+            'waveHs': np.array([1.0, 3.0, np.nan], dtype=np.float32),
+            'waveDp': np.array([350.0, 10.0, 90.0], dtype=np.float32),
+        }
+        out = resample(columns, np.timedelta64(1, 'h'))
+        
+        self.assertEqual(len(out['waveTime']), 2)
+        self.assertEqual(out['waveHs'][0], 2.0)
+        self.assertTrue(np.isnan(out['waveHs'][1]))
+        self.assertAlmostEqual(float(out['waveDp'][0]) % 360, 0.0, places=3)
+
+    def test_resample_all_nan_direction_bucket_is_missing(self):
+        """
+        tests a bucket without any valid direction stays NaN instead of becoming 0 degrees
+        """
+        columns = {
+            'waveTime': np.array(['2024-01-01T00:00', '2024-01-01T01:00', '2024-01-01T01:30'], dtype='datetime64[ns]'),
+            'waveDp': np.array([90.0, np.nan, np.nan], dtype=np.float32),
+        }
+        out = resample(columns, np.timedelta64(1, 'h'))
+
+        self.assertAlmostEqual(float(out['waveDp'][0]), 90.0, places=3)
+        self.assertTrue(np.isnan(out['waveDp'][1]))
+
+    def test_query_picks_resolution_under_max_points(self):
+        """
+        tests queries without a resolution are resampled until they fit
+        """
+        self.store.append('273', self.records(200))
+        self.assertEqual(self.store.query('273', max_points=1000)[0], 'raw')
+        resolution, records = self.store.query('273', max_points=50)
+        self.assertEqual(resolution, '3h')
+        self.assertLessEqual(len(records['waveTime']), 50)
+        with self.assertRaises(ValueError):
+            self.store.query('273', resolution='2w')
+    
+    def test_cache_refreshes_feed_the_store(self):
+        """
+        tests a cache refresh backfills an empty store and appends afterwards
+        """
+        path = os.path.join(self.tmpdir.name, '{buoy_id}.nc')
+        make_cdip_dataset(100).to_netcdf(path.format(buoy_id='273'))
+        cache = BuoyCache(ttl=0, max_records=30, url_template=path, store=self.store)
+        cache.get('273')
+        self.assertEqual(len(self.store.read('273', good_only=False)['waveTime']), 100)
+        
+        make_cdip_dataset(105).to_netcdf(path.format(buoy_id='273'))
+        cache.refresh_buoy('273')
+        self.assertEqual(len(self.store.read('273', good_only=False)['waveTime']), 105)
+
+
+class TestSpectrumLoader(unittest.TestCase):
+    """
+    tests for lazy chunked spectral reads
+    """
+    
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmpdir.name, '{buoy_id}.nc')
+        make_cdip_dataset(100, frequencies=8).to_netcdf(path.format(buoy_id='273'))
+        self.cache = BuoyCache(ttl=60, url_template=path)
+        self.loader = SpectrumLoader(self.cache, ChunkLRU(max_bytes=1024 * 1024), chunk_records=16)
+    
+    def tearDown(self):
+        self.tmpdir.cleanup()
+    
+    def test_window_reads_only_covering_chunks(self):
+        """
+        tests a window is assembled from the chunks it covers, then served from the lru
+        """
+        start, end = np.datetime64('2024-01-01T10:00'), np.datetime64('2024-01-01T20:00')
+        times, frequencies, values = self.loader.window('273', 'waveEnergyDensity', start, end)
+        
+        #records 20..40 live in chunks 1 and 2 of 16 records
+        self.assertEqual(values.shape, (21, 8))
+        self.assertEqual(values.dtype, np.float32)
+        self.assertEqual(values[0, 3], 2003)
+        self.assertEqual(times[-1], np.datetime64('2024-01-01T20:00'))
+        self.assertEqual(len(frequencies), 8)
+        self.assertEqual(self.loader.lru.stats()['chunks'], 2)
+        
+        with patch('xarray.open_dataset') as mock_open:
+            _, _, again = self.loader.window('273', 'waveEnergyDensity', start, end)
+            mock_open.assert_not_called()
+        np.testing.assert_array_equal(again, values)
+    
+    def test_default_window_and_errors(self):
+        """
+        tests the default latest 48 records and rejected requests
+        """
+        times, _, values = self.loader.window('273', 'waveA1Value')
+        self.assertEqual(len(times), 48)
+        self.assertEqual(values[-1, 0], -9900)
+        
+        with self.assertRaises(ValueError):
+            self.loader.window('273', 'waveHs')
+        with self.assertRaises(ValueError):
+            self.loader.window('273', 'waveEnergyDensity', np.datetime64('2024-01-01'), np.datetime64('2024-02-01'), max_records=10)
+    
+    def test_lru_evicts_by_bytes(self):
+        """
+        tests least recently used chunks are dropped past the byte budget
+        """
+        lru = ChunkLRU(max_bytes=1000)
+        lru.put('a', np.zeros(100, dtype=np.float32))
+        lru.put('b', np.zeros(100, dtype=np.float32))
+        lru.get('a')
+        lru.put('c', np.zeros(100, dtype=np.float32))
+        
+        self.assertIsNotNone(lru.get('a'))
+        self.assertIsNone(lru.get('b'))
+        self.assertLessEqual(lru.nbytes, 1000)
+        lru.put('huge', np.zeros(1000, dtype=np.float32))
+        self.assertIsNone(lru.get('huge'))
+    
+    def test_binary_round_trip(self):
+        """
+        tests the binary layout decodes back to the same arrays
+        """
+        times = np.array(['2024-01-01T00:00', '2024-01-01T00:30'], dtype='datetime64[ns]')
+        frequencies = np.array([0.1, 0.2, 0.3], dtype=np.float32)
+        values = np.arange(6, dtype=np.float32).reshape(2, 3)
+        seconds, freqs, decoded = decode_spectrum(encode_spectrum(times, frequencies, values))
+        
+        self.assertEqual(seconds.tolist(), [1704067200.0, 1704069000.0])
+        np.testing.assert_array_equal(freqs, frequencies)
+        np.testing.assert_array_equal(decoded, values)
+
+
+class TestBuoyPrefetcher(unittest.TestCase):
+    """
+    tests for the background buoy prefetcher
+    """
+    
+    def setUp(self):
+        self.cache = BuoyCache(ttl=60)
+        self.cache.refresh_buoy = Mock(return_value=True)
+        self.prefetcher = BuoyPrefetcher(self.cache, buoy_ids=['273', '157'], interval=100, jitter=0.1, max_workers=2)
+    
+    def tearDown(self):
+        self.prefetcher.stop()
+    
+    def test_targets_include_recent_requests(self):
+        """
+        tests recently requested buoys are kept warm along with the configured ones
+        """
+        for buoy_id, age in (('999', 0), ('100', 10 * self.prefetcher.recent_seconds)):
+            records = self.cache._records(buoy_id)
+            records.last_requested = records.fetched_at = time.monotonic() - age
+        self.assertEqual(self.prefetcher.targets(), ['273', '157', '999'])
+
+    def test_targets_skip_failed_and_cap_recent_buoys(self):
+        """
+        tests requested buoys that never fetched fine aren't kept warm, and only the newest few are
+        """
+        now = time.monotonic()
+        self.prefetcher.recent_max = 2
+        for i, buoy_id in enumerate(('101', '102', '103')):
+            records = self.cache._records(buoy_id)
+            records.last_requested = records.fetched_at = now - 10 + i
+        self.cache._records('404').last_requested = now
+        failing = self.cache._records('405')
+        failing.last_requested, failing.fetched_at, failing.last_error = now, now - 10, 'HTTP 404'
+        self.cache._records('../x').last_requested = now
+        self.assertEqual(self.prefetcher.targets(now), ['273', '157', '103', '102'])
+    
+    def test_tick_refreshes_due_buoys_with_jitter(self):
+        """
+        tests due buoys are refreshed once and rescheduled within the jitter range
+        """
+        self.prefetcher.executor = ThreadPoolExecutor(max_workers=2)
+        self.assertEqual(sorted(self.prefetcher.tick()), ['157', '273'])
+        self.prefetcher.executor.shutdown(wait=True)
+        
+        self.assertEqual(self.cache.refresh_buoy.call_count, 2)
+        now = time.monotonic()
+        for buoy_id in ('273', '157'):
+            self.assertTrue(now + 85 <= self.prefetcher.due[buoy_id] <= now + 110)
+        self.assertEqual(self.prefetcher.in_flight, set())
+    
+    def test_submit_skips_in_flight_buoys(self):
+        """
+        tests a buoy already queued is not queued twice
+        """
+        self.prefetcher.executor = Mock()
+        self.assertTrue(self.prefetcher.submit('273'))
+        self.assertFalse(self.prefetcher.submit('273'))
+        self.assertEqual(self.prefetcher.executor.submit.call_count, 1)
+    
+    def test_start_takes_over_revalidation(self):
+        """
+        tests stale-while-revalidate refreshes go through the prefetch pool while running
+        """
+        self.prefetcher.start()
+        self.assertEqual(self.cache.revalidator, self.prefetcher.submit)
+        self.prefetcher.stop()
+        self.assertIsNone(self.cache.revalidator)
+
+
+class TestVideoAnalysisRoutes(unittest.TestCase):
+    """
+    tests for video analysis API routes
+    """
+    
+    def setUp(self):
+        """
+        creates a test Flask app and clears global state.
+        """
+        self.app = create_app()
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        
+        #clear global state
+        analysis_results.clear()
+        active_pipelines.clear()
+    
+    def tearDown(self):
+        """
+        cleans up after each test method
+        """
+        self.app_context.pop()
+    
+    def test_get_video_analysis_no_webcam_id(self):
+        """
+        tests video analysis endpoint when no webcam_id is provided.
+        """
+        response = self.client.get('/api/video-analysis')
+        self.assertEqual(response.status_code, 400)
+        
+        data = json.loads(response.data)
+        self.assertIn('error', data)
+        self.assertEqual(data['error'], 'No Webcam Selected')
+    
+    def test_get_video_analysis_invalid_webcam_id(self):
+        """
+        tests video analysis endpoint with invalid webcam_id.
+        """
+        response = self.client.get('/api/video-analysis?webcam_id=invalid_webcam')
+        self.assertEqual(response.status_code, 404)
+        
+        data = json.loads(response.data)
+        self.assertIn('error', data)
+        self.assertEqual(data['error'], 'Webcam Not Available')
+    
+    @patch('routes.video_analysis.LiveStreamAnalyzer')
+    def test_get_video_analysis_start_new_analysis(self, mock_analyzer_class):
+        """
+        tests starting a new video analysis for a valid webcam.
+        """
+        #mock analyzer instance
+        mock_analyzer = Mock()
+        mock_analyzer_class.return_value = mock_analyzer
+        
+        #use a valid webcam ID from config
+        webcam_id = list(WEBCAM_CONFIGS.keys())[0]
+        
+        response = self.client.get(f'/api/video-analysis?webcam_id={webcam_id}')
+        self.assertEqual(response.status_code, 200)
+        
+        data = json.loads(response.data)
+        self.assertEqual(data['webcam_id'], webcam_id)
+        self.assertEqual(data['status'], 'Starting')
+        self.assertEqual(data['surfer_count'], 0)
+        self.assertIn('message', data)
+        
+        #verify analyzer was created and started
+        mock_analyzer_class.assert_called_once()
+        mock_analyzer.start_analysis.assert_called_once()
+      
+    def test_stop_analysis_existing_pipeline(self):
+        """
+        tests stopping an existing video analysis pipeline.
+        """
+        #set up existing pipeline
+        webcam_id = "test_webcam"
+        mock_analyzer = Mock()
+        active_pipelines[webcam_id] = mock_analyzer
+        analysis_results[webcam_id] = {'surfer_count': 1, 'status': 'online'}
+        
+        response = self.client.get(f'/api/stop-analysis/{webcam_id}')
+        self.assertEqual(response.status_code, 200)
+        
+        data = json.loads(response.data)
+        self.assertIn('message', data)
+        
+        #verify cleanup
+        mock_analyzer.stop_analysis.assert_called_once()
+        self.assertNotIn(webcam_id, active_pipelines)
+        self.assertNotIn(webcam_id, analysis_results)
+    
+    def test_analysis_stats_endpoint(self):
+        """
+        tests per webcam stats are exposed for active pipelines
+        """
+        mock_analyzer = Mock()
+        mock_analyzer.stats.return_value = {'motion_gate': {'frames_gated': 3}}
+        active_pipelines['test_webcam'] = mock_analyzer
+        
+        response = self.client.get('/api/video-analysis/stats?webcam_id=test_webcam')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['test_webcam']['motion_gate']['frames_gated'], 3)
+        
+        response = self.client.get('/api/video-analysis/stats?webcam_id=missing')
+        self.assertEqual(response.status_code, 404)
+    
+    def test_metrics_endpoint(self):
+        """
+        tests Prometheus exposition of stage histograms, drops and request latency
+        """
+        analyzer = LiveStreamAnalyzer('metrics cam', 'https://test.example.com/stream.m3u8')
+        analyzer.metrics.observe('end_to_end', 0.2)
+        analyzer.metrics.restarts['ffmpeg'] = 2
+        active_pipelines['metrics cam'] = analyzer
+        self.client.get('/api/video-analysis/scheduler')
+        
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        body = response.get_data(as_text=True)
+        self.assertIn('# TYPE surf_stage_seconds histogram', body)
+        self.assertIn('surf_stage_seconds_bucket{webcam="metrics cam",stage="end_to_end",le="0.1"} 0', body)
+        self.assertIn('surf_stage_seconds_bucket{webcam="metrics cam",stage="end_to_end",le="0.25"} 1', body)
+        self.assertIn('surf_stage_seconds_count{webcam="metrics cam",stage="end_to_end"} 1', body)
+        self.assertIn('surf_frames_dropped_total{webcam="metrics cam",reason="motion_gated"} 0', body)
+        self.assertIn('surf_pipeline_restarts_total{webcam="metrics cam",part="ffmpeg"} 2', body)
+        self.assertIn('# TYPE surf_model_rss_bytes gauge', body)
+        self.assertRegex(body, r'surf_http_request_seconds_count\{endpoint="video_analysis.get_scheduler_stats"\} [1-9]')
+    
+    def test_model_stats_endpoint(self):
+        """
+        tests shared model references, load time and memory are exposed
+        """
+        model_registry.acquire('detector:route_test', lambda: object())
+        try:
+            response = self.client.get('/api/video-analysis/models')
+            self.assertEqual(response.status_code, 200)
+            data = json.loads(response.data)
+            self.assertEqual(data['models']['detector:route_test']['refs'], 1)
+            self.assertIn('model_rss_bytes', data)
+        finally:
+            model_registry.release('detector:route_test')
+    
+    def test_scheduler_stats_endpoint(self):
+        """
+        tests batched scheduler stats are exposed
+        """
+        response = self.client.get('/api/video-analysis/scheduler')
+        self.assertEqual(response.status_code, 200)
+        
+        data = json.loads(response.data)
+        self.assertIn('avg_batch_size', data)
+        self.assertIn('avg_queue_wait_ms', data)
+        self.assertIn('avg_batch_latency_ms', data)
+    
+    def test_history_endpoint(self):
+        """
+        tests count history is served per webcam and unknown webcams 404
+        """
+        count_histories.get('route_cam').record(4)
+        
+        response = self.client.get('/api/video-analysis/history?webcam_id=route_cam&resolution=raw')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['max'], [4])
+        
+        self.assertEqual(self.client.get('/api/video-analysis/history?webcam_id=nope').status_code, 404)
+        self.assertEqual(self.client.get('/api/video-analysis/history?webcam_id=route_cam&resolution=bad').status_code, 400)
+    
+    def test_stop_analysis_no_active_pipeline(self):
+        """
+        tests stopping analysis when no active pipeline exists.
+        """
+        response = self.client.get('/api/stop-analysis/nonexistent_webcam')
+        self.assertEqual(response.status_code, 404)
+        
+        data = json.loads(response.data)
+        self.assertIn('error', data)
+        self.assertEqual(data['error'], 'No Active Analysis Found')
+    
+    def test_get_analysis_changes(self):
+        """
+        tests the changes endpoint returns results newer than the client's version
+        """
+        analysis_results.publish('cam_a', {'surfer_count': 2, 'status': 'online', 'last_update': None})
+        data = json.loads(self.client.get('/api/video-analysis/changes').data)
+        self.assertEqual(data['results']['cam_a']['surfer_count'], 2)
+        
+        analysis_results.remove('cam_a')
+        data = json.loads(self.client.get(f"/api/video-analysis/changes?since={data['version']}").data)
+        self.assertEqual(data['results'], {})
+        self.assertEqual(data['removed'], ['cam_a'])
+    
+    def test_video_feed_no_active_pipeline(self):
+        """
+        tests video feed endpoint when no active pipeline exists.
+        """
+        response = self.client.get('/video_feed/nonexistent_webcam')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data.decode(), 'Webcam not active')
+    
+    def test_video_feed_streams_from_frame_bus(self):
+        """
+        tests video feed streams frames from the analyzer's shared frame bus
+        """
+        bus = FrameBus('test_webcam')
+        broadcaster = bus.broadcaster
+        broadcaster.start()
+        broadcaster.publish(b'\xff\xd8jpeg\xff\xd9')
+        
+        mock_analyzer = Mock()
+        mock_analyzer.frame_bus = bus
+        active_pipelines['test_webcam'] = mock_analyzer
+        
+        response = self.client.get('/video_feed/test_webcam')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.mimetype.startswith('multipart/x-mixed-replace'))
+        
+        chunk = next(response.response)
+        self.assertIn(b'\xff\xd8jpeg\xff\xd9', chunk)
+        
+        broadcaster.stop()
+        response.close()
+
+
+class TestSurfDataRoutes(unittest.TestCase):
+    """
+    tests for surf data API routes.
+    """
+    
+    def setUp(self):
+        """
+        sets up test fixtures before each test method.
+        """
+        self.app = create_app()
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        buoy_cache.clear()
+        spectrum_loader.clear()
+        #wave history goes to a throwaway directory
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.real_store = buoy_cache.store
+        buoy_cache.store = WaveStore(self.tmpdir.name)
+    
+    def tearDown(self):
+        """
+        cleans up after each test method.
+        """
+        buoy_cache.store = self.real_store
+        self.tmpdir.cleanup()
+        self.app_context.pop()
+    
+    @patch('xarray.open_dataset')
+    def test_get_surf_data_success(self, mock_open_dataset):
+        """
+        tests successful retrieval of surf data from CDIP buoys.
+        """
+        #dataset shaped like the CDIP realtime files
+        mock_open_dataset.return_value = make_cdip_dataset(40)
+        
+        response = self.client.get('/api/surfdata?buoy_id=273')
+        self.assertEqual(response.status_code, 200)
+        
+        data = json.loads(response.data)
+        self.assertIn('time', data)
+        self.assertIn('waveHs', data)
+        self.assertIn('waveTp', data)
+        self.assertIn('waveDp', data)
+        self.assertIn('waveTa', data)
+        self.assertIn('waveTz', data)
+        self.assertIn('wavePeakPSD', data)
+        self.assertEqual(len(data['waveHs']), 10)
+        
+        status = json.loads(self.client.get('/api/surfdata/status').data)
+        self.assertIsNone(status['buoys']['273']['last_error'])
+        self.assertIn('fetch_latency_ms', status['buoys']['273'])
+    
+    @patch('xarray.open_dataset')
+    def test_get_surf_data_cached(self, mock_open_dataset):
+        """
+        tests repeat polls within the ttl don't re-open the remote dataset
+        """
+        mock_open_dataset.return_value = make_cdip_dataset(40)
+        
+        first = self.client.get('/api/surfdata?buoy_id=273')
+        second = self.client.get('/api/surfdata?buoy_id=273')
+        self.assertEqual(first.data, second.data)
+        mock_open_dataset.assert_called_once()
+        
+        #same refresh, same ETag -> 304 without a body
+        etag = first.headers['ETag']
+        self.assertEqual(second.headers['ETag'], etag)
+        cached = self.client.get('/api/surfdata?buoy_id=273', headers={'If-None-Match': etag})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.data, b'')
+    
+    def test_surf_payload_matches_per_record_formatting(self):
+        """
+        tests the vectorized payload equals the old per timestamp strftime loop
+        """
+        ds = make_cdip_dataset(30)
+        records = {name: ds[name].values for name in ds.variables}
+        data = json.loads(build_surf_payload(records))
+        
+        good = records['waveFlagPrimary'] == 1
+        expected = [pd.to_datetime(t).strftime('%Y-%m-%d %I:%M %p') for t in records['waveTime'][good][:10]]
+        self.assertEqual(data['time'], expected)
+        self.assertEqual(data['waveHs'], records['waveHs'][good][:10].tolist())
+        
+        records['waveFlagPrimary'][:] = 4
+        self.assertIsNone(build_surf_payload(records))
+    
+    @patch('xarray.open_dataset')
+    def test_get_surf_data_range(self, mock_open_dataset):
+        """
+        tests start/end/resolution are served from the wave history
+        """
+        mock_open_dataset.return_value = make_cdip_dataset(100)
+        
+        response = self.client.get('/api/surfdata?buoy_id=273&start=2024-01-01T06:00&end=2024-01-02T01:00&resolution=6h')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['resolution'], '6h')
+        self.assertEqual(data['time'][0], '2024-01-01 06:00 AM')
+        self.assertEqual(len(data['waveHs']), 4)
+        
+        self.assertEqual(self.client.get('/api/surfdata?buoy_id=273&start=notadate').status_code, 400)
+        self.assertEqual(self.client.get('/api/surfdata?buoy_id=273&resolution=2w').status_code, 400)
+        self.assertEqual(self.client.get('/api/surfdata?buoy_id=273&start=2030-01-01').status_code, 404)
+    
+    @patch('xarray.open_dataset')
+    def test_get_surf_data_spectrum(self, mock_open_dataset):
+        """
+        tests the spectrum endpoint returns a binary float32 window
+        """
+        mock_open_dataset.return_value = make_cdip_dataset(60, frequencies=4)
+        
+        response = self.client.get('/api/surfdata/spectrum?buoy_id=273')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/octet-stream')
+        self.assertEqual(response.headers['X-Spectrum-Shape'], '48,4')
+        _, _, values = decode_spectrum(response.data)
+        self.assertEqual(values[-1].tolist(), [5900, 5901, 5902, 5903])
+        
+        self.assertEqual(self.client.get('/api/surfdata/spectrum?buoy_id=273&variable=bogus').status_code, 400)
+    
+    @patch('xarray.open_dataset')
+    def test_get_surf_data_batch(self, mock_open_dataset):
+        """
+        tests the batch endpoint returns partial results with per buoy errors
+        """
+        def open_dataset(url, **kwargs):
+            if '999' in url:
+                raise Exception("Network error")
+            return make_cdip_dataset(40)
+        mock_open_dataset.side_effect = open_dataset
+        
+        response = self.client.get('/api/surfdata/batch?buoy_ids=273,999,157,273')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(list(data['buoys']), ['273', '157'])
+        self.assertEqual(len(data['buoys']['157']['waveHs']), 10)
+        self.assertEqual(data['errors'], {'999': 'Network error'})
+        #same bytes as the single buoy endpoint
+        single = json.loads(self.client.get('/api/surfdata?buoy_id=273').data)
+        self.assertEqual(data['buoys']['273'], single)
+        
+        self.assertEqual(self.client.get('/api/surfdata/batch').status_code, 400)
+        too_many = ','.join(str(i) for i in range(Config.BUOY_BATCH_MAX + 1))
+        self.assertEqual(self.client.get(f'/api/surfdata/batch?buoy_ids={too_many}').status_code, 400)
+
+    @patch('xarray.open_dataset')
+    def test_invalid_buoy_ids_are_rejected(self, mock_open_dataset):
+        """
+        tests buoy ids that aren't CDIP station ids get a 400 and never reach the fetcher
+        """
+        for query in ('/api/surfdata?buoy_id=../../etc',
+                      '/api/surfdata?buoy_id=273x',
+                      '/api/surfdata?buoy_id=..&start=2024-01-01',
+                      '/api/surfdata/spectrum?buoy_id={x}',
+                      '/api/surfdata/batch?buoy_ids=273,27'):
+            self.assertEqual(self.client.get(query).status_code, 400, query)
+        mock_open_dataset.assert_not_called()
+
+    @patch('xarray.open_dataset')
+    def test_get_surf_data_network_error(self, mock_open_dataset):
+        """
+        tests surf data endpoint when network/connection errors occur.
+        """
+        #mock network error
+        mock_open_dataset.side_effect = Exception("Network error")
+        
+        response = self.client.get('/api/surfdata?buoy_id=273')
+        self.assertEqual(response.status_code, 500)
+        
+        data = json.loads(response.data)
+        self.assertIn('error', data)
+    
+    def test_get_surf_data_default_buoy(self):
+        """
+        tests surf data endpoint with default buoy ID.
+        """
+        with patch('xarray.open_dataset') as mock_open_dataset:
+            #mock successful dataset
+            mock_dataset = Mock()
+            mock_dataset.isel.return_value = mock_dataset
+            mock_dataset.where.return_value = mock_dataset
+            mock_dataset.waveTime.size = 10
+            mock_open_dataset.return_value = mock_dataset
+            
+            response = self.client.get('/api/surfdata')
+            #should use default buoy_id without errors
+            mock_open_dataset.assert_called_once()
+            call_args = mock_open_dataset.call_args[0][0]
+            self.assertIn('273', call_args)  # Default buoy ID
+
+
+class TestFrontendRoutes(unittest.TestCase):
+    """
+    tests for frontend serving routes.
+    """
+    
+    def setUp(self):
+        """
+        aets up test fixtures before each test method.
+        """
+        self.app = create_app()
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+    
+    def tearDown(self):
+        """
+        cleans up after each test method.
+        """
+        self.app_context.pop()
+    
+    @patch('routes.frontend.render_template')
+    def test_serve_frontend(self, mock_render_template):
+        """
+        tests that the frontend route serves the main application page.
+        """
+        mock_render_template.return_value = "<html>Frontend</html>"
+        
+        response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        
+        mock_render_template.assert_called_once_with('frontend.html')
+
+
+class TestAppCreation(unittest.TestCase):
+    """
+    tests for Flask application creation and configuration.
+    """
+    
+    def test_create_app_returns_flask_instance(self):
+        """
+        tests that create_app returns a proper Flask application instance
+        """
+        app = create_app()
+        self.assertIsNotNone(app)
+        self.assertEqual(app.__class__.__name__, 'Flask')
+    
+    def test_app_has_required_blueprints(self):
+        """
+        tests that the application has all required blueprints registered
+        """
+        app = create_app()
+        
+        #check that blueprints are registered
+        blueprint_names = [bp.name for bp in app.blueprints.values()]
+        self.assertIn('video_analysis', blueprint_names)
+        self.assertIn('surf_data', blueprint_names)
+        self.assertIn('frontend', blueprint_names)
+    
+    def test_app_config_loaded(self):
+        """
+        tests that the application configuration is properly loaded
+        """
+        app = create_app()
+        
+        #check that config is loaded from Config class
+        self.assertEqual(app.config['DEBUG'], Config.DEBUG)
+        self.assertEqual(app.config['MAX_FPS'], Config.MAX_FPS)
+
+
+
+class TestAsyncApp(AioHTTPTestCase):
+    """
+    tests for the asyncio entry point
+    """
+    
+    async def get_application(self):
+        return create_async_app(workers=2)
+    
+    async def test_api_routes_served_by_flask_views(self):
+        """
+        tests non streaming requests reach the unchanged Flask views
+        """
+        response = await self.client.get('/api/video-analysis')
+        self.assertEqual(response.status, 400)
+        self.assertEqual(await response.json(), {'error': 'No Webcam Selected'})
+        #flask-cors headers survive the bridge
+        response = await self.client.get('/api/video-analysis/scheduler', headers={'Origin': 'http://localhost:3000'})
+        self.assertEqual(response.status, 200)
+        self.assertIn('Access-Control-Allow-Origin', response.headers)
+    
+    async def test_analysis_events_pushed_to_coroutines(self):
+        """
+        tests event stream subscribers on the async server get published changes
+        """
+        response = await self.client.get('/api/video-analysis/events')
+        self.assertEqual(response.status, 400)
+        
+        webcam_id = next(iter(WEBCAM_CONFIGS))
+        channel = result_events.channel(webcam_id)
+        response = await self.client.get(f'/api/video-analysis/events?webcam_id={webcam_id}')
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.headers['Content-Type'], 'text/event-stream')
+        self.assertEqual(await response.content.readuntil(b'\n\n'), b'retry: 3000\n\n')
+        
+        count = json.loads(channel.latest()[1] or '{"surfer_count": 0}')['surfer_count'] + 1
+        threading.Thread(target=channel.publish, args=({'surfer_count': count, 'status': 'online', 'last_update': None},)).start()
+        event = await asyncio.wait_for(response.content.readuntil(b'\n\n'), 5)
+        self.assertIn(f'"surfer_count":{count}'.encode(), event)
+        response.close()
+    
+    async def test_video_feed_streams_from_frame_bus(self):
+        """
+        tests async viewers get multipart frames and unsubscribe when the stream ends
+        """
+        response = await self.client.get('/video_feed/nonexistent_webcam')
+        self.assertEqual(response.status, 404)
+        
+        bus = FrameBus('test_webcam')
+        broadcaster = bus.broadcaster
+        broadcaster.start()
+        broadcaster.publish(b'\xff\xd8first\xff\xd9')
+        mock_analyzer = Mock()
+        mock_analyzer.frame_bus = bus
+        active_pipelines['test_webcam'] = mock_analyzer
+        try:
+            response = await self.client.get('/video_feed/test_webcam')
+            self.assertEqual(response.status, 200)
+            self.assertTrue(response.headers['Content-Type'].startswith('multipart/x-mixed-replace'))
+            self.assertIn(b'\xff\xd8first\xff\xd9', await response.content.readuntil(b'\xff\xd9'))
+            
+            #frames published from another thread wake the viewer coroutine
+            threading.Thread(target=broadcaster.publish, args=(b'\xff\xd8second\xff\xd9',)).start()
+            self.assertIn(b'second', await asyncio.wait_for(response.content.readuntil(b'\xff\xd9'), 5))
+            
+            broadcaster.stop()
+            await asyncio.wait_for(response.read(), 5)
+            self.assertEqual(broadcaster.client_count(), 0)
+        finally:
+            del active_pipelines['test_webcam']
 
 
 if __name__ == '__main__':
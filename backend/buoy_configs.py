@@ -0,0 +1,23 @@
+#CDIP buoy configurations
+#mirrors frontend/src/constants/Buoy_Options.js, these buoys are kept warm by the buoy prefetcher
+BUOY_CONFIGS = {
+    '273': {
+        'name': 'King-Poloa, AS',
+        'location': 'Samoan Islands'
+    },
+
+    '157': {
+        'name': 'Point Sur, CA',
+        'location': 'California'
+    },
+
+    '106': {
+        'name': 'Waimea Bay, HI',
+        'location': 'Hawaii'
+    },
+
+    '067': {
+        'name': 'San Nicolas Island, CA',
+        'location': 'Channel Islands'
+    },
+}
@@ -12,20 +12,121 @@ class Config:
     ROBOFLOW_API_KEY = os.getenv("ROBOFLOW_API_KEY")
     ROBOFLOW_WORKSPACE = os.getenv("ROBOFLOW_WORKSPACE")
     ROBOFLOW_WORKFLOW_ID = os.getenv("ROBOFLOW_WORKFLOW_ID")
+    ROBOFLOW_MODEL_ID = os.getenv("ROBOFLOW_MODEL_ID")  #model behind the workflow, used by the batched backend
     
     #flask settings
     DEBUG = True
     
+    #async server (python async_app.py), idle connections are coroutines instead of threads
+    ASYNC_HOST = os.getenv("ASYNC_HOST", "127.0.0.1")
+    ASYNC_PORT = int(os.getenv("ASYNC_PORT", 5000))
+    ASYNC_WORKERS = 8  #threads running the Flask views for non streaming requests
+    
+    #logging ('DEBUG' adds per result class detail from roboflow_sink)
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    
     #analysis settings
     MAX_FPS = 2
-    BASE_PORT = 8550
+    #'pipeline' -> one InferencePipeline per webcam
+    #'batched' -> one scheduler batches the latest frame of every webcam per tick
+    INFERENCE_MODE = os.getenv("INFERENCE_MODE", "pipeline")
+    INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "roboflow")  #batched mode detector ('roboflow', 'onnx' or 'fake')
+    DETECTION_CONFIDENCE = 0.4
+    
+    #local ONNX Runtime detector ('onnx' backend)
+    ONNX_MODEL_PATH = os.getenv("ONNX_MODEL_PATH", os.path.join(os.path.dirname(__file__), "models", "surfer.onnx"))
+    ONNX_CLASS_NAMES = os.getenv("ONNX_CLASS_NAMES", "Surfer").split(",")  #class id order of the export
+    ONNX_INPUT_SIZE = 640   #square input size if the export's is symbolic
+    ONNX_NMS_IOU = 0.45     #overlap above which the lower scoring box is dropped
+    ONNX_THREADS = 2        #intra op threads per session
+    
+    #pipeline lifecycle (warm set, idle eviction, per host cap)
+    PIPELINE_WARM_WEBCAMS = [w for w in os.getenv("PIPELINE_WARM_WEBCAMS", "").split(",") if w]  #kept running, e.g. "Windansea,Long Beach"
+    PIPELINE_IDLE_TTL = 300        #seconds without polls/viewers before a pipeline is stopped
+    PIPELINE_MAX_ACTIVE = 4        #pipelines running on this host at once
+    PIPELINE_SWEEP_INTERVAL = 30   #seconds between idle checks
+    
+    #motion gate settings (skip inference on static scenes)
+    MOTION_GATE_ENABLED = True
+    MOTION_GATE_THRESHOLD = 2.0          #mean gray level change (0-255), per webcam override: 'motion_threshold'
+    MOTION_GATE_THUMBNAIL_WIDTH = 64     #pixels
+    MOTION_GATE_MAX_SKIP_SECONDS = 60    #forces a fresh inference at least this often
+    
+    #adaptive inference rate settings (MAX_FPS is the ceiling)
+    ADAPTIVE_FPS_ENABLED = True
+    ADAPTIVE_MIN_FPS = 1 / 30            #quiet scenes drop to one inference every 30 seconds
+    ADAPTIVE_DECAY = 0.7                 #rate multiplier per stable result
+    ADAPTIVE_BUSY_COUNT = 5              #surfers at which the lineup counts as busy
+    INFERENCE_FPS_BUDGET = 8             #total inferences per second across all webcams on this host
     
     #FFmpeg settings
+    FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
     FFMPEG_QUALITY = 2
     FFMPEG_RESOLUTION = '1280x720'
     FFMPEG_TIMEOUT = 10
+    FFMPEG_INGEST_MODE = os.getenv("FFMPEG_INGEST_MODE", "mjpeg")  #'mjpeg' or 'rawvideo' (bgr24 over the pipe)
+    FRAME_RING_SIZE = 4  #preallocated rawvideo frame buffers per webcam
+    #-re throttles input to real time, even while ffmpeg buffers the first live segments
+    #'0' reads live HLS as fast as it arrives, the live edge still paces it after startup
+    FFMPEG_REALTIME_INPUT = os.getenv("FFMPEG_REALTIME_INPUT", "1") == "1"
+    
+    #pipeline readiness (replaces the fixed 5 second startup sleep)
+    READY_INITIAL_WAIT = 0.05  #first wait for ffmpeg's first frame, doubles every probe
+    READY_MAX_WAIT = 1.0       #longest single wait between ffmpeg liveness checks
+    READY_DEADLINE = 30        #seconds ffmpeg has to produce its first frame
+    
+    #MJPEG viewer fan-out settings
+    STREAM_CLIENT_QUEUE_SIZE = 2     #frames buffered per viewer before stale ones drop
+    STREAM_CLIENT_TIMEOUT = 5        #seconds a viewer waits for a frame before rechecking
+    STREAM_READ_CHUNK_BYTES = 65536  #upstream read size
+    STREAM_MAX_FRAME_BYTES = 8 * 1024 * 1024  #corrupt stream guard
+    
+    #server push of surfer count changes (/api/video-analysis/events)
+    SSE_COALESCE_SECONDS = 1     #min time between two events to one client, changes in between collapse
+    SSE_HEARTBEAT_SECONDS = 15   #keepalive comment on idle connections
+    
+    #surfer count history (fixed size rings per webcam)
+    HISTORY_RAW_SIZE = 7200     #raw samples, ~1 hour at MAX_FPS
+    HISTORY_MINUTE_SIZE = 1440  #1 minute buckets, 24 hours
+    HISTORY_QUARTER_SIZE = 672  #15 minute buckets, 7 days
     
     #update intervals (in seconds)
     WAVE_UPDATE_INTERVAL = 180  #3 minutes
     VIDEO_UPDATE_INTERVAL = 5   #5 seconds
-    HEALTH_CHECK_INTERVAL = 5   #5 seconds
\ No newline at end of file
+    HEALTH_CHECK_INTERVAL = 5   #5 seconds
+    
+    #pipeline supervisor (restarts dead ffmpeg/inference pipelines, checks every HEALTH_CHECK_INTERVAL)
+    SUPERVISOR_BACKOFF_BASE = 2       #seconds before the second restart, doubles every restart
+    SUPERVISOR_BACKOFF_MAX = 300      #backoff ceiling and crash loop cooldown
+    SUPERVISOR_JITTER = 0.2           #+/- fraction of every backoff
+    SUPERVISOR_CRASH_WINDOW = 600     #seconds restarts are counted over
+    SUPERVISOR_CRASH_LIMIT = 5        #restarts within the window that make a crash loop
+    SUPERVISOR_STABLE_SECONDS = 60    #healthy time after a restart before the backoff resets
+    
+    #CDIP buoy data settings
+    CDIP_URL_TEMPLATE = os.getenv(
+        "CDIP_URL_TEMPLATE",
+        "https://thredds.cdip.ucsd.edu/thredds/dodsC/cdip/realtime/{buoy_id}p1_rt.nc"
+    )  #OPeNDAP url, {buoy_id} is filled in per request
+    BUOY_CACHE_TTL = WAVE_UPDATE_INTERVAL  #seconds cached buoy data is served before a refresh
+    BUOY_CACHE_RECORDS = 30                #latest waveTime records kept per buoy
+    BUOY_PREFETCH_ENABLED = True           #background refresher keeps buoy_configs buoys warm
+    BUOY_PREFETCH_INTERVAL = 150           #seconds between refreshes of one buoy, below BUOY_CACHE_TTL
+    BUOY_PREFETCH_JITTER = 0.1             #+/- fraction of the interval, spreads refreshes out
+    BUOY_PREFETCH_WORKERS = 2              #refreshes running at once
+    BUOY_PREFETCH_RECENT_SECONDS = 3600    #requested buoys outside buoy_configs stay warm this long
+    BUOY_PREFETCH_RECENT_MAX = 16          #most recently requested extra buoys kept warm
+    BUOY_BATCH_WORKERS = 4                 #concurrent fetches for /api/surfdata/batch
+    BUOY_BATCH_MAX = 20                    #buoys per batch request
+    BUOY_BATCH_TIMEOUT = 30                #seconds a batch request waits before reporting a buoy as timed out
+    
+    #persistent wave history (append only columnar files per buoy per month)
+    WAVE_STORE_ENABLED = True
+    WAVE_STORE_DIR = os.getenv("WAVE_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'wave_store'))
+    WAVE_STORE_BACKFILL_RECORDS = 1440     #records pulled when a buoy's history is behind, ~30 days at 30 min
+    WAVE_STORE_MAX_POINTS = 2000           #range queries without a resolution are resampled below this
+    
+    #spectral data (lazy chunked reads)
+    SPECTRUM_CHUNK_RECORDS = 256                #waveTime records per cached chunk
+    SPECTRUM_CACHE_BYTES = 64 * 1024 * 1024     #decoded chunk lru budget
+    SPECTRUM_MAX_RECORDS = 2000                 #largest window one request may ask for
\ No newline at end of file
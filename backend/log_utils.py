@@ -0,0 +1,47 @@
+import logging #standard logging
+import logging.handlers #QueueHandler / QueueListener
+import queue #unbounded handoff between hot threads and the writer thread
+import atexit #flushes queued records on shutdown
+from config import Config #log level
+
+_listener = None #single background writer shared by every logger
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that enqueues the record as is
+    the stdlib prepare() formats the message (and traceback) on the calling thread, here the
+    listener's handler does it, so log args must not be mutated after the call
+    """
+    def prepare(self, record):
+        return record
+
+
+def _start_listener():
+    """
+    routes the 'surf_reporter' logger through a queue
+    callers only enqueue records, a background thread does the formatting and stdout I/O
+    """
+    global _listener
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s %(message)s'))
+
+    root = logging.getLogger('surf_reporter')
+    root.setLevel(Config.LOG_LEVEL)
+    root.addHandler(_DeferredQueueHandler(log_queue))
+    root.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def get_logger(name):
+    """
+    returns queue backed logger under 'surf_reporter'
+    level comes from Config.LOG_LEVEL, per prediction detail is logged at DEBUG (off by default)
+    """
+    if _listener is None:
+        _start_listener()
+    return logging.getLogger(f'surf_reporter.{name}')
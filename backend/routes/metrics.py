@@ -0,0 +1,133 @@
+import threading #request histograms have many writer threads
+import time #request timing
+from flask import Blueprint, Response, g, request
+from analysis.stage_metrics import Histogram, LATENCY_BUCKETS #request latency histograms
+from analysis.model_registry import model_registry #shared model memory and load time
+from routes.video_analysis import active_pipelines, pipeline_manager, pipeline_supervisor
+
+#Prometheus text exposition of the pipeline's stage histograms and counters
+#scrape GET /metrics, e.g. histogram_quantile(0.95, rate(surf_stage_seconds_bucket[5m]))
+metrics_bp = Blueprint('metrics', __name__)
+
+#endpoint name -> Histogram of Flask request latency (streaming routes: time to first byte)
+_request_seconds = {}
+_request_lock = threading.Lock()
+
+
+@metrics_bp.before_app_request
+def _start_timer():
+    g.metrics_start = time.monotonic()
+
+
+@metrics_bp.after_app_request
+def _observe_request(response):
+    start = g.pop('metrics_start', None)
+    if start is not None:
+        endpoint = request.endpoint or 'unmatched'
+        with _request_lock:
+            histogram = _request_seconds.get(endpoint)
+            if histogram is None:
+                histogram = _request_seconds[endpoint] = Histogram()
+            histogram.observe(time.monotonic() - start)
+    return response
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + '}'
+
+
+def _histogram_lines(name, histogram, **labels):
+    """
+    returns exposition lines of one labelled histogram
+    """
+    cumulative, count, total = histogram.snapshot()
+    lines = [
+        f'{name}_bucket{_labels(**labels, le=bound)} {cumulative[i]}'
+        for i, bound in enumerate(LATENCY_BUCKETS)
+    ]
+    lines.append(f'{name}_bucket{_labels(**labels, le="+Inf")} {count}')
+    lines.append(f'{name}_sum{_labels(**labels)} {total}')
+    lines.append(f'{name}_count{_labels(**labels)} {count}')
+    return lines
+
+
+def render_metrics():
+    """
+    builds the /metrics body
+    returns str in Prometheus text format 0.0.4
+    """
+    pipelines = list(active_pipelines.items())
+    families = {
+        'surf_stage_seconds': ('histogram', 'frame path latency by stage, see analysis/stage_metrics.py', []),
+        'surf_frames_total': ('counter', 'frames published on the frame bus', []),
+        'surf_frames_dropped_total': ('counter', 'bus frames that never reached inference, by reason', []),
+        'surf_inferences_total': ('counter', 'inference results handled', []),
+        'surf_inference_fps': ('gauge', 'inferences per second over the last 32 results', []),
+        'surf_pipeline_restarts_total': ('counter', 'supervisor restarts of ffmpeg / the inference pipeline', []),
+        'surf_ffmpeg_cpu_seconds_total': ('counter', 'cpu time used by the webcam ffmpeg process', []),
+        'surf_ffmpeg_rss_bytes': ('gauge', 'resident memory of the webcam ffmpeg process', []),
+        'surf_viewers': ('gauge', 'connected /video_feed viewers', []),
+    }
+    for webcam_id, analyzer in pipelines:
+        metrics = analyzer.metrics
+        for stage, histogram in metrics.stages.items():
+            families['surf_stage_seconds'][2].extend(
+                _histogram_lines('surf_stage_seconds', histogram, webcam=webcam_id, stage=stage))
+        families['surf_frames_total'][2].append(f'surf_frames_total{_labels(webcam=webcam_id)} {analyzer.frame_bus.frame_count}')
+        for reason, count in analyzer.frame_drops().items():
+            families['surf_frames_dropped_total'][2].append(
+                f'surf_frames_dropped_total{_labels(webcam=webcam_id, reason=reason)} {count}')
+        families['surf_inferences_total'][2].append(f'surf_inferences_total{_labels(webcam=webcam_id)} {metrics.inferences}')
+        families['surf_inference_fps'][2].append(f'surf_inference_fps{_labels(webcam=webcam_id)} {metrics.inference_fps():.4f}')
+        for part, count in metrics.restarts.items():
+            families['surf_pipeline_restarts_total'][2].append(
+                f'surf_pipeline_restarts_total{_labels(webcam=webcam_id, part=part)} {count}')
+        usage = analyzer.ffmpeg_usage()
+        if usage is not None:
+            families['surf_ffmpeg_cpu_seconds_total'][2].append(
+                f'surf_ffmpeg_cpu_seconds_total{_labels(webcam=webcam_id)} {usage["cpu_seconds"]}')
+            families['surf_ffmpeg_rss_bytes'][2].append(f'surf_ffmpeg_rss_bytes{_labels(webcam=webcam_id)} {usage["rss_bytes"]}')
+        families['surf_viewers'][2].append(
+            f'surf_viewers{_labels(webcam=webcam_id)} {analyzer.frame_bus.broadcaster.client_count()}')
+
+    supervisor = pipeline_supervisor.stats()
+    manager = pipeline_manager.stats()
+    families['surf_crash_loops_total'] = ('counter', 'webcams the supervisor found crash looping', [
+        f'surf_crash_loops_total {supervisor["crash_loops"]}'])
+    families['surf_active_pipelines'] = ('gauge', 'webcam pipelines running on this host', [
+        f'surf_active_pipelines {manager["active"]}'])
+    families['surf_pipeline_evictions_total'] = ('counter', 'idle pipelines stopped by the lifecycle manager', [
+        f'surf_pipeline_evictions_total {manager["evicted"]}'])
+    models = model_registry.stats()['models']
+    families['surf_model_rss_bytes'] = ('gauge', 'process memory growth while the model loaded', [
+        f'surf_model_rss_bytes{_labels(model=key)} {model["rss_bytes"]}' for key, model in models.items()])
+    families['surf_model_load_seconds'] = ('gauge', 'time the model took to load', [
+        f'surf_model_load_seconds{_labels(model=key)} {model["load_seconds"]}' for key, model in models.items()])
+    families['surf_model_refs'] = ('gauge', 'webcams sharing the loaded model', [
+        f'surf_model_refs{_labels(model=key)} {model["refs"]}' for key, model in models.items()])
+    families['surf_http_request_seconds'] = ('histogram', 'Flask request latency by endpoint', [
+        line
+        for endpoint, histogram in sorted(list(_request_seconds.items()))
+        for line in _histogram_lines('surf_http_request_seconds', histogram, endpoint=endpoint)
+    ])
+
+    out = []
+    for name, (kind, help_text, lines) in families.items():
+        out.append(f'# HELP {name} {help_text}')
+        out.append(f'# TYPE {name} {kind}')
+        out.extend(lines)
+    return '\n'.join(out) + '\n'
+
+
+@metrics_bp.route('/metrics')
+def get_metrics():
+    """
+    Prometheus scrape endpoint
+    returns text/plain exposition of per webcam stage latency, drops, inference fps,
+    restarts, ffmpeg cpu/rss and request latency
+    """
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
@@ -1,19 +1,141 @@
-import xarray as xr #for multi dimesional arrays, helpful for NetCDF files
+import json #pre-encoded response bodies
+from concurrent.futures import ThreadPoolExecutor, wait #batch endpoint fan out
+import numpy as np #good record selection
 import pandas as pd #data manipulation/analysis (needed for datetime conversion format)
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, Response
+from werkzeug.http import generate_etag #ETag per encoded body
+from analysis.buoy_fetcher import buoy_cache, valid_buoy_id #cached, incremental CDIP fetcher
+from analysis.spectrum_loader import spectrum_loader, encode_spectrum #lazy chunked spectra
+from config import Config #batch limits
+from log_utils import get_logger #history refresh failures
+
+logger = get_logger('surf_data')
 
 surf_data_bp = Blueprint('surf_data', __name__)
 
+#buoy_id -> (cached records the body was built from, encoded JSON bytes or None, ETag)
+_encoded = {}
+#bounds concurrent THREDDS fetches from batch requests
+_batch_pool = ThreadPoolExecutor(max_workers=Config.BUOY_BATCH_WORKERS, thread_name_prefix='buoy-batch')
+
+
+def _invalid_buoy_id(*buoy_ids):
+    """
+    checks query string buoy ids before they reach the url template, caches or the wave store
+    returns 400 response for the first id that isn't a CDIP station id, None if all are valid
+    """
+    for buoy_id in buoy_ids:
+        if not valid_buoy_id(buoy_id):
+            return jsonify({'error': 'Invalid buoy_id, CDIP station ids are 3 digits like 273'}), 400
+    return None
+
+
+def build_surf_payload(records):
+    """
+    builds the /api/surfdata JSON body from cached buoy records
+    records -> dict of numpy arrays from the buoy cache
+    every step is vectorized, no per record python work
+    returns bytes, or None if no record is flagged good
+    """
+    #CDIP documentation reccomenndation
+    #keeps only "good" records
+    # 1 - good, 2 - not evaluated, 3 - questionable, 4 - bad
+    good = np.flatnonzero(records['waveFlagPrimary'] == 1)[:10]
+    if good.size == 0:
+        return None
+
+    return json.dumps(_wave_payload(records, good), separators=(',', ':')).encode()
+
+
+def encoded_surf_data(buoy_id):
+    """
+    latest records of a buoy as pre-encoded JSON
+    the body is built once per cache refresh, repeat calls reuse the bytes
+    returns (bytes or None if no good records, ETag)
+    raises whatever the buoy cache raises if the buoy can't be fetched
+    """
+    records = buoy_cache.get(buoy_id)
+    encoded = _encoded.get(buoy_id)
+    if encoded is None or encoded[0] is not records:
+        body = build_surf_payload(records)
+        encoded = (records, body, body and generate_etag(body))
+        _encoded[buoy_id] = encoded
+    return encoded[1], encoded[2]
+
+
+def _wave_payload(records, rows=slice(None)):
+    """
+    returns dict with readable times + the six wave parameters for the selected rows
+    """
+    #numpy.datetime64 to readable, formats as 'YYYY-MM-DD HH:MM AM' in one call
+    readable_time = pd.to_datetime(records['waveTime'][rows]).strftime('%Y-%m-%d %I:%M %p').tolist()
+
+    #wave height significant, peak/avg/mean zero-upcrossing period,
+    #peak wave direction, peak wave power spectral density
+    payload = {'time': readable_time}
+    for name in ('waveHs', 'waveTp', 'waveDp', 'waveTa', 'waveTz', 'wavePeakPSD'):
+        payload[name] = records[name][rows].tolist()
+    return payload
+
+
+def _parse_time(value):
+    """
+    returns datetime64[ns] for an ISO date/time query param, None if missing
+    raises ValueError for unparseable values
+    """
+    if not value:
+        return None
+    return np.datetime64(pd.Timestamp(value).tz_localize(None), 'ns')
+
+
+def get_surf_data_range(buoy_id):
+    """
+    serves start/end/resolution queries from the on disk wave store
+    returns flask response
+    """
+    if buoy_cache.store is None:
+        return jsonify({'error': 'Wave History Disabled'}), 400
+    try:
+        start = _parse_time(request.args.get('start'))
+        end = _parse_time(request.args.get('end'))
+    except ValueError:
+        return jsonify({'error': 'Invalid start/end, use ISO dates like 2024-01-31 or 2024-01-31T06:00'}), 400
+
+    try:
+        #keeps the buoy's history current (and warm) even if only ranges are requested
+        buoy_cache.get(buoy_id)
+    except Exception as e:
+        logger.warning("buoy=%s refresh before history query failed: %s", buoy_id, e)
+
+    try:
+        resolution, records = buoy_cache.store.query(buoy_id, start, end, request.args.get('resolution'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not len(records['waveTime']):
+        return jsonify({'error': 'No Valid Wave Data Found'}), 404
+
+    payload = _wave_payload(records)
+    #resampled buckets can be all NaN, NaN isn't valid JSON
+    for name, values in payload.items():
+        if name != 'time':
+            payload[name] = [None if v != v else v for v in values]
+    payload['resolution'] = resolution
+    return Response(json.dumps(payload, separators=(',', ':')), mimetype='application/json')
+
+
 @surf_data_bp.route('/api/surfdata')
 
 def get_surf_data():
     """
     api endpoint to retrieve wave data from CDIP buoys
     accepts buoy_id param for query
-    connects to CDIP THREDDS server to access NetCDF
+    gets the latest CDIP THREDDS NetCDF records through the buoy cache
     fileters for 'good' data points
     extracts paramters wanted
     formats timestamps for frontend display
+    the encoded body and its ETag are reused until the buoy's records change
+    optional start/end (ISO dates) and resolution ('raw', '1h', '3h', '6h', '1d')
+    serve any range from the on disk wave history instead of the latest 10 records
 
     returns JSON data for frontend retreival
     returns wave height, peak wave peirod, wave direction, average wave period
@@ -21,65 +143,103 @@ def get_surf_data():
     """
     #gets buoy_id from query parameters, default - 237
     buoy_id = request.args.get('buoy_id', '273')
+    error = _invalid_buoy_id(buoy_id)
+    if error:
+        return error
+    #any range param switches to the on disk history
+    if any(request.args.get(param) for param in ('start', 'end', 'resolution')):
+        return get_surf_data_range(buoy_id)
     
     try:    
-        #url for cdip real-time data
-        #gives oPeNDAP access to netcdf files
-        url = f'https://thredds.cdip.ucsd.edu/thredds/dodsC/cdip/realtime/{buoy_id}p1_rt.nc'
-
-        #opens dataset remotely vis opendap
-        #xarray handles network connection, data parsing
-        ds = xr.open_dataset(url)
-
-        ds = ds.isel(waveTime=slice(-30, None))
-
-        #CDIP documentation reccomenndation
-        #keeps only "good" records
-        # 1 - good, 2 - not evaluated, 3 - questionable, 4 - bad
-        good = ds['waveFlagPrimary'] == 1
-        #removes flagged data and checks
-        ds = ds.where(good, drop=True)
-        if ds.waveTime.size == 0:
+        #latest records for the buoy
+        #served from the per buoy cache, only refreshed (incrementally) once the ttl runs out
+        #JSON body is built once per cache refresh, repeat polls reuse the bytes
+        body, etag = encoded_surf_data(buoy_id)
+        if body is None:
             return jsonify({'error': 'No Valid Wave Data Found'}), 404
-        
-        #timestamps
-        times = ds['waveTime'].values[:10]
-        # wave height significant (waveHs),
-        wave_height_significant = ds['waveHs'].values[:10]
-        # peak wave period (waveTp),
-        wave_tp = ds['waveTp'].values[:10]
-        # peak wave direction (waveDp)
-        wave_dp = ds['waveDp'].values[:10]
-        # avg wave period (waveTa),
-        wave_ta = ds['waveTa'].values[:10]
-        # mean zero-upcrossing period (waveTz),
-        wave_tz = ds['waveTz'].values[:10]
-        # peak wave power spectral density (wavePeakPSD)
-        wave_psd = ds['wavePeakPSD'].values[:10]
-
-        #numpy.datetime64 to readable
-        readable_time = []
-        for t in times:
-            #converts to pandas.Timestamp
-            timestamp = pd.to_datetime(t)
-            #formats as 'YYY-MM-DD HH:MM'
-            formatted = timestamp.strftime('%Y-%m-%d %I:%M %p')
-            #appends to list
-            readable_time.append(formatted)
-
-        #returns structured JSON
-        #numpy arrays converted to lists
-        return jsonify({
-
-            'time': readable_time,
-            "waveHs": wave_height_significant.tolist(),
-            "waveTp": wave_tp.tolist(),
-            "waveDp": wave_dp.tolist(),
-            "waveTa": wave_ta.tolist(),
-            "waveTz": wave_tz.tolist(),
-            "wavePeakPSD": wave_psd.tolist()
-
-        })
+
+        response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        #304 with no body when the client already has this refresh
+        return response.make_conditional(request)
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+@surf_data_bp.route('/api/surfdata/batch')
+def get_surf_data_batch():
+    """
+    api endpoint for many buoys in one request
+    buoy_ids -> comma separated CDIP buoy ids
+    buoys are fetched concurrently on a bounded pool, a failing buoy only fills its errors entry
+    returns JSON {'buoys': {buoy_id: same body as /api/surfdata}, 'errors': {buoy_id: message}}
+    """
+    buoy_ids = list(dict.fromkeys(b.strip() for b in request.args.get('buoy_ids', '').split(',') if b.strip()))
+    if not buoy_ids:
+        return jsonify({'error': 'No Buoys Selected'}), 400
+    if len(buoy_ids) > Config.BUOY_BATCH_MAX:
+        return jsonify({'error': f'At most {Config.BUOY_BATCH_MAX} buoys per request'}), 400
+    error = _invalid_buoy_id(*buoy_ids)
+    if error:
+        return error
+
+    futures = {buoy_id: _batch_pool.submit(encoded_surf_data, buoy_id) for buoy_id in buoy_ids}
+    wait(futures.values(), timeout=Config.BUOY_BATCH_TIMEOUT)
+
+    bodies, errors = [], {}
+    for buoy_id, future in futures.items():
+        if not future.done():
+            errors[buoy_id] = 'Timed Out'
+        elif future.exception() is not None:
+            errors[buoy_id] = str(future.exception())
+        elif future.result()[0] is None:
+            errors[buoy_id] = 'No Valid Wave Data Found'
+        else:
+            #per buoy bodies are already encoded, they are spliced in as bytes
+            bodies.append(json.dumps(buoy_id).encode() + b':' + future.result()[0])
+
+    body = b'{"buoys":{' + b','.join(bodies) + b'},"errors":' + json.dumps(errors).encode() + b'}'
+    return Response(body, mimetype='application/json')
+
+@surf_data_bp.route('/api/surfdata/status')
+def get_surf_data_status():
+    """
+    api endpoint for buoy cache health
+    returns JSON with cache counters and per buoy refresh age, fetch latency and last error
+    """
+    return jsonify(dict(buoy_cache.stats(), spectrum_cache=spectrum_loader.lru.stats()))
+
+@surf_data_bp.route('/api/surfdata/spectrum')
+def get_surf_data_spectrum():
+    """
+    api endpoint for spectral wave data of a buoy
+    buoy_id -> CDIP buoy, default 273
+    variable -> spectral variable, default waveEnergyDensity
+    start/end -> optional ISO date/time window, default the latest 48 records
+    only the waveTime chunks covering the window are read, decoded chunks are cached
+    returns binary float32 body (layout in spectrum_loader.encode_spectrum)
+    """
+    buoy_id = request.args.get('buoy_id', '273')
+    error = _invalid_buoy_id(buoy_id)
+    if error:
+        return error
+    variable = request.args.get('variable', 'waveEnergyDensity')
+    try:
+        start = _parse_time(request.args.get('start'))
+        end = _parse_time(request.args.get('end'))
+    except ValueError:
+        return jsonify({'error': 'Invalid start/end, use ISO dates like 2024-01-31 or 2024-01-31T06:00'}), 400
+
+    try:
+        times, frequencies, values = spectrum_loader.window(buoy_id, variable, start, end)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    if not len(times):
+        return jsonify({'error': 'No Spectral Data Found'}), 404
+
+    response = Response(encode_spectrum(times, frequencies, values), mimetype='application/octet-stream')
+    response.headers['X-Spectrum-Shape'] = f'{len(times)},{len(frequencies)}'
+    response.headers['X-Spectrum-Variable'] = variable
+    return response
\ No newline at end of file
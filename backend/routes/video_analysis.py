@@ -1,16 +1,48 @@
-import urllib.request #for http request to proxy mjpeg vid streams
-                        #for backend to fetch from local ffmpeg streams
-                        #serves to frontend w/o direct access
 import traceback
 from flask import Blueprint, jsonify, request, Response
 from analysis.live_stream_analyzer import LiveStreamAnalyzer
+from analysis.mjpeg_broadcaster import MULTIPART_BOUNDARY
+from analysis.batch_scheduler import BatchInferenceScheduler
+from analysis.count_history import count_histories
+from analysis.result_events import result_events
+from analysis.results_store import results_store
+from analysis.pipeline_manager import PipelineManager, PipelineLimitError
+from analysis.supervisor import PipelineSupervisor
+from analysis.model_registry import model_registry
 from webcam_configs import WEBCAM_CONFIGS
 
 video_analysis_bp = Blueprint('video_analysis', __name__)
 
 #global dicts data between http requests
-analysis_results = {} #latest detection results
+analysis_results = results_store #latest detection results, copy-on-write, lock free reads
 active_pipelines = {} #maintains references to active LiveStreamAnalyzer instances
+#one batched inference call per detector per tick for batched webcams
+#(Config.INFERENCE_MODE == 'batched' or a 'detector' in the webcam's config)
+batch_scheduler = BatchInferenceScheduler(lambda: active_pipelines)
+#one thread health checks every webcam, restarts dead ffmpeg/inference with backoff
+pipeline_supervisor = PipelineSupervisor(lambda: active_pipelines)
+
+
+def start_pipeline(webcam_id):
+    """
+    creates and starts the analyzer for a webcam
+    returns LiveStreamAnalyzer
+    """
+    config = WEBCAM_CONFIGS[webcam_id]
+    analyzer = LiveStreamAnalyzer(
+        webcam_id,
+        config['hls_url'],
+        motion_threshold=config.get('motion_threshold'),
+        detector=config.get('detector')
+    )
+    analyzer.start_analysis()
+    pipeline_supervisor.start()
+    if analyzer.inference_mode == 'batched':
+        batch_scheduler.start()
+    return analyzer
+
+#starts pipelines on demand, keeps the warm set running, evicts idle ones
+pipeline_manager = PipelineManager(active_pipelines, start_pipeline)
 
 @video_analysis_bp.route('/api/video-analysis')
 def get_video_analysis():
@@ -31,34 +63,38 @@ def get_video_analysis():
         if webcam_id not in WEBCAM_CONFIGS: #will upgrade later
             return jsonify({'error': 'Webcam Not Available'}), 404
         
-        #analysis starts IF not running already
-        if webcam_id not in active_pipelines:
-            config = WEBCAM_CONFIGS[webcam_id]
-            analyzer = LiveStreamAnalyzer(webcam_id, config['hls_url'])
-            active_pipelines[webcam_id] = analyzer
-            analyzer.start_analysis()
-
+        #analysis starts IF not running already, every poll keeps it from idling out
+        try:
+            _, started = pipeline_manager.acquire(webcam_id)
+        except PipelineLimitError as e:
+            return jsonify({'error': f'Too Many Active Webcams ({e})'}), 503
+        if started:
             #returns intial status
             return jsonify({
                 'webcam_id': webcam_id,
-                'location_name': config['name'],
+                'location_name': WEBCAM_CONFIGS[webcam_id]['name'],
                 'surfer_count': 0,
                 'status': 'Starting',
                 'message': 'Analysis Starting, Please Wait...'
             })
         
         #gets latest analysis results
-        if webcam_id in analysis_results:
-            result = analysis_results[webcam_id]
+        #one snapshot read, a concurrent stop can't remove it between check and use
+        result = analysis_results.get(webcam_id)
+        if result is not None:
             config = WEBCAM_CONFIGS[webcam_id]
 
-            return jsonify({
+            response = {
                 'webcam_id': webcam_id,
                 'location_name': config['name'],
                 'surfer_count': result['surfer_count'],
                 'status': result['status'],
                 'last_update': result['last_update']
-            })
+            }
+            #optional boxes/confidences/classes of the last inferred frame
+            if request.args.get('detections') and result.get('detections') is not None:
+                response['detections'] = result['detections'].to_dict()
+            return jsonify(response)
         else:
             return jsonify({
                 'webcam_id': webcam_id,
@@ -83,18 +119,127 @@ def stop_analysis(webcam_id):
     """
 
     #checks if active pipeline exists
-    if webcam_id in active_pipelines:
-        active_pipelines[webcam_id].stop_analysis()
-        del active_pipelines[webcam_id]
-        if webcam_id in analysis_results:
-            del analysis_results[webcam_id]
+    if pipeline_manager.stop(webcam_id):
         return jsonify({'message': f'Analysis Stopped for {webcam_id}'})
     return jsonify({'error': 'No Active Analysis Found'}), 404
 
+@video_analysis_bp.route('/api/video-analysis/stats')
+def get_analysis_stats():
+    """
+    api endpoint for per webcam analysis stats (motion gate counters, etc)
+    optional webcam_id param limits the response to one webcam
+    returns JSON keyed by webcam_id
+    """
+    webcam_id = request.args.get('webcam_id')
+    if webcam_id:
+        if webcam_id not in active_pipelines:
+            return jsonify({'error': 'No Active Analysis Found'}), 404
+        return jsonify({webcam_id: active_pipelines[webcam_id].stats()})
+    return jsonify({wid: analyzer.stats() for wid, analyzer in list(active_pipelines.items())})
+
+@video_analysis_bp.route('/api/video-analysis/pipelines')
+def get_pipeline_stats():
+    """
+    api endpoint for pipeline lifecycle stats
+    returns JSON with started/evicted/rejected counts, startup latency and per webcam idle time
+    """
+    return jsonify(pipeline_manager.stats())
+
+@video_analysis_bp.route('/api/video-analysis/supervisor')
+def get_supervisor_stats():
+    """
+    api endpoint for pipeline supervisor stats
+    returns JSON with restart/crash loop counts and per webcam backoff state
+    """
+    return jsonify(pipeline_supervisor.stats())
+
+@video_analysis_bp.route('/api/video-analysis/models')
+def get_model_stats():
+    """
+    api endpoint for the shared model registry
+    returns JSON with each loaded model's webcam references, load time and resident memory
+    """
+    return jsonify(model_registry.stats())
+
+@video_analysis_bp.route('/api/video-analysis/scheduler')
+def get_scheduler_stats():
+    """
+    api endpoint for batched inference scheduler stats
+    returns JSON with batch size, queue wait and per batch latency
+    """
+    return jsonify(batch_scheduler.stats())
+
+@video_analysis_bp.route('/api/video-analysis/history')
+def get_analysis_history():
+    """
+    api endpoint for a webcam's surfer count history
+    webcam_id -> webcam to chart
+    start/end -> optional unix seconds, defaults to the last hour
+    resolution -> optional 'raw', '1m' or '15m', finest covering resolution if omitted
+    returns JSON with timestamps, avg and max counts
+    """
+    webcam_id = request.args.get('webcam_id')
+    if not webcam_id:
+        return jsonify({'error': 'No Webcam Selected'}), 400
+    history = count_histories.find(webcam_id)
+    if history is None:
+        return jsonify({'error': 'No History Found'}), 404
+    try:
+        start = request.args.get('start', type=float)
+        end = request.args.get('end', type=float)
+        return jsonify(history.window(start, end, request.args.get('resolution')))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@video_analysis_bp.route('/api/video-analysis/changes')
+def get_analysis_changes():
+    """
+    api endpoint for results that changed since a store version
+    since -> store version from the previous response, 0 (default) for every webcam
+    returns JSON with the current version, changed results by webcam_id and removed webcam_ids
+    """
+    since = request.args.get('since', default=0, type=int)
+    version, changed, removed = analysis_results.changed_since(since)
+    return jsonify({
+        'version': version,
+        'results': {
+            webcam_id: {
+                'surfer_count': result['surfer_count'],
+                'status': result['status'],
+                'last_update': result['last_update'],
+            }
+            for webcam_id, result in changed.items()
+        },
+        'removed': removed,
+    })
+
+@video_analysis_bp.route('/api/video-analysis/events')
+def get_analysis_events():
+    """
+    server-sent events stream of a webcam's surfer count
+    webcam_id -> webcam to follow
+    an event is pushed only when the count or status changes, bursts collapse into one event
+    clients call /api/video-analysis once first, it starts the analysis and has location_name
+    returns text/event-stream of {'webcam_id', 'surfer_count', 'status', 'last_update'} events
+    """
+    webcam_id = request.args.get('webcam_id')
+    if not webcam_id:
+        return jsonify({'error': 'No Webcam Selected'}), 400
+    if webcam_id not in WEBCAM_CONFIGS:
+        return jsonify({'error': 'Webcam Not Available'}), 404
+    #EventSource sends the last id it saw when it reconnects
+    last_event_id = request.headers.get('Last-Event-ID', default=0, type=int)
+    return Response(
+        result_events.channel(webcam_id).stream(last_event_id),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @video_analysis_bp.route('/video_feed/<webcam_id>')
 def video_feed(webcam_id):
     """
     vid streaming enpoint that proxies mjpeg streams to frontend
+    every viewer shares the analyzer's frame bus, ffmpeg is never re-contacted
     webcam_id -> URL paramrter for specific webcam
     returns streaming response with mjpeg vid data
     returns error for inactive webcams, stream failures
@@ -105,10 +250,12 @@ def video_feed(webcam_id):
         return "Webcam not active", 404
     
     try:
-        #simple proxy to the MJPEG stream
-        stream_url = active_pipelines[webcam_id].stream_url
-        resp = urllib.request.urlopen(stream_url)
-        return Response(resp.read(), mimetype='multipart/x-mixed-replace; boundary=frame')
+        #streams frames from the shared frame bus, never buffers the whole stream
+        broadcaster = active_pipelines[webcam_id].frame_bus.broadcaster
+        return Response(
+            broadcaster.stream(),
+            mimetype=f'multipart/x-mixed-replace; boundary={MULTIPART_BOUNDARY}'
+        )
     
     except Exception as e:
         print(f"Video feed error: {e}")
@@ -1,4 +1,8 @@
 #webcam configurations
+#optional per webcam keys:
+#'motion_threshold' -> motion gate threshold (mean gray level change), see Config.MOTION_GATE_THRESHOLD
+#'detector' -> local detector backend ('onnx', 'roboflow' or 'fake', see analysis/roboflow_utils.py),
+#the webcam is inferred in process by the batch scheduler instead of its own InferencePipeline
 WEBCAM_CONFIGS = {
     'Windansea': {
         'name': 'Windansea - La Jolla',
@@ -1,12 +1,32 @@
 import { useState, useEffect } from 'react';
 
 //custom hook for fetching video analysis data from webcams
+//one fetch starts the analysis, then count changes are pushed over server-sent events
+//falls back to polling every 5 seconds if EventSource is missing or the stream is closed for good
 export const useVideoData = (selectedWebcam) => {
   //webcam specific state
   const [videoData, setVideoData] = useState(null);
   const [webcamError, setWebcamError] = useState(null);
   const [analysisStatus, setAnalysisStatus] = useState('');
 
+  //maps backend status to the status message shown
+  const updateStatus = (status) => {
+    setAnalysisStatus(status);
+
+    //show status messages
+    if (status === 'starting') {
+      setAnalysisStatus('Starting Analysis...');
+    } else if (status === 'initializing') {
+      setAnalysisStatus('Initializing Analysis...');
+    } else if (status === 'online') {
+      setAnalysisStatus('Live');
+    } else if (status === 'error') {
+      setAnalysisStatus('Analysis Error');
+    } else if (status === 'crash_loop') {
+      setAnalysisStatus('Stream Unavailable, Retrying...');
+    }
+  };
+
   const fetchVideoData = (webcamId) => {
     if (!webcamId) {
       //no webcam selected, clear data
@@ -15,7 +35,7 @@ export const useVideoData = (selectedWebcam) => {
       setAnalysisStatus('');
       return;
     }
-    
+
     fetch(`http://localhost:5000/api/video-analysis?webcam_id=${webcamId}`)
       .then((res) => res.json())
       .then((json) => {
@@ -26,18 +46,7 @@ export const useVideoData = (selectedWebcam) => {
         } else {
           setVideoData(json);
           setWebcamError(null);
-          setAnalysisStatus(json.status);
-
-          //show status messages
-          if (json.status === 'starting') {
-            setAnalysisStatus('Starting Analysis...');
-          } else if (json.status === 'initializing') {
-            setAnalysisStatus('Initializing Analysis...');
-          } else if (json.status === 'online') {
-            setAnalysisStatus('Live'); 
-          } else if (json.status === 'error') {
-            setAnalysisStatus('Analysis Error');
-          }
+          updateStatus(json.status);
         }
       })
       .catch((err) => {
@@ -51,17 +60,52 @@ export const useVideoData = (selectedWebcam) => {
   useEffect(() => {
     //initial data fetch
     fetchVideoData(selectedWebcam);
+    if (!selectedWebcam) {
+      return undefined;
+    }
 
-    const videoInterval = setInterval(() => {
-      if (selectedWebcam) {
-        fetchVideoData(selectedWebcam);
+    let videoInterval = null;
+    let events = null;
+
+    const startPolling = () => {
+      if (videoInterval) {
+        return;
       }
-    }, 5000); // 5 seconds
-    
+      videoInterval = setInterval(() => {
+        fetchVideoData(selectedWebcam);
+      }, 5000); // 5 seconds
+    };
+
+    if (window.EventSource) {
+      events = new EventSource(`http://localhost:5000/api/video-analysis/events?webcam_id=${selectedWebcam}`);
+      //pushed only when the count or status changes
+      events.addEventListener('result', (event) => {
+        const update = JSON.parse(event.data);
+        //keeps location_name etc from the initial fetch
+        setVideoData((previous) => ({ ...previous, ...update }));
+        setWebcamError(null);
+        updateStatus(update.status);
+      });
+      events.onerror = () => {
+        //dropped connections are retried by the browser (server sends retry: 3000 and
+        //resumes from Last-Event-ID), only a stream the browser gave up on falls back to polling
+        if (events.readyState !== EventSource.CLOSED) {
+          return;
+        }
+        console.error('Webcam Event Stream Closed, falling back to polling');
+        startPolling();
+      };
+    } else {
+      startPolling();
+    }
+
     return () => {
+      if (events) {
+        events.close();
+      }
       clearInterval(videoInterval);
     };
   }, [selectedWebcam]); // rerun when selection changes
 
   return { videoData, webcamError, analysisStatus, fetchVideoData };
-};
\ No newline at end of file
+};
@@ -0,0 +1,138 @@
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+#adds backend directory to the Python path so we can import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from analysis.buoy_fetcher import open_wave_dataset, load_wave_records
+
+#bytes read and time for one buoy refresh against a local NetCDF stand-in for THREDDS
+#the file mimics a CDIP realtime file: wave records plus spectra and other sensors on their own time axes
+#legacy -> xr.open_dataset + isel(-30) + where(good, drop=True) on the whole dataset
+#lean -> open_wave_dataset + load_wave_records (8 variables, tail only)
+#python benchmark_buoy_loader.py --records 20000 --frequencies 64
+
+
+class CountingFile(io.RawIOBase):
+    """
+    read only file wrapper that counts bytes read, stands in for OPeNDAP transfer
+    """
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        return self.file.seek(offset, whence)
+
+    def tell(self):
+        return self.file.tell()
+
+    def readinto(self, buffer):
+        n = self.file.readinto(buffer)
+        self.bytes_read += n or 0
+        return n
+
+    def close(self):
+        self.file.close()
+        super().close()
+
+
+def make_cdip_file(path, records, frequencies):
+    """
+    writes a CDIP realtime shaped NetCDF4 file
+    """
+    rng = np.random.default_rng(0)
+    times = pd.date_range('2023-01-01', periods=records, freq='30min').values
+    wave = {name: ('waveTime', rng.random(records).astype(np.float32)) for name in ('waveHs', 'waveTp', 'waveDp', 'waveTa', 'waveTz', 'wavePeakPSD')}
+    wave['waveFlagPrimary'] = ('waveTime', np.where(rng.random(records) < 0.9, 1, 2).astype(np.int8))
+    spectra = {
+        name: (('waveTime', 'waveFrequency'), rng.random((records, frequencies)).astype(np.float32))
+        for name in ('waveEnergyDensity', 'waveMeanDirection', 'waveA1Value', 'waveB1Value', 'waveA2Value', 'waveB2Value')
+    }
+    sensors = {
+        'sstSeaSurfaceTemperature': ('sstTime', rng.random(records * 3).astype(np.float32)),
+        'gpsLatitude': ('gpsTime', rng.random(records).astype(np.float32)),
+        'gpsLongitude': ('gpsTime', rng.random(records).astype(np.float32)),
+    }
+    ds = xr.Dataset(
+        wave | spectra | sensors,
+        coords={
+            'waveTime': times,
+            'waveFrequency': np.linspace(0.025, 0.58, frequencies).astype(np.float32),
+            'sstTime': pd.date_range('2023-01-01', periods=records * 3, freq='10min').values,
+            'gpsTime': times,
+        }
+    )
+    ds.to_netcdf(path, engine='h5netcdf')
+
+
+def legacy_load(source):
+    """
+    get_surf_data's original dataset handling, kept here as the baseline
+    """
+    ds = xr.open_dataset(source, engine='h5netcdf')
+    ds = ds.isel(waveTime=slice(-30, None))
+    ds = ds.where(ds['waveFlagPrimary'] == 1, drop=True)
+    return {name: ds[name].values for name in ('waveTime', 'waveHs', 'waveTp', 'waveDp', 'waveTa', 'waveTz', 'wavePeakPSD')}
+
+
+def lean_load(source):
+    """
+    buoy cache refresh path
+    """
+    ds = open_wave_dataset(source, engine='h5netcdf')
+    records = load_wave_records(ds, 30)
+    good = records['waveFlagPrimary'] == 1
+    return {name: values[good] for name, values in records.items()}
+
+
+def measure(loader, path, repeat):
+    """
+    returns (bytes read, best seconds) for one loader
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        source = CountingFile(path)
+        started = time.perf_counter()
+        loader(source)
+        best = min(best, time.perf_counter() - started)
+        source.close()
+    return source.bytes_read, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='buoy refresh bytes/time benchmark')
+    parser.add_argument('--records', type=int, default=20000, help='waveTime length of the file')
+    parser.add_argument('--frequencies', type=int, default=64, help='spectral bins per record')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, '273p1_rt.nc')
+        make_cdip_file(path, args.records, args.frequencies)
+        print(f"file size: {os.path.getsize(path) / 1e6:.1f} MB")
+
+        legacy_bytes, legacy_s = measure(legacy_load, path, args.repeat)
+        lean_bytes, lean_s = measure(lean_load, path, args.repeat)
+
+    print(f"{'loader':<8}{'bytes read':>14}{'ms':>10}")
+    print(f"{'legacy':<8}{legacy_bytes:>14,}{legacy_s * 1000:>10.1f}")
+    print(f"{'lean':<8}{lean_bytes:>14,}{lean_s * 1000:>10.1f}")
+    print(f"bytes: {legacy_bytes / max(lean_bytes, 1):.1f}x less, time: {legacy_s / lean_s:.1f}x faster")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+#adds backend directory to the Python path so we can import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from analysis.frame_bus import FrameBus
+
+#compares mjpeg vs rawvideo ffmpeg ingest into the frame bus
+#measures ffmpeg (child) cpu, python reader cpu, frames/sec and frame handoff latency
+#python benchmark_ingest.py --clip surf.mp4 --fps 2 --seconds 30
+
+
+def make_test_clip(path, seconds, resolution):
+    """
+    generates a synthetic test clip with ffmpeg's testsrc
+    """
+    subprocess.run([
+        'ffmpeg', '-loglevel', 'error', '-y',
+        '-f', 'lavfi', '-i', f'testsrc=duration={seconds}:size={resolution}:rate=30',
+        '-pix_fmt', 'yuv420p', path
+    ], check=True)
+
+
+def ffmpeg_command(clip, mode, fps, resolution, quality):
+    """
+    mirrors LiveStreamAnalyzer.start_ffmpeg_conversion, minus -re so the clip runs flat out
+    """
+    command = ['ffmpeg', '-loglevel', 'error', '-i', clip, '-r', str(fps), '-s', resolution]
+    if mode == 'rawvideo':
+        command += ['-f', 'rawvideo', '-pix_fmt', 'bgr24']
+    else:
+        command += ['-f', 'mjpeg', '-q:v', str(quality)]
+    return command + ['pipe:1']
+
+
+def run_mode(clip, mode, fps, resolution, quality):
+    """
+    runs one ingest mode to the end of the clip
+    returns dict of measurements
+    """
+    bus = FrameBus('benchmark', ingest_mode=mode, resolution=resolution)
+    latencies = []
+
+    def consumer():
+        #stands in for InferencePipeline, takes every new frame off the bus
+        last_id = 0
+        while True:
+            frame = bus.wait_for_frame(last_id, timeout=5)
+            if frame is None:
+                return
+            latencies.append(time.monotonic() - frame.timestamp)
+            last_id = frame.frame_id
+
+    children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    wall_start = time.perf_counter()
+
+    process = subprocess.Popen(
+        ffmpeg_command(clip, mode, fps, resolution, quality),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL
+    )
+    reader_cpu_start = time.process_time()
+    bus.attach(process.stdout)
+    consumer_thread = threading.Thread(target=consumer, daemon=True)
+    consumer_thread.start()
+    bus.reader_thread.join()
+    reader_cpu = time.process_time() - reader_cpu_start
+    process.wait()
+    bus.stop()
+    consumer_thread.join()
+
+    wall = time.perf_counter() - wall_start
+    children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    ffmpeg_cpu = (children_after.ru_utime - children_before.ru_utime) + \
+                 (children_after.ru_stime - children_before.ru_stime)
+
+    latencies.sort()
+    frames = bus.frame_count
+    return {
+        'mode': mode,
+        'frames': frames,
+        'wall_s': wall,
+        'fps': frames / wall if wall else 0.0,
+        'ffmpeg_cpu_ms_per_frame': 1000 * ffmpeg_cpu / max(frames, 1),
+        'python_cpu_ms_per_frame': 1000 * reader_cpu / max(frames, 1),
+        'handoff_p50_us': 1e6 * latencies[len(latencies) // 2] if latencies else 0.0,
+        'handoff_p99_us': 1e6 * latencies[int(len(latencies) * 0.99)] if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='mjpeg vs rawvideo ingest benchmark')
+    parser.add_argument('--clip', help='local test clip, generated with testsrc if omitted')
+    parser.add_argument('--seconds', type=int, default=20, help='length of generated clip')
+    parser.add_argument('--fps', type=float, default=10, help='ffmpeg output frame rate')
+    parser.add_argument('--resolution', default='1280x720')
+    parser.add_argument('--quality', type=int, default=2, help='mjpeg -q:v')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        clip = args.clip
+        if not clip:
+            clip = os.path.join(tmp, 'testsrc.mp4')
+            make_test_clip(clip, args.seconds, args.resolution)
+
+        print(f"{'mode':<10}{'frames':>8}{'fps':>9}{'ffmpeg ms/f':>13}{'python ms/f':>13}{'p50 us':>9}{'p99 us':>9}")
+        for mode in ('mjpeg', 'rawvideo'):
+            r = run_mode(clip, mode, args.fps, args.resolution, args.quality)
+            print(f"{r['mode']:<10}{r['frames']:>8}{r['fps']:>9.1f}"
+                  f"{r['ffmpeg_cpu_ms_per_frame']:>13.2f}{r['python_cpu_ms_per_frame']:>13.2f}"
+                  f"{r['handoff_p50_us']:>9.0f}{r['handoff_p99_us']:>9.0f}")
+
+
+if __name__ == '__main__':
+    main()
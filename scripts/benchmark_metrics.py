@@ -0,0 +1,50 @@
+import argparse
+import os
+import sys
+import time
+import timeit
+
+#adds backend directory to the Python path so we can import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from analysis.stage_metrics import PipelineMetrics
+
+#per frame cost of the stage instrumentation behind /metrics
+#bus side -> frame interval + decode observations, for every frame out of ffmpeg
+#inference side -> handoff on admit, sink/publish/inference/end to end on the result
+#python benchmark_metrics.py --number 200000
+
+
+def bus_side(metrics, previous, now):
+    metrics.observe('frame_interval', now - previous)
+    metrics.observe('decode', time.monotonic() - now)
+
+
+def inference_side(metrics, bus_timestamp):
+    metrics.admitted(bus_timestamp)
+    sink_start = time.monotonic()
+    sink_done = time.monotonic()
+    metrics.inferred(sink_start, sink_done, time.monotonic())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='stage instrumentation overhead')
+    parser.add_argument('--number', type=int, default=200000, help='frames per measurement')
+    args = parser.parse_args()
+
+    metrics = PipelineMetrics('benchmark')
+    now = time.monotonic()
+    rows = [
+        ('bus frame', lambda: bus_side(metrics, now - 0.2, now)),
+        ('inferred frame', lambda: inference_side(metrics, now)),
+        ('empty call', lambda: None),
+    ]
+
+    print(f"{'path':<16}{'us/frame':>10}")
+    for name, call in rows:
+        best = min(timeit.repeat(call, number=args.number, repeat=5))
+        print(f"{name:<16}{best / args.number * 1e6:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+import argparse
+import os
+import sys
+import timeit
+import numpy as np
+import pandas as pd
+from flask import jsonify
+
+#adds backend directory to the Python path so we can import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from app import create_app
+from analysis.buoy_fetcher import buoy_cache
+from routes.surf_data import build_surf_payload
+
+#per request cost of /api/surfdata on a synthetic buoy, no network
+#legacy -> per timestamp pd.to_datetime().strftime loop + six .tolist() + jsonify every request
+#vectorized -> one strftime call over the datetime64 array, json encoded once
+#legacy/cached request -> full Flask test client request, old route body vs pre-encoded bytes
+#python benchmark_surfdata.py --records 30 --number 2000
+
+
+def make_records(n):
+    """
+    builds cached buoy records shaped like the CDIP realtime variables
+    returns dict of numpy arrays
+    """
+    rng = np.random.default_rng(0)
+    records = {
+        'waveTime': pd.date_range('2024-01-01', periods=n, freq='30min').values,
+        'waveFlagPrimary': np.where(rng.random(n) < 0.9, 1, 2).astype(np.int8),
+    }
+    for name in ('waveHs', 'waveTp', 'waveDp', 'waveTa', 'waveTz', 'wavePeakPSD'):
+        records[name] = rng.random(n).astype(np.float32) * 10
+    return records
+
+
+def legacy_payload(records):
+    """
+    get_surf_data response building before vectorization, kept here as the baseline
+    """
+    good = records['waveFlagPrimary'] == 1
+    times = records['waveTime'][good][:10]
+    readable_time = []
+    for t in times:
+        timestamp = pd.to_datetime(t)
+        formatted = timestamp.strftime('%Y-%m-%d %I:%M %p')
+        readable_time.append(formatted)
+    return jsonify({
+        'time': readable_time,
+        "waveHs": records['waveHs'][good][:10].tolist(),
+        "waveTp": records['waveTp'][good][:10].tolist(),
+        "waveDp": records['waveDp'][good][:10].tolist(),
+        "waveTa": records['waveTa'][good][:10].tolist(),
+        "waveTz": records['waveTz'][good][:10].tolist(),
+        "wavePeakPSD": records['wavePeakPSD'][good][:10].tolist()
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description='/api/surfdata response building benchmark')
+    parser.add_argument('--records', type=int, default=30, help='cached records per buoy')
+    parser.add_argument('--number', type=int, default=2000, help='calls per measurement')
+    args = parser.parse_args()
+
+    app = create_app()
+    #old route body for a request level baseline
+    app.add_url_rule('/legacy', 'legacy', lambda: legacy_payload(buoy_cache.get('bench')))
+    client = app.test_client()
+    records = make_records(args.records)
+
+    #pre-fills the cache so no request touches THREDDS
+    cached = buoy_cache._records('bench')
+    cached.columns = records
+    cached.fetched_at = float('inf')
+
+    def per_call_us(fn):
+        return min(timeit.repeat(fn, number=args.number, repeat=3)) / args.number * 1e6
+
+    with app.test_request_context():
+        legacy = per_call_us(lambda: legacy_payload(records))
+    vectorized = per_call_us(lambda: build_surf_payload(records))
+    legacy_request = per_call_us(lambda: client.get('/legacy'))
+    request = per_call_us(lambda: client.get('/api/surfdata?buoy_id=bench'))
+    etag = client.get('/api/surfdata?buoy_id=bench').headers['ETag']
+    not_modified = per_call_us(lambda: client.get('/api/surfdata?buoy_id=bench', headers={'If-None-Match': etag}))
+
+    print(f"{'path':<32}{'us/call':>10}")
+    print(f"{'legacy build (loop + jsonify)':<32}{legacy:>10.1f}")
+    print(f"{'vectorized build':<32}{vectorized:>10.1f}")
+    print(f"{'legacy request':<32}{legacy_request:>10.1f}")
+    print(f"{'cached request (200)':<32}{request:>10.1f}")
+    print(f"{'cached request (304)':<32}{not_modified:>10.1f}")
+    print(f"build speedup: {legacy / vectorized:.1f}x, request speedup: {legacy_request / request:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+import numpy as np
+import cv2
+import aiohttp
+
+#adds backend directory to the Python path so we can import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+#concurrent /video_feed viewer capacity, threaded Flask server vs asyncio server
+#each run starts the server in its own process with a fake ffmpeg (a python process writing
+#the same JPEG to stdout at --fps) feeding a real frame bus, then opens N viewers at once
+#and counts the frames each one receives, plus the latency of a JSON poll under that load
+#python load_test_viewers.py --viewers 50,500,2000 --seconds 10
+
+#stands in for ffmpeg -f mjpeg pipe:1
+FAKE_FFMPEG = '''
+import sys, time
+jpeg = open(sys.argv[1], 'rb').read()
+interval = 1 / float(sys.argv[2])
+while True:
+    sys.stdout.buffer.write(jpeg)
+    sys.stdout.buffer.flush()
+    time.sleep(interval)
+'''
+
+MARKER = b'Content-Type: image/jpeg'
+
+
+def serve(mode, port, fps, jpeg_path):
+    """
+    runs one server with a fake webcam 'loadtest' until killed
+    """
+    from analysis.frame_bus import FrameBus
+    from routes.video_analysis import active_pipelines
+    from config import Config
+
+    fake_ffmpeg = subprocess.Popen([sys.executable, '-c', FAKE_FFMPEG, jpeg_path, str(fps)], stdout=subprocess.PIPE)
+    bus = FrameBus('loadtest')
+    bus.attach(fake_ffmpeg.stdout)
+    active_pipelines['loadtest'] = SimpleNamespace(frame_bus=bus)
+
+    try:
+        if mode == 'threaded':
+            from werkzeug.serving import make_server
+            from app import create_app
+            make_server('127.0.0.1', port, create_app(), threaded=True).serve_forever()
+        else:
+            from aiohttp import web
+            from async_app import create_async_app
+            web.run_app(create_async_app(), host='127.0.0.1', port=port, print=None)
+    finally:
+        fake_ffmpeg.kill()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def proc_status(pid):
+    """
+    returns (threads, rss MB) of a process from /proc, (None, None) off Linux
+    """
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            fields = dict(line.split(':', 1) for line in f)
+        return int(fields['Threads']), int(fields['VmRSS'].split()[0]) / 1024
+    except OSError:
+        return None, None
+
+
+async def viewer(session, url, seconds, results):
+    """
+    watches the stream for seconds, appends frames received (-1 if it never connected)
+    """
+    frames, tail = 0, b''
+    try:
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=None, sock_connect=seconds)) as response:
+            if response.status != 200:
+                results.append(-1)
+                return
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                try:
+                    chunk = await asyncio.wait_for(response.content.readany(), deadline - time.monotonic())
+                except asyncio.TimeoutError:
+                    break
+                if not chunk:
+                    break
+                data = tail + chunk
+                frames += data.count(MARKER)
+                tail = data[-len(MARKER) + 1:]
+    except (aiohttp.ClientError, OSError, asyncio.TimeoutError):
+        results.append(-1)
+        return
+    results.append(frames)
+
+
+async def poll_latency(session, base, seconds):
+    """
+    returns list of ms for JSON polls made while the viewers are streaming
+    """
+    latencies = []
+    await asyncio.sleep(seconds / 4)
+    deadline = time.monotonic() + seconds / 2
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            async with session.get(f'{base}/api/video-analysis/scheduler') as response:
+                await response.read()
+            latencies.append((time.perf_counter() - started) * 1000)
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.1)
+    return latencies
+
+
+async def load(base, viewers, seconds, pid):
+    """
+    returns dict of results for one server and viewer count
+    """
+    results = []
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        tasks = [asyncio.create_task(viewer(session, f'{base}/video_feed/loadtest', seconds, results)) for _ in range(viewers)]
+        latencies = await poll_latency(session, base, seconds)
+        threads, rss = proc_status(pid)
+        await asyncio.gather(*tasks)
+    connected = [frames for frames in results if frames > 0]
+    return {
+        'connected': len(connected),
+        'fps': np.mean(connected) / seconds if connected else 0.0,
+        'poll_ms': np.median(latencies) if latencies else float('nan'),
+        'threads': threads,
+        'rss_mb': rss,
+    }
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='/video_feed concurrent viewer load test')
+    parser.add_argument('--viewers', default='50,500,2000', help='comma separated viewer counts')
+    parser.add_argument('--seconds', type=float, default=10, help='streaming time per run')
+    parser.add_argument('--fps', type=float, default=2, help='fake ffmpeg frame rate')
+    parser.add_argument('--resolution', default='640x360', help='fake frame size')
+    parser.add_argument('--modes', default='threaded,async')
+    parser.add_argument('--serve', choices=('threaded', 'async'), help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--jpeg', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port, args.fps, args.jpeg)
+        return
+
+    #thousands of sockets on both ends
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ImportError, ValueError, OSError):
+        pass
+
+    width, height = (int(v) for v in args.resolution.split('x'))
+    jpeg_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.load_test_frame.jpg')
+    image = np.random.default_rng(0).integers(0, 255, (height, width, 3), dtype=np.uint8)
+    cv2.imwrite(jpeg_path, cv2.GaussianBlur(image, (9, 9), 0))
+
+    print(f"{'mode':<10}{'viewers':>8}{'connected':>11}{'fps/viewer':>12}{'poll ms':>9}{'threads':>9}{'rss MB':>8}")
+    try:
+        for mode in args.modes.split(','):
+            for viewers in (int(v) for v in args.viewers.split(',')):
+                port = free_port()
+                server = subprocess.Popen([
+                    sys.executable, __file__, '--serve', mode, '--port', str(port),
+                    '--fps', str(args.fps), '--jpeg', jpeg_path,
+                ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                try:
+                    if not wait_for_port(port):
+                        print(f"{mode:<10}{viewers:>8}  server did not start")
+                        continue
+                    time.sleep(1) #first frames reach the bus
+                    r = asyncio.run(load(f'http://127.0.0.1:{port}', viewers, args.seconds, server.pid))
+                    threads = '-' if r['threads'] is None else r['threads']
+                    rss = '-' if r['rss_mb'] is None else f"{r['rss_mb']:.0f}"
+                    print(f"{mode:<10}{viewers:>8}{r['connected']:>11}{r['fps']:>12.2f}{r['poll_ms']:>9.1f}{threads:>9}{rss:>8}")
+                finally:
+                    server.kill()
+                    server.wait()
+    finally:
+        os.remove(jpeg_path)
+
+
+if __name__ == '__main__':
+    main()